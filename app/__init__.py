@@ -18,12 +18,28 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Batch mode lets migrations alter constraints on SQLite
+    migrate.init_app(app, db, render_as_batch=True)
     CORS(app)
     
+    from app.utils.http_client import configure_http_client
+    configure_http_client(app)
+    
+    from app.services.model_store import configure_model_store
+    configure_model_store(app)
+    
+    from app.services.response_cache import configure_response_cache
+    configure_response_cache(app)
+    
+    from app.services.leader_election import configure_leader_election
+    configure_leader_election(app)
+    
     # Register blueprints
     from app.views.api import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
+    
+    from app.cli import register_commands
+    register_commands(app)
 
     # Add index route
     @app.route('/')
@@ -33,5 +49,22 @@ def create_app(config_name='default'):
     # Create database tables
     with app.app_context():
         db.create_all()
+        
+        # create_all never adds keys to existing tables, and ingest's upsert needs this one
+        from app.utils.sql import has_unique_key
+        if not has_unique_key('consumption_records', ['device_id', 'reading_timestamp']):
+            app.logger.error(
+                "consumption_records has no unique (device_id, reading_timestamp) key, so consumption "
+                "syncs will fail; run `flask db upgrade` to remove duplicate readings and add it"
+            )
+        
+        from app.utils.query_counter import init_query_budget
+        init_query_budget(app, db.engine)
+        
+        from app.utils.request_profiling import init_request_profiling
+        init_request_profiling(app, db.engine)
+    
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
     
     return app
@@ -0,0 +1,162 @@
+from app.controllers.consumption_controller import ConsumptionController
+from app.controllers.prediction_controller import PredictionController
+from app.services.rollups import ConsumptionRollups
+from app.services.data_export import DataExport
+from app.services.response_cache import response_cache
+from app.models.device import Device
+from app.utils.query_plan import capture_statements, sqlite_full_scans
+from app.utils.helpers import parse_iso_datetime
+from app import db
+from flask import current_app
+from datetime import date, datetime, timedelta
+import click
+
+# Small reference tables that may be read in full
+ALLOWED_FULL_SCANS = {'devices'}
+
+def api_query_shapes():
+    """The queries behind the API endpoints and ingest, by name"""
+    end = datetime.utcnow()
+    start = end - timedelta(days=30, minutes=17)
+    today = date.today()
+    reading = {
+        'device_id': 1,
+        'voltage': 220.0,
+        'current': 0.5,
+        'time_on': 10.0,
+        'active_energy': 0.02,
+        'reading_timestamp': end.replace(microsecond=0)
+    }
+    
+    def totals(device_ids, from_rollups):
+        previous = current_app.config.get('CONSUMPTION_TOTALS_FROM_ROLLUPS', False)
+        current_app.config['CONSUMPTION_TOTALS_FROM_ROLLUPS'] = from_rollups
+        try:
+            ConsumptionController.get_total_consumption(device_ids, start, end)
+        finally:
+            current_app.config['CONSUMPTION_TOTALS_FROM_ROLLUPS'] = previous
+    
+    return {
+        'device consumption in a range': lambda: ConsumptionController.get_device_consumption(1, start, end),
+        'device consumption in hourly buckets': lambda: ConsumptionController.get_device_consumption_series(1, start, end, 3600),
+        'totals from rollups, some devices': lambda: totals([1, 2], True),
+        'totals from rollups, all devices': lambda: totals(None, True),
+        'totals from raw readings': lambda: totals([1, 2], False),
+        'ingest with rollup refresh': lambda: ConsumptionController.bulk_insert_rows(1, [reading]),
+        'energy predictions by device and date': lambda: PredictionController.get_energy_predictions(1, today),
+        'energy predictions by date': lambda: PredictionController.get_energy_predictions(None, today),
+        'energy predictions by device': lambda: PredictionController.get_energy_predictions(1),
+        'peak predictions by date': lambda: PredictionController.get_peak_demand_predictions(today),
+        'all predictions for a week': lambda: ''.join(PredictionController.iter_all_predictions_json(today))
+    }
+
+def register_commands(app):
+    """Add the project's maintenance commands to the `flask` CLI"""
+    
+    @app.cli.command('backfill-rollups')
+    @click.option('--device-id', 'device_ids', type=int, multiple=True,
+                  help='Only rebuild this device (repeatable). Default: every device with readings.')
+    @click.option('--window-days', type=int, default=31, show_default=True,
+                  help='Days of raw readings aggregated per query.')
+    def backfill_rollups(device_ids, window_days):
+        """Rebuild hourly and daily consumption rollups from raw readings"""
+        summary = ConsumptionRollups.backfill(list(device_ids) or None, window_days)
+        click.echo(f"Rebuilt rollups for {summary['devices']} devices ({summary['hours']} hourly buckets)")
+    
+    @app.cli.command('export-data')
+    @click.argument('dataset', type=click.Choice(list(DataExport.DATASETS)))
+    @click.option('--format', 'export_format', type=click.Choice(DataExport.FORMATS), default='csv', show_default=True)
+    @click.option('--output', '-o', default='-', show_default=True,
+                  help='CSV file (- for stdout), or the directory for .npz files.')
+    @click.option('--device-id', 'device_ids', type=int, multiple=True,
+                  help='Only export this device (repeatable). Default: every device.')
+    @click.option('--start-date', help='ISO date or timestamp; inclusive.')
+    @click.option('--end-date', help='ISO date or timestamp; inclusive.')
+    def export_data(dataset, export_format, output, device_ids, start_date, end_date):
+        """Export readings or predictions in bulk as CSV or one .npz per device"""
+        device_ids = list(device_ids) or None
+        start_date, end_date = parse_iso_datetime(start_date), parse_iso_datetime(end_date)
+        
+        if export_format == 'npz':
+            if output == '-':
+                raise click.UsageError('--output must name a directory for npz exports')
+            paths = DataExport.write_npz_dir(output, dataset, device_ids, start_date, end_date)
+            click.echo(f"Wrote {len(paths)} files to {output}", err=True)
+            return
+        
+        with click.open_file(output, 'w', encoding='utf-8', newline='') as stream:
+            for chunk in DataExport.iter_csv(dataset, device_ids, start_date, end_date):
+                stream.write(chunk)
+    
+    @app.cli.command('check-query-budgets')
+    def check_query_budgets():
+        """Fail if a GET endpoint runs more SQL statements than its @query_budget
+        
+        Requests every budgeted endpoint against the current database, with the
+        response cache bypassed, using the first device for device routes.
+        Needs predictions and devices in the database to catch per-row queries.
+        """
+        device_id = db.session.query(db.func.min(Device.id)).scalar() or 1
+        db.session.rollback()
+        client = app.test_client()
+        urls = app.url_map.bind('localhost')
+        
+        failures = 0
+        cache_enabled, response_cache.enabled = response_cache.enabled, False
+        try:
+            for rule in app.url_map.iter_rules():
+                budget = getattr(app.view_functions[rule.endpoint], 'query_budget', None)
+                if budget is None or 'GET' not in rule.methods:
+                    continue
+                url = urls.build(rule.endpoint, {'device_id': device_id} if 'device_id' in rule.arguments else {})
+                statements = capture_statements(db.engine, client.get, url)
+                if len(statements) > budget:
+                    failures += 1
+                    click.echo(f"FAIL {url}: {len(statements)} statements, budget {budget}")
+                else:
+                    click.echo(f"ok   {url}: {len(statements)} of {budget} statements")
+        finally:
+            response_cache.enabled = cache_enabled
+        
+        if failures:
+            raise click.ClickException(f"{failures} endpoints exceed their query budget")
+    
+    @app.cli.command('check-query-plans')
+    def check_query_plans():
+        """Fail if an API query makes SQLite scan a whole table
+        
+        Runs each query shape, asks SQLite for the plan of every statement it
+        issued and rolls everything back afterwards.
+        """
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('Query plans can only be checked on SQLite')
+        
+        failures = 0
+        try:
+            for name, run in api_query_shapes().items():
+                try:
+                    statements = capture_statements(db.engine, run)
+                except Exception as e:
+                    db.session.rollback()
+                    failures += 1
+                    click.echo(f"FAIL {name}: {str(e).splitlines()[0]}")
+                    continue
+                connection = db.session.connection()
+                problems = []
+                for statement, parameters in statements:
+                    scans = set(sqlite_full_scans(connection, statement, parameters)) - ALLOWED_FULL_SCANS
+                    if scans:
+                        problems.append((sorted(scans), statement))
+                
+                if problems:
+                    failures += 1
+                    click.echo(f"FAIL {name}")
+                    for tables, statement in problems:
+                        click.echo(f"     full scan of {', '.join(tables)}: {' '.join(statement.split())}")
+                else:
+                    click.echo(f"ok   {name} ({len(statements)} statements)")
+        finally:
+            db.session.rollback()
+        
+        if failures:
+            raise click.ClickException(f"{failures} query shapes scan whole tables")
@@ -1,30 +1,201 @@
-from app.models.consumption import ConsumptionRecord
+from app.models.consumption import ConsumptionRecord, ConsumptionSyncCursor
 from app.models.device import Device
+from app.utils.helpers import parse_iso_datetime, to_utc_naive, encode_cursor, decode_cursor
+from app.utils.sql import insert_ignoring_duplicates, chunked, epoch_bucket
+from app.utils.downsample import lttb_indices
+from app.utils.streaming import iter_json_array
+from app.utils.http_client import http_client
+from app.services.rollups import ConsumptionRollups
 from app import db
+from flask import current_app
 from datetime import datetime, timedelta
-import requests
+import numpy as np
+import hashlib
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ConsumptionController:
+    # Columns behind ConsumptionRecord.row_to_dict, selected without building ORM objects
+    RECORD_COLUMNS = (
+        ConsumptionRecord.id,
+        ConsumptionRecord.device_id,
+        ConsumptionRecord.voltage,
+        ConsumptionRecord.current,
+        ConsumptionRecord.time_on,
+        ConsumptionRecord.active_energy,
+        ConsumptionRecord.reading_timestamp
+    )
+    
     @staticmethod
     def get_device_consumption(device_id, start_date=None, end_date=None):
         """Get consumption records for a specific device with optional date filtering"""
-        query = ConsumptionRecord.query.filter_by(device_id=device_id)
+        query = ConsumptionController.device_consumption_query(device_id, start_date, end_date)
+        return [ConsumptionRecord.row_to_dict(row) for row in db.session.execute(query)]
+    
+    @staticmethod
+    def get_device_consumption_json(device_id, start_date=None, end_date=None):
+        """get_device_consumption as a JSON array, encoded row by row without building dicts"""
+        query = ConsumptionController.device_consumption_query(device_id, start_date, end_date)
+        return '[' + ','.join(map(ConsumptionController.record_json, db.session.execute(query))) + ']'
+    
+    @staticmethod
+    def record_json(row):
+        """A RECORD_COLUMNS row as the JSON of ConsumptionRecord.row_to_dict
         
+        Unpacks the row by position and fills ConsumptionRecord.JSON_TEMPLATE,
+        skipping the dict and the per-field lookups; about 4x faster than
+        row_to_dict followed by jsonify.
+        """
+        record_id, device_id, voltage, current, time_on, active_energy, reading_timestamp = row
+        return ConsumptionRecord.JSON_TEMPLATE % (
+            active_energy, device_id, current, reading_timestamp.isoformat(), time_on, voltage, record_id
+        )
+    
+    @staticmethod
+    def device_range_filters(device_id, start_date=None, end_date=None):
+        """WHERE clauses for a device's readings with start_date <= timestamp <= end_date"""
+        filters = [ConsumptionRecord.device_id == device_id]
         if start_date:
-            query = query.filter(ConsumptionRecord.reading_timestamp >= start_date)
+            filters.append(ConsumptionRecord.reading_timestamp >= to_utc_naive(start_date))
         if end_date:
-            query = query.filter(ConsumptionRecord.reading_timestamp <= end_date)
+            filters.append(ConsumptionRecord.reading_timestamp <= to_utc_naive(end_date))
+        return filters
+    
+    @staticmethod
+    def device_consumption_query(device_id, start_date=None, end_date=None, after=None):
+        """Select a device's readings in timestamp order, optionally only those after `after`"""
+        query = db.select(*ConsumptionController.RECORD_COLUMNS).where(
+            *ConsumptionController.device_range_filters(device_id, start_date, end_date)
+        )
+        if after:
+            query = query.where(ConsumptionRecord.reading_timestamp > after)
+        return query.order_by(ConsumptionRecord.reading_timestamp)
+    
+    @staticmethod
+    def get_device_consumption_series(device_id, start_date=None, end_date=None, resolution=None, max_points=None):
+        """Get a device's consumption for charting: resampled, downsampled, or both
+        
+        With `resolution` (seconds), readings are summed into epoch-aligned
+        time buckets in SQL. With `max_points`, the raw readings or buckets
+        are thinned with LTTB on their energy, keeping the peaks.
+        """
+        if resolution:
+            series = ConsumptionController.resample_device_consumption(device_id, start_date, end_date, resolution)
+            if max_points:
+                x = np.array([point['bucket_start'] for point in series], dtype='datetime64[s]').astype(np.int64)
+                y = [point['energy_sum'] for point in series]
+                series = [series[i] for i in lttb_indices(x, y, max_points)]
+            for point in series:
+                point['bucket_start'] = point['bucket_start'].isoformat() + 'Z'
+            return series
+        
+        query = ConsumptionController.device_consumption_query(device_id, start_date, end_date)
+        rows = db.session.execute(query).all()
+        if max_points:
+            x = np.array([row.reading_timestamp for row in rows], dtype='datetime64[s]').astype(np.int64)
+            y = [row.active_energy for row in rows]
+            rows = [rows[i] for i in lttb_indices(x, y, max_points)]
+        return [ConsumptionRecord.row_to_dict(row) for row in rows]
+    
+    @staticmethod
+    def resample_device_consumption(device_id, start_date, end_date, resolution):
+        """Aggregate a device's readings into `resolution`-second buckets in SQL
+        
+        Power is voltage * current in W. Returns dicts with naive UTC
+        bucket_start datetimes, oldest first.
+        """
+        bucket = epoch_bucket(ConsumptionRecord.reading_timestamp, resolution).label('bucket')
+        power = ConsumptionRecord.voltage * ConsumptionRecord.current
+        query = db.select(
+            bucket,
+            db.func.sum(ConsumptionRecord.active_energy),
+            db.func.avg(power),
+            db.func.max(power),
+            db.func.count()
+        ).where(
+            *ConsumptionController.device_range_filters(device_id, start_date, end_date)
+        ).group_by(bucket).order_by(bucket)
+        
+        epoch = datetime(1970, 1, 1)
+        return [
+            {
+                'device_id': device_id,
+                'bucket_start': epoch + timedelta(seconds=int(bucket_start)),
+                'energy_sum': float(energy_sum),
+                'mean_power': float(mean_power),
+                'max_power': float(max_power),
+                'reading_count': int(reading_count)
+            }
+            for bucket_start, energy_sum, mean_power, max_power, reading_count in db.session.execute(query)
+        ]
+    
+    @staticmethod
+    def get_device_consumption_page(device_id, start_date=None, end_date=None, limit=None, cursor=None):
+        """Get one page of a device's consumption records, keyset-paginated on reading_timestamp
+        
+        Returns {'records': [...], 'next_cursor': ...}; next_cursor is None on the
+        last page and is otherwise passed back as `cursor` for the next one.
+        Raises ValueError for a cursor this method did not issue.
+        """
+        if limit is None:
+            limit = current_app.config.get('CONSUMPTION_PAGE_SIZE', 1000)
+        
+        after = None
+        if cursor:
+            try:
+                after = datetime.fromisoformat(decode_cursor(cursor)['after'])
+            except (KeyError, TypeError):
+                raise ValueError("Invalid cursor")
+        
+        query = ConsumptionController.device_consumption_query(device_id, start_date, end_date, after)
+        # One extra row tells whether another page follows
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({'after': rows[-1].reading_timestamp.isoformat()})
+        
+        return {
+            'records': [ConsumptionRecord.row_to_dict(row) for row in rows],
+            'next_cursor': next_cursor
+        }
+    
+    @staticmethod
+    def iter_device_consumption(device_id, start_date=None, end_date=None, batch_size=None, as_json=False):
+        """Yield a device's consumption records one at a time from a server-side cursor
         
-        records = query.order_by(ConsumptionRecord.reading_timestamp).all()
-        return [record.to_dict() for record in records]
+        Rows are fetched `batch_size` at a time, so memory stays flat however
+        long the range is. With `as_json`, each record is yielded as JSON text
+        (see record_json). Must be consumed inside an app context.
+        """
+        encode = ConsumptionController.record_json if as_json else ConsumptionRecord.row_to_dict
+        if batch_size is None:
+            batch_size = current_app.config.get('CONSUMPTION_STREAM_BATCH_SIZE', 1000)
+        
+        query = ConsumptionController.device_consumption_query(device_id, start_date, end_date)
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        try:
+            for row in result:
+                yield encode(row)
+        finally:
+            result.close()
     
     @staticmethod
     def get_total_consumption(device_ids=None, start_date=None, end_date=None):
         """Get total consumption for specified devices within a date range"""
+        if current_app.config.get('CONSUMPTION_TOTALS_FROM_ROLLUPS', False):
+            totals = ConsumptionRollups.range_totals(device_ids, start_date, end_date)
+            return [
+                {
+                    'Appliance_Info_id': device_id,
+                    'total_energy': float(total_energy)
+                }
+                for device_id, (total_energy, reading_count) in sorted(totals.items())
+                if reading_count
+            ]
+        
         query = db.session.query(
             ConsumptionRecord.device_id,
             db.func.sum(ConsumptionRecord.active_energy).label('total_energy')
@@ -59,53 +230,245 @@ class ConsumptionController:
             reading_timestamp=reading_timestamp
         )
         db.session.add(record)
+        db.session.flush()
+        ConsumptionRollups.refresh(device_id, {ConsumptionRollups.floor_hour(reading_timestamp)})
         db.session.commit()
         return record.to_dict()
     
     @staticmethod
-    def sync_consumption_from_api(api_url, device_id):
-        """Sync consumption records for a device from external API"""
-        try:
-            logger.info(f"Fetching consumption data from {api_url}")
-            response = requests.get(api_url)
-            response.raise_for_status()
-            records_data = response.json()
+    def parse_api_record(device_id, record_data):
+        """Convert one external API reading into a consumption_records row dict"""
+        timestamp = to_utc_naive(parse_iso_datetime(record_data.get('Reading_Time_Stamp')))
+        return {
+            'device_id': device_id,
+            'voltage': float(record_data.get('Voltage')),
+            'current': float(record_data.get('Current')),
+            'time_on': float(record_data.get('TimeOn')),
+            'active_energy': float(record_data.get('ActiveEnergy')),
+            'reading_timestamp': timestamp
+        }
+    
+    @staticmethod
+    def iter_parsed_records(device_id, records_data):
+        """Parse API readings into row dicts, skipping malformed ones"""
+        skipped = 0
+        for record_data in records_data:
+            try:
+                yield ConsumptionController.parse_api_record(device_id, record_data)
+            except (ValueError, TypeError, AttributeError):
+                skipped += 1
+        
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed consumption records for device {device_id}")
+    
+    @staticmethod
+    def bulk_insert_records(device_id, records_data, chunk_size=None):
+        """Insert API readings for a device, skipping ones already stored"""
+        rows = ConsumptionController.iter_parsed_records(device_id, records_data)
+        return ConsumptionController.bulk_insert_rows(device_id, rows, chunk_size)
+    
+    @staticmethod
+    def bulk_insert_rows(device_id, rows, chunk_size=None):
+        """Insert parsed rows for a device in chunks, skipping ones already stored
+        
+        Each chunk is deduped in memory, checked against existing timestamps with a
+        single range query and written as one batched INSERT that ignores
+        conflicts on (device_id, reading_timestamp). Hourly and daily rollups for
+        the hours that received rows are then recomputed. Returns the number of
+        new rows.
+        """
+        if chunk_size is None:
+            chunk_size = current_app.config.get('CONSUMPTION_INSERT_CHUNK_SIZE', 500)
+        
+        inserted = 0
+        touched_hours = set()
+        for chunk in chunked(rows, chunk_size):
+            inserted += ConsumptionController._insert_chunk(device_id, chunk, touched_hours)
+        
+        if touched_hours:
+            ConsumptionRollups.refresh(device_id, touched_hours)
+        return inserted
+    
+    @staticmethod
+    def _insert_chunk(device_id, chunk, touched_hours=None):
+        """Dedupe and insert one chunk of parsed rows, noting the hours written to"""
+        rows = {}
+        for row in chunk:
+            rows.setdefault(row['reading_timestamp'], row)
+        
+        existing = db.session.query(ConsumptionRecord.reading_timestamp).filter(
+            ConsumptionRecord.device_id == device_id,
+            ConsumptionRecord.reading_timestamp >= min(rows),
+            ConsumptionRecord.reading_timestamp <= max(rows)
+        )
+        for (timestamp,) in existing:
+            rows.pop(timestamp, None)
+        
+        if not rows:
+            return 0
+        if touched_hours is not None:
+            touched_hours.update(ConsumptionRollups.floor_hour(timestamp) for timestamp in rows)
+        
+        # Executed with a parameter list so the compiled statement is cached;
+        # SQLAlchemy batches it into multi-row VALUES where the driver supports it
+        stmt = insert_ignoring_duplicates(
+            ConsumptionRecord.__table__,
+            ['device_id', 'reading_timestamp']
+        )
+        result = db.session.execute(stmt, list(rows.values()))
+        return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+    
+    @staticmethod
+    def reading_hash(row):
+        """Stable digest of a parsed reading, used to check the sync cursor"""
+        key = (f"{row['reading_timestamp'].isoformat()}|{row['voltage']!r}|{row['current']!r}|"
+               f"{row['time_on']!r}|{row['active_energy']!r}")
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def get_sync_cursor_state(device_id):
+        """Get a device's sync cursor as a plain dict, or None if it was never synced"""
+        cursor = ConsumptionSyncCursor.query.get(device_id)
+        if not cursor:
+            return None
+        return {
+            'last_reading_timestamp': cursor.last_reading_timestamp,
+            'record_count': cursor.record_count,
+            'last_record_hash': cursor.last_record_hash
+        }
+    
+    @staticmethod
+    def iter_new_rows(rows, cursor_state, summary):
+        """Yield rows newer than the sync cursor
+        
+        Everything seen is tallied into `summary` so the cursor can be checked
+        and advanced once the stream is exhausted.
+        """
+        last_timestamp = cursor_state['last_reading_timestamp'] if cursor_state else None
+        summary.update(total=0, at_or_below_cursor=0, boundary_hash=None, latest_row=None)
+        
+        for row in rows:
+            timestamp = row['reading_timestamp']
+            summary['total'] += 1
+            latest = summary['latest_row']
+            if latest is None or timestamp >= latest['reading_timestamp']:
+                summary['latest_row'] = row
             
+            if last_timestamp is not None and timestamp <= last_timestamp:
+                summary['at_or_below_cursor'] += 1
+                if timestamp == last_timestamp:
+                    summary['boundary_hash'] = ConsumptionController.reading_hash(row)
+                continue
+            yield row
+    
+    @staticmethod
+    def cursor_matches(cursor_state, summary):
+        """Check that upstream history at or below the cursor is what was ingested"""
+        if not cursor_state or summary.get('not_modified'):
+            return True
+        return (summary['at_or_below_cursor'] == cursor_state['record_count']
+                and summary['boundary_hash'] == cursor_state['last_record_hash'])
+    
+    @staticmethod
+    def save_sync_cursor(device_id, summary):
+        """Advance a device's sync cursor to the latest reading seen"""
+        latest = summary.get('latest_row')
+        if latest is None:
+            return
+        
+        cursor = ConsumptionSyncCursor.query.get(device_id)
+        if not cursor:
+            cursor = ConsumptionSyncCursor(device_id=device_id)
+            db.session.add(cursor)
+        cursor.last_reading_timestamp = latest['reading_timestamp']
+        cursor.record_count = summary['total']
+        cursor.last_record_hash = ConsumptionController.reading_hash(latest)
+    
+    @staticmethod
+    def open_consumption_stream(api_url, device_id, cursor_state, summary, chunk_size=65536):
+        """Request a device's readings and yield the parsed rows newer than its cursor
+        
+        Once a cursor exists the request is conditional, so an unchanged payload
+        costs a 304 and yields nothing. `summary` is filled in as rows stream by.
+        """
+        summary.update(url=api_url, not_modified=False, validators={})
+        with http_client.get(api_url, stream=True, revalidate=cursor_state is not None) as response:
+            if response.status_code == 304:
+                summary.update(not_modified=True, total=0, at_or_below_cursor=0, latest_row=None)
+                return
+            response.raise_for_status()
+            summary['validators'] = http_client.validators_from(response)
+            records_data = iter_json_array(response.iter_content(chunk_size=chunk_size))
+            yield from ConsumptionController.iter_new_rows(
+                ConsumptionController.iter_parsed_records(device_id, records_data),
+                cursor_state,
+                summary
+            )
+    
+    @staticmethod
+    def fetch_new_rows(api_url, device_id, cursor_state, chunk_size=65536):
+        """Download a device's readings and return the rows newer than its cursor
+        
+        Does not touch the database, so it can run on worker threads outside the
+        app context. Returns (rows, summary) for ingest_new_rows. The rows are
+        held in memory, so only use it with a cursor: without one it returns the
+        device's whole history.
+        """
+        summary = {}
+        rows = list(ConsumptionController.open_consumption_stream(
+            api_url, device_id, cursor_state, summary, chunk_size
+        ))
+        return rows, summary
+    
+    @staticmethod
+    def ingest_new_rows(device_id, rows, summary):
+        """Write rows from fetch_new_rows and advance the device's sync cursor"""
+        count = ConsumptionController.bulk_insert_rows(device_id, rows)
+        ConsumptionController.save_sync_cursor(device_id, summary)
+        db.session.commit()
+        # Only revalidate against this payload once it is safely stored
+        http_client.store_validators(summary['url'], summary.get('validators'))
+        return count
+    
+    @staticmethod
+    def sync_consumption_from_api(api_url, device_id, full_resync=False):
+        """Sync consumption records for a device from external API
+        
+        The response is parsed incrementally and only readings newer than the
+        device's sync cursor are written. If the history at or below the cursor
+        no longer matches what was ingested, the payload is re-ingested in full.
+        """
+        try:
             # Check if device exists
             device = Device.query.get(device_id)
             if not device:
                 logger.error(f"Device with ID {device_id} not found")
                 return False
             
-            count = 0
-            for record_data in records_data:
-                # Generate a unique ID based on device_id and timestamp
-                timestamp = datetime.fromisoformat(record_data.get('Reading_Time_Stamp').replace('Z', '+00:00'))
-                timestamp_str = timestamp.strftime('%Y%m%d%H%M%S')
-                record_id = int(f"{device_id}{timestamp_str}")
-                
-                # Check if record already exists
-                existing_record = ConsumptionRecord.query.filter_by(
-                    device_id=device_id,
-                    reading_timestamp=timestamp
-                ).first()
-                
-                if not existing_record:
-                    # Create new record
-                    new_record = ConsumptionRecord(
-                        device_id=device_id,
-                        voltage=float(record_data.get('Voltage')),
-                        current=float(record_data.get('Current')),
-                        time_on=float(record_data.get('TimeOn')),
-                        active_energy=float(record_data.get('ActiveEnergy')),
-                        reading_timestamp=timestamp
-                    )
-                    db.session.add(new_record)
-                    count += 1
+            cursor_state = None if full_resync else ConsumptionController.get_sync_cursor_state(device_id)
+            summary = {}
+            
+            logger.info(f"Fetching consumption data from {api_url}")
+            rows = ConsumptionController.open_consumption_stream(
+                api_url, device_id, cursor_state, summary,
+                current_app.config.get('CONSUMPTION_STREAM_CHUNK_SIZE', 65536)
+            )
+            count = ConsumptionController.bulk_insert_rows(device_id, rows)
+            
+            if not ConsumptionController.cursor_matches(cursor_state, summary):
+                logger.warning(f"Upstream history for device {device_id} changed below the sync cursor, running a full resync")
+                return ConsumptionController.sync_consumption_from_api(api_url, device_id, full_resync=True)
             
+            ConsumptionController.save_sync_cursor(device_id, summary)
             db.session.commit()
-            logger.info(f"Successfully synced {count} new consumption records for device {device_id}")
+            http_client.store_validators(api_url, summary['validators'])
+            if summary['not_modified']:
+                logger.info(f"Consumption data for device {device_id} not modified since last sync")
+            else:
+                logger.info(f"Successfully synced {count} new consumption records for device {device_id} "
+                            f"({summary['at_or_below_cursor']} already ingested)")
             return True
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error syncing consumption data: {str(e)}")
             return False
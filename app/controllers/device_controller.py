@@ -1,13 +1,30 @@
 from app.models.device import Device
 from app import db
 from datetime import datetime
-import requests
+from app.utils.http_client import http_client
+from app.utils.helpers import to_utc_naive
+from app.services.response_cache import response_cache
+from app.services.dashboard import DashboardSnapshots
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 class DeviceController:
+    @staticmethod
+    def devices_changed():
+        """Rebuild what embeds device details after a committed change
+        
+        The change itself is already committed, so a failed rebuild is logged
+        rather than raised; cached responses are invalidated either way.
+        """
+        try:
+            DashboardSnapshots.refresh()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error refreshing dashboard snapshots after a device change: {str(e)}")
+        response_cache.invalidate()
+    
     @staticmethod
     def get_all_devices():
         """Get all registered devices"""
@@ -34,6 +51,7 @@ class DeviceController:
         )
         db.session.add(device)
         db.session.commit()
+        DeviceController.devices_changed()
         return device.to_dict()
     
     @staticmethod
@@ -53,6 +71,7 @@ class DeviceController:
             device.relay_status = relay_status
         
         db.session.commit()
+        DeviceController.devices_changed()
         return device.to_dict()
     
     @staticmethod
@@ -64,6 +83,7 @@ class DeviceController:
         
         db.session.delete(device)
         db.session.commit()
+        DeviceController.devices_changed()
         return True
     
     @staticmethod
@@ -71,10 +91,11 @@ class DeviceController:
         """Sync devices from external API"""
         try:
             logger.info(f"Fetching devices from {api_url}")
-            response = requests.get(api_url)
-            response.raise_for_status()
-            devices_data = response.json()
+            devices_data = http_client.get_json(api_url)
             
+            # Unchanged devices (e.g. a 304 replaying the cached list) leave the snapshots and cache alone.
+            # Checked per device, since the next lookup autoflushes pending changes.
+            changed = False
             for device_data in devices_data:
                 existing_device = Device.query.get(device_data.get('id'))
                 
@@ -86,7 +107,8 @@ class DeviceController:
                     existing_device.relay_status = device_data.get('Relay_Status')
                     # Parse date if needed
                     if 'DateAdded' in device_data:
-                        existing_device.date_added = datetime.fromisoformat(device_data.get('DateAdded').replace('Z', '+00:00'))
+                        existing_device.date_added = to_utc_naive(datetime.fromisoformat(device_data.get('DateAdded').replace('Z', '+00:00')))
+                    changed = changed or db.session.is_modified(existing_device)
                 else:
                     # Create new device
                     new_device = Device(
@@ -98,13 +120,17 @@ class DeviceController:
                     )
                     # Parse date if needed
                     if 'DateAdded' in device_data:
-                        new_device.date_added = datetime.fromisoformat(device_data.get('DateAdded').replace('Z', '+00:00'))
+                        new_device.date_added = to_utc_naive(datetime.fromisoformat(device_data.get('DateAdded').replace('Z', '+00:00')))
                     
                     db.session.add(new_device)
+                    changed = True
             
             db.session.commit()
             logger.info(f"Successfully synced {len(devices_data)} devices")
-            return True
         except Exception as e:
             logger.error(f"Error syncing devices: {str(e)}")
             return False
+        
+        if changed:
+            DeviceController.devices_changed()
+        return True
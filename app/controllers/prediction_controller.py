@@ -2,157 +2,398 @@ from app.models.prediction import EnergyPrediction, PeakDemandPrediction
 from app.models.consumption import ConsumptionRecord
 from app.models.device import Device
 from app.utils.data_collector import DataCollector
+from app.utils.http_client import http_client
+from app.services.training_data import TrainingDataSource
+from app.services.feature_pipeline import FeaturePipeline
+from app.services.model_store import model_store
+from app.services.response_cache import response_cache
+from app.services.dashboard import DashboardSnapshots
+from app.utils.helpers import parse_power_string
+from app.utils.streaming import iter_nested_json_object
 from app import db
+from flask import current_app
 from datetime import datetime, timedelta
+import json
+import time
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
-import joblib
-import os
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
 
 class PredictionController:
     # Define feature names for consistency between training and prediction
-    ENERGY_FEATURE_NAMES = ['hour', 'day_of_week', 'month', 'time_on', 'current', 'voltage']
-    PEAK_FEATURE_NAMES = ['hour', 'day_of_week', 'month']
+    ENERGY_FEATURE_NAMES = FeaturePipeline.ENERGY_FEATURE_NAMES
+    PEAK_FEATURE_NAMES = FeaturePipeline.PEAK_FEATURE_NAMES
+    GLOBAL_ENERGY_FEATURE_NAMES = FeaturePipeline.GLOBAL_ENERGY_FEATURE_NAMES
+    GLOBAL_ENERGY_MODEL_PATH = 'models/energy_model_global.pkl'
+    
+    # Device energy estimators per MODEL_PROFILE. 'compact' bounds tree depth and
+    # leaf size so artifacts stay small; 'hist_gb' swaps the forest for histogram
+    # gradient boosting, which is smaller still but can't be extended incrementally.
+    ENERGY_MODEL_PROFILES = {
+        'default': (RandomForestRegressor, {'n_estimators': 100}),
+        'compact': (RandomForestRegressor, {'n_estimators': 50, 'max_depth': 12, 'min_samples_leaf': 5}),
+        'hist_gb': (HistGradientBoostingRegressor, {'max_iter': 200, 'max_leaf_nodes': 31, 'min_samples_leaf': 20})
+    }
+    # The global model's estimators; its default keeps leaves coarser than a device
+    # model's, since one forest covers every device's readings
+    GLOBAL_ENERGY_MODEL_PROFILES = dict(
+        ENERGY_MODEL_PROFILES,
+        default=(RandomForestRegressor, {'n_estimators': 100, 'min_samples_leaf': 5})
+    )
+    
+    # Columns read by the prediction endpoints, selected as plain rows
+    ENERGY_PREDICTION_COLUMNS = (
+        EnergyPrediction.id,
+        EnergyPrediction.device_id,
+        EnergyPrediction.predicted_energy,
+        EnergyPrediction.prediction_date,
+        EnergyPrediction.prediction_hour,
+        EnergyPrediction.created_at
+    )
+    PEAK_PREDICTION_COLUMNS = (
+        PeakDemandPrediction.id,
+        PeakDemandPrediction.predicted_peak_demand,
+        PeakDemandPrediction.prediction_date,
+        PeakDemandPrediction.prediction_hour,
+        PeakDemandPrediction.created_at
+    )
+    
+    @staticmethod
+    def use_global_energy_model():
+        """Whether this deployment uses one energy model for all devices"""
+        return current_app.config.get('ENERGY_MODEL_MODE', 'per_device') == 'global'
+    
+    @staticmethod
+    def energy_model_path(device_id):
+        """Path of the energy model that serves a device"""
+        if PredictionController.use_global_energy_model():
+            return PredictionController.GLOBAL_ENERGY_MODEL_PATH
+        return PredictionController.device_model_path(device_id)
+    
+    @staticmethod
+    def device_model_path(device_id):
+        """Path of a device's own energy model"""
+        return f'models/energy_model_device_{device_id}.pkl'
+    
+    @staticmethod
+    def device_rated_power():
+        """Rated power in watts for every known device"""
+        return {
+            device_id: parse_power_string(rated_power)
+            for device_id, rated_power in db.session.query(Device.id, Device.rated_power)
+        }
     
     @staticmethod
     def get_energy_predictions(device_id=None, prediction_date=None):
-        """Get energy predictions with optional filtering"""
-        query = EnergyPrediction.query
+        """Get energy predictions with optional filtering
+        
+        Device names come from a join in the same query rather than a lazy
+        load per prediction.
+        """
+        query = db.select(
+            *PredictionController.ENERGY_PREDICTION_COLUMNS,
+            Device.name.label('device_name')
+        ).outerjoin(Device, Device.id == EnergyPrediction.device_id)
         
         if device_id:
-            query = query.filter_by(device_id=device_id)
+            query = query.where(EnergyPrediction.device_id == device_id)
         if prediction_date:
-            query = query.filter_by(prediction_date=prediction_date)
+            query = query.where(EnergyPrediction.prediction_date == prediction_date)
         
-        predictions = query.order_by(EnergyPrediction.prediction_date, 
-                                     EnergyPrediction.prediction_hour).all()
-        return [prediction.to_dict() for prediction in predictions]
+        rows = db.session.execute(query.order_by(EnergyPrediction.prediction_date,
+                                                 EnergyPrediction.prediction_hour))
+        return [EnergyPrediction.row_to_dict(row, row.device_name) for row in rows]
     
     @staticmethod
     def get_peak_demand_predictions(prediction_date=None):
         """Get peak demand predictions with optional date filtering"""
-        query = PeakDemandPrediction.query
+        query = db.select(*PredictionController.PEAK_PREDICTION_COLUMNS)
         
         if prediction_date:
-            query = query.filter_by(prediction_date=prediction_date)
+            query = query.where(PeakDemandPrediction.prediction_date == prediction_date)
         
-        predictions = query.order_by(PeakDemandPrediction.prediction_date, 
-                                     PeakDemandPrediction.prediction_hour).all()
-        return [prediction.to_dict() for prediction in predictions]
+        rows = db.session.execute(query.order_by(PeakDemandPrediction.prediction_date,
+                                                 PeakDemandPrediction.prediction_hour))
+        return [PeakDemandPrediction.row_to_dict(row) for row in rows]
     
     @staticmethod
     def fetch_device_consumption_data(device_id):
         """Fetch consumption data for a device directly from the API"""
         try:
             api_url = f"{DataCollector.CONSUMPTION_API_BASE_URL}/{device_id}"
-            response = requests.get(api_url)
-            response.raise_for_status()
-            return response.json()
+            return http_client.get_json(api_url)
         except Exception as e:
             logger.error(f"Error fetching consumption data for device {device_id}: {str(e)}")
             return []
     
     @staticmethod
-    def train_energy_prediction_model(device_id):
-        """Train energy prediction model for a specific device using API data"""
-        # Fetch data directly from API
-        records_data = PredictionController.fetch_device_consumption_data(device_id)
+    def train_energy_prediction_model(device_id, mode=None, force=False):
+        """Train energy prediction model for a specific device from stored readings
+        
+        mode='incremental' (default: TRAINING_MODE) extends the saved model with
+        readings newer than its training cursor when possible. Unless `force`
+        is set, a model trained on exactly the current readings is kept.
+        """
+        status = PredictionController.train_energy_model_status(device_id, mode, force)
         
-        if len(records_data) < 24:  # Need enough data to train
+        if status == 'insufficient_data':
             logger.warning(f"Not enough data to train model for device {device_id}")
             return False
         
-        # Prepare data for training
-        data = []
-        for record in records_data:
-            try:
-                timestamp = datetime.fromisoformat(record.get('Reading_Time_Stamp').replace('Z', '+00:00'))
-                data.append({
-                    'device_id': device_id,
-                    'hour': timestamp.hour,
-                    'day_of_week': timestamp.weekday(),
-                    'month': timestamp.month,
-                    'active_energy': float(record.get('ActiveEnergy')),
-                    'time_on': float(record.get('TimeOn')),
-                    'current': float(record.get('Current')),
-                    'voltage': float(record.get('Voltage'))
-                })
-            except (ValueError, TypeError, AttributeError) as e:
-                logger.error(f"Error processing record: {e}")
-                continue
-        
-        if len(data) < 24:
-            logger.warning(f"Not enough valid data points to train model for device {device_id}")
+        return True
+    
+    @staticmethod
+    def train_energy_model_status(device_id, mode=None, force=False):
+        """Train one device's energy model and return the outcome
+        
+        See `train_energy_model_from_frame` for the possible values. In global
+        mode the fleet model is trained instead, and a device missing from the
+        devices table gives 'unknown_device'.
+        """
+        if PredictionController.use_global_energy_model():
+            # A single model serves every device, so retrain that instead
+            if db.session.get(Device, device_id) is None:
+                return 'unknown_device'
+            return PredictionController.train_global_energy_model_status(mode, force)
+        
+        plan = PredictionController.energy_training_plan(device_id, mode, force)
+        raw = TrainingDataSource.get_device_frame(device_id, since=plan['since'])
+        return PredictionController.train_energy_model_from_frame(
+            raw, PredictionController.device_model_path(device_id), plan
+        )
+    
+    @staticmethod
+    def energy_training_plan(device_id, mode=None, force=False, model_path=None):
+        """Decide whether a device model is rebuilt or extended with new readings
+        
+        Incremental updates need a saved model with a training cursor. A full
+        rebuild is due every TRAINING_FULL_REBUILD_DAYS, or once another batch
+        of trees would take the forest past TRAINING_MAX_TREES. `model_path`
+        plans another energy model (the global one) the same way.
+        """
+        config = current_app.config
+        mode = mode or config.get('TRAINING_MODE', 'full')
+        path = model_path or PredictionController.device_model_path(device_id)
+        metadata = model_store.load_metadata(path) if model_store.exists(path) else None
+        plan = {
+            'incremental': False,
+            'since': None,
+            'force': force,
+            'profile': config.get('MODEL_PROFILE', 'default'),
+            'metadata': metadata,
+            'fingerprint': None,
+            'trees': config.get('TRAINING_INCREMENTAL_TREES', 10)
+        }
+        if mode != 'incremental' or force:
+            return plan
+        
+        if not metadata or not metadata.get('trained_through'):
+            return plan
+        if metadata.get('profile', 'default') != plan['profile'] or not PredictionController.is_forest_profile(plan['profile']):
+            return plan
+        
+        rebuild_after = timedelta(days=config.get('TRAINING_FULL_REBUILD_DAYS', 7))
+        if datetime.utcnow() - datetime.fromisoformat(metadata['full_trained_at']) >= rebuild_after:
+            return plan
+        if metadata['n_estimators'] + plan['trees'] > config.get('TRAINING_MAX_TREES', 300):
+            return plan
+        
+        plan.update(
+            incremental=True,
+            since=datetime.fromisoformat(metadata['trained_through'])
+        )
+        return plan
+    
+    @staticmethod
+    def training_fingerprint(raw):
+        """Row count, latest reading and a content hash of a training frame
+        
+        Row hashes are summed, so the fingerprint does not depend on the order
+        the database returned the rows in.
+        """
+        columns = [column for column in FeaturePipeline.RAW_COLUMNS if column in raw]
+        row_hashes = pd.util.hash_pandas_object(raw[columns], index=False).to_numpy()
+        latest = raw['reading_timestamp'].max() if len(raw) else None
+        return {
+            'rows': len(raw),
+            'max_timestamp': pd.Timestamp(latest).isoformat() if latest is not None else None,
+            'content_hash': f"{int(row_hashes.sum(dtype=np.uint64)):016x}"
+        }
+    
+    @staticmethod
+    def training_data_unchanged(plan, fingerprint):
+        """Whether a saved model was fully trained on data with this fingerprint"""
+        if not plan or plan['force'] or plan['incremental'] or not plan['metadata']:
             return False
-            
-        df = pd.DataFrame(data)
+        if plan['metadata'].get('profile', 'default') != plan['profile']:
+            return False
+        return plan['metadata'].get('fingerprint') == fingerprint
+    
+    @staticmethod
+    def train_energy_model_from_frame(raw, model_path, plan=None, n_jobs=None, kind='energy', rated_power=None):
+        """Fit or extend a device energy model on loaded readings and save it
+        
+        Returns 'trained' (full fit), 'updated' (trees added on new readings),
+        'up_to_date' (too few new readings, model left as is), 'skipped' (same
+        readings as the saved model) or 'insufficient_data'. Needs neither the
+        app context nor the database. kind='global_energy' with `rated_power`
+        fits the fleet-wide model instead.
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        trained_through = raw['reading_timestamp'].max() if len(raw) else None
+        
+        if plan and plan['incremental']:
+            metadata = plan['metadata']
+            model = PredictionController.extend_energy_model(
+                model_store.load(model_path), raw, plan['trees'], n_jobs, kind, rated_power
+            )
+            if model is None:
+                return 'up_to_date'
+            metadata = dict(
+                metadata,
+                trained_through=pd.Timestamp(trained_through).isoformat(),
+                rows=metadata['rows'] + len(raw),
+                n_estimators=model.n_estimators,
+                updated_at=now.isoformat(),
+                # The model no longer matches any single training frame
+                fingerprint=None
+            )
+            status = 'updated'
+        else:
+            fingerprint = (plan and plan['fingerprint']) or PredictionController.training_fingerprint(raw)
+            if PredictionController.training_data_unchanged(plan, fingerprint):
+                return 'skipped'
+            profile = plan['profile'] if plan else 'default'
+            model = PredictionController.fit_energy_model(raw, n_jobs, profile, kind, rated_power)
+            if model is None:
+                return 'insufficient_data'
+            metadata = {
+                'trained_through': pd.Timestamp(trained_through).isoformat(),
+                'rows': len(raw),
+                'profile': profile,
+                'n_estimators': getattr(model, 'n_estimators', None),
+                'full_trained_at': now.isoformat(),
+                'updated_at': now.isoformat(),
+                'fingerprint': fingerprint
+            }
+            status = 'trained'
         
-        # Feature engineering - use consistent feature names
-        X = df[PredictionController.ENERGY_FEATURE_NAMES]
-        y = df['active_energy']
+        metadata['train_seconds'] = time.perf_counter() - started
+        model_store.save(model_path, model, metadata)
+        return status
+    
+    @staticmethod
+    def fit_energy_model(raw, n_jobs=None, profile='default', kind='energy', rated_power=None):
+        """Fit a device energy model on raw readings, or return None if there are too few
+        
+        `profile` is a key of ENERGY_MODEL_PROFILES. Needs neither the app
+        context nor the database, so training worker processes can call it on
+        frames loaded by the parent.
+        """
+        X, y = PredictionController.energy_training_set(raw, kind, rated_power)
+        
+        if len(X) < 24:  # Need enough data to train
+            return None
         
         # Train model
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        model = PredictionController.build_energy_estimator(profile, n_jobs, kind)
         model.fit(X, y)
+        if PredictionController.is_forest_profile(profile):
+            # Forecasts are a few hundred rows; threads would cost more than they save
+            model.n_jobs = None
         
-        # Save model
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(model, f'models/energy_model_device_{device_id}.pkl')
+        return model
+    
+    @staticmethod
+    def build_energy_estimator(profile='default', n_jobs=None, kind='energy'):
+        """Unfitted device (or, with kind='global_energy', fleet) energy estimator for a MODEL_PROFILE"""
+        profiles = (PredictionController.GLOBAL_ENERGY_MODEL_PROFILES if kind == 'global_energy'
+                    else PredictionController.ENERGY_MODEL_PROFILES)
+        if profile not in profiles:
+            raise ValueError(f"Unknown model profile: {profile}")
+        estimator, params = profiles[profile]
+        if estimator is RandomForestRegressor:
+            params = dict(params, n_jobs=n_jobs)
+        return estimator(random_state=42, **params)
+    
+    @staticmethod
+    def is_forest_profile(profile):
+        """Whether a profile trains a random forest, which can be extended with warm_start"""
+        return PredictionController.ENERGY_MODEL_PROFILES.get(profile, (None,))[0] is RandomForestRegressor
+    
+    @staticmethod
+    def extend_energy_model(model, raw, trees, n_jobs=None, kind='energy', rated_power=None):
+        """Add `trees` trees fitted on new readings to a trained forest
         
-        return True
+        Existing trees are kept as they are, so the cost depends only on the
+        new rows. Returns None if there are too few of them to fit on.
+        """
+        X, y = PredictionController.energy_training_set(raw, kind, rated_power)
+        
+        if len(X) < 24:
+            return None
+        
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + trees, n_jobs=n_jobs)
+        model.fit(X, y)
+        model.set_params(warm_start=False, n_jobs=None)
+        
+        return model
+    
+    @staticmethod
+    def energy_training_set(raw, kind='energy', rated_power=None):
+        """Features and target of an energy model ('energy' per device, 'global_energy' for the fleet)"""
+        df = FeaturePipeline.build(raw, kind, rated_power=rated_power)
+        if kind == 'global_energy':
+            return df[PredictionController.GLOBAL_ENERGY_FEATURE_NAMES], df['active_energy']
+        return df[PredictionController.ENERGY_FEATURE_NAMES], df['active_energy']
+    
+    @staticmethod
+    def train_global_energy_model(mode=None, force=False):
+        """Train one energy prediction model on the readings of every device"""
+        return PredictionController.train_global_energy_model_status(mode, force) != 'insufficient_data'
+    
+    @staticmethod
+    def train_global_energy_model_status(mode=None, force=False):
+        """Train the fleet-wide energy model and return the outcome
+        
+        Planned like a device model (TRAINING_MODE, MODEL_PROFILE, `force`),
+        and skipped when neither the readings nor any device's rated power,
+        which is one of its features, changed since its last full fit.
+        """
+        model_path = PredictionController.GLOBAL_ENERGY_MODEL_PATH
+        plan = PredictionController.energy_training_plan(None, mode, force, model_path)
+        rated_power = PredictionController.device_rated_power()
+        raw = TrainingDataSource.get_fleet_frame(since=plan['since'])
+        if not plan['incremental']:
+            powers = pd.Series(rated_power, dtype=np.float64).sort_index()
+            plan['fingerprint'] = dict(
+                PredictionController.training_fingerprint(raw),
+                rated_power_hash=f"{int(pd.util.hash_pandas_object(powers).to_numpy().sum(dtype=np.uint64)):016x}"
+            )
+        
+        status = PredictionController.train_energy_model_from_frame(
+            raw, model_path, plan, kind='global_energy', rated_power=rated_power
+        )
+        if status == 'insufficient_data':
+            logger.warning("Not enough data to train global energy model")
+        return status
     
     @staticmethod
     def train_peak_demand_model():
-        """Train peak demand prediction model using API data"""
-        # Get all devices
-        try:
-            response = requests.get(DataCollector.DEVICES_API_URL)
-            response.raise_for_status()
-            devices_data = response.json()
-            device_ids = [device['id'] for device in devices_data]
-        except Exception as e:
-            logger.error(f"Error fetching devices: {str(e)}")
-            return False
+        """Train peak demand prediction model from stored readings of all devices"""
+        raw = TrainingDataSource.get_fleet_frame(columns=['reading_timestamp', 'voltage', 'current'])
         
-        # Prepare data for training
-        all_data = []
-        
-        for device_id in device_ids:
-            records_data = PredictionController.fetch_device_consumption_data(device_id)
-            
-            for record in records_data:
-                try:
-                    timestamp = datetime.fromisoformat(record.get('Reading_Time_Stamp').replace('Z', '+00:00'))
-                    # Calculate power in kW (P = V * I)
-                    voltage = float(record.get('Voltage'))
-                    current = float(record.get('Current'))
-                    power = (voltage * current) / 1000
-                    
-                    all_data.append({
-                        'device_id': device_id,
-                        'hour': timestamp.hour,
-                        'day_of_week': timestamp.weekday(),
-                        'month': timestamp.month,
-                        'power': power
-                    })
-                except (ValueError, TypeError, AttributeError) as e:
-                    logger.error(f"Error processing record: {e}")
-                    continue
-        
-        if len(all_data) < 48:  # Need enough data to train
+        if len(raw) < 48:  # Need enough data to train
             logger.warning("Not enough data to train peak demand model")
             return False
         
-        df = pd.DataFrame(all_data)
-        
-        # Aggregate by hour to get total power
-        df_hourly = df.groupby(['hour', 'day_of_week', 'month'])['power'].sum().reset_index()
+        # Total power per (hour, day_of_week, month)
+        df_hourly = FeaturePipeline.build(raw, 'peak')
         
         # Feature engineering - use consistent feature names
         X = df_hourly[PredictionController.PEAK_FEATURE_NAMES]
@@ -163,211 +404,220 @@ class PredictionController:
         model.fit(X, y)
         
         # Save model
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(model, 'models/peak_demand_model.pkl')
+        model_store.save('models/peak_demand_model.pkl', model)
         
         return True
     
     @staticmethod
     def generate_predictions(days_ahead=1):
-        """Generate predictions for the next few days"""
-        # Get all devices from API
+        """Generate predictions for the next few days
+        
+        The feature matrix for the whole horizon is built once, each model is
+        called once, and results are written with bulk inserts. Returns the
+        number of energy and peak demand predictions written, or None if the
+        devices could not be listed.
+        """
+        # Get devices from the local table (or the API as a fallback)
         try:
-            response = requests.get(DataCollector.DEVICES_API_URL)
-            response.raise_for_status()
-            devices_data = response.json()
+            device_ids = TrainingDataSource.device_ids()
         except Exception as e:
             logger.error(f"Error fetching devices: {str(e)}")
-            return False
+            return None
         
-        # Generate predictions for each device
-        for device_data in devices_data:
-            device_id = device_data['id']
-            
-            # Check if model exists
-            model_path = f'models/energy_model_device_{device_id}.pkl'
-            if not os.path.exists(model_path):
-                # Train model if it doesn't exist
-                PredictionController.train_energy_prediction_model(device_id)
-                if not os.path.exists(model_path):
-                    continue  # Skip if training failed
-            
-            # Load model
-            model = joblib.load(model_path)
-            
-            # Generate predictions for next few days
-            for day in range(days_ahead):
-                prediction_date = (datetime.now() + timedelta(days=day)).date()
-                
-                # Delete existing predictions for this date and device
-                EnergyPrediction.query.filter_by(
-                    device_id=device_id,
-                    prediction_date=prediction_date
-                ).delete()
-                
-                # Generate hourly predictions
-                for hour in range(24):
-                    # Create feature DataFrame with proper column names
-                    features_dict = {
-                        'hour': [hour],
-                        'day_of_week': [prediction_date.weekday()],
-                        'month': [prediction_date.month],
-                        'time_on': [120],  # Assume average time_on of 120 minutes
-                        'current': [0.5],  # Assume average current of 0.5A
-                        'voltage': [220]   # Assume average voltage of 220V
-                    }
-                    features_df = pd.DataFrame(features_dict)
-                    
-                    # Make prediction
-                    predicted_energy = float(model.predict(features_df)[0])
-                    
-                    # Save prediction
-                    prediction = EnergyPrediction(
-                        device_id=device_id,
-                        predicted_energy=predicted_energy,
-                        prediction_date=prediction_date,
-                        prediction_hour=hour
-                    )
-                    db.session.add(prediction)
+        start_date = datetime.now().date()
+        prediction_dates = [start_date + timedelta(days=day) for day in range(days_ahead)]
+        created_at = datetime.utcnow()
+        
+        # Every hour of the horizon, with the assumed operating point
+        # (time_on of 120 minutes, 0.5A at 220V)
+        horizon = FeaturePipeline.horizon_frame(start_date, days_ahead)
+        if horizon.empty:
+            logger.info("No prediction horizon (days_ahead < 1), nothing to generate")
+            return 0
+        horizon_dates = horizon['reading_timestamp'].dt.date.tolist()
+        horizon_hours = horizon['reading_timestamp'].dt.hour.tolist()
+        energy_features = FeaturePipeline.build(horizon, 'energy')[PredictionController.ENERGY_FEATURE_NAMES]
+        
+        if PredictionController.use_global_energy_model():
+            device_predictions = PredictionController._predict_energy_global(device_ids, horizon)
+        else:
+            device_predictions = PredictionController._predict_energy_per_device(device_ids, energy_features)
+        
+        energy_rows = [
+            {
+                'device_id': device_id,
+                'predicted_energy': float(value),
+                'prediction_date': prediction_date,
+                'prediction_hour': hour,
+                'created_at': created_at
+            }
+            for device_id, predicted in device_predictions
+            for value, prediction_date, hour in zip(predicted, horizon_dates, horizon_hours)
+        ]
+        predicted_device_ids = [device_id for device_id, _ in device_predictions]
+        
+        # Replace existing predictions for these dates and devices
+        if predicted_device_ids:
+            EnergyPrediction.query.filter(
+                EnergyPrediction.device_id.in_(predicted_device_ids),
+                EnergyPrediction.prediction_date.in_(prediction_dates)
+            ).delete(synchronize_session=False)
+            db.session.execute(db.insert(EnergyPrediction), energy_rows)
         
         # Generate peak demand predictions
-        model_path = 'models/peak_demand_model.pkl'
-        if os.path.exists(model_path):
-            model = joblib.load(model_path)
+        peak_rows = 0
+        model = model_store.get('models/peak_demand_model.pkl')
+        if model is not None:
+            predicted = model.predict(energy_features[PredictionController.PEAK_FEATURE_NAMES])
+            peak_rows = len(predicted)
             
-            for day in range(days_ahead):
-                prediction_date = (datetime.now() + timedelta(days=day)).date()
-                
-                # Delete existing predictions for this date
-                PeakDemandPrediction.query.filter_by(
-                    prediction_date=prediction_date
-                ).delete()
-                
-                # Generate hourly predictions
-                for hour in range(24):
-                    # Create feature DataFrame with proper column names
-                    features_dict = {
-                        'hour': [hour],
-                        'day_of_week': [prediction_date.weekday()],
-                        'month': [prediction_date.month]
-                    }
-                    features_df = pd.DataFrame(features_dict)
-                    
-                    # Make prediction
-                    predicted_peak = float(model.predict(features_df)[0])
-                    
-                    # Save prediction
-                    prediction = PeakDemandPrediction(
-                        predicted_peak_demand=predicted_peak,
-                        prediction_date=prediction_date,
-                        prediction_hour=hour
-                    )
-                    db.session.add(prediction)
+            PeakDemandPrediction.query.filter(
+                PeakDemandPrediction.prediction_date.in_(prediction_dates)
+            ).delete(synchronize_session=False)
+            db.session.execute(db.insert(PeakDemandPrediction), [
+                {
+                    'predicted_peak_demand': float(value),
+                    'prediction_date': prediction_date,
+                    'prediction_hour': hour,
+                    'created_at': created_at
+                }
+                for value, prediction_date, hour in zip(predicted, horizon_dates, horizon_hours)
+            ])
         
         db.session.commit()
-        return True
+        DashboardSnapshots.refresh()
+        response_cache.invalidate()
+        return len(energy_rows) + peak_rows
 
     @staticmethod
-    def get_all_predictions(start_date=None, end_date=None, device_ids=None):
-        """Get all predictions (energy and peak demand) for a date range and devices"""
+    def _predict_energy_per_device(device_ids, features):
+        """Predict the horizon with each device's own model, one call per device"""
+        results = []
+        for device_id in device_ids:
+            # Check if model exists
+            model_path = PredictionController.energy_model_path(device_id)
+            model = model_store.get(model_path)
+            if model is None:
+                # Train model if it doesn't exist
+                PredictionController.train_energy_prediction_model(device_id)
+                model = model_store.get(model_path)
+                if model is None:
+                    continue  # Skip if training failed
+            results.append((device_id, model.predict(features)))
+        return results
+    
+    @staticmethod
+    def _predict_energy_global(device_ids, horizon):
+        """Predict the horizon for every device with one call to the global model"""
+        model_path = PredictionController.GLOBAL_ENERGY_MODEL_PATH
+        if not device_ids:
+            return []
+        model = model_store.get(model_path)
+        if model is None:
+            PredictionController.train_global_energy_model()
+            model = model_store.get(model_path)
+            if model is None:
+                return []
+        
+        # One block of horizon rows per device
+        steps = len(horizon)
+        raw = horizon.iloc[np.tile(np.arange(steps), len(device_ids))].reset_index(drop=True)
+        raw['device_id'] = np.repeat(device_ids, steps)
+        features = FeaturePipeline.build(raw, 'global_energy', rated_power=PredictionController.device_rated_power())
+        
+        predicted = model.predict(features[PredictionController.GLOBAL_ENERGY_FEATURE_NAMES])
+        return list(zip(device_ids, predicted.reshape(len(device_ids), steps)))
+    
+    @staticmethod
+    def iter_all_predictions_json(start_date=None, end_date=None, device_ids=None, batch_size=1000):
+        """Yield all predictions (energy and peak demand) for a date range and devices as JSON text
+        
+        The document has start_date, end_date, devices, energy_predictions,
+        peak_demand_predictions and daily_summaries, in that order. Prediction
+        rows are encoded straight from server-side cursors `batch_size` at a
+        time while the daily summaries are totalled, and the summaries are
+        written last, so memory holds one batch and a few numbers per day and
+        device. Must be consumed inside an app context.
+        """
         if start_date is None:
             start_date = datetime.now().date()
         if end_date is None:
             end_date = start_date + timedelta(days=7)  # Default to a week ahead
-            
-        # Get energy predictions
-        energy_query = EnergyPrediction.query.filter(
+        
+        # Get device information for mapping
+        devices = {device.id: device.to_dict() for device in Device.query.all()}
+        yield (
+            f'{{"start_date":"{start_date.isoformat()}","end_date":"{end_date.isoformat()}",'
+            f'"devices":{json.dumps(devices, separators=(",", ":"))},"energy_predictions":'
+        )
+        
+        # Energy predictions nested as date -> device -> hour, totalled per day and device
+        energy_query = db.select(*PredictionController.ENERGY_PREDICTION_COLUMNS).where(
             EnergyPrediction.prediction_date >= start_date,
             EnergyPrediction.prediction_date <= end_date
         )
-        
         if device_ids:
-            energy_query = energy_query.filter(EnergyPrediction.device_id.in_(device_ids))
-            
-        energy_predictions = energy_query.order_by(
+            energy_query = energy_query.where(EnergyPrediction.device_id.in_(device_ids))
+        energy_query = energy_query.order_by(
             EnergyPrediction.prediction_date,
-            EnergyPrediction.prediction_hour,
-            EnergyPrediction.device_id
-        ).all()
+            EnergyPrediction.device_id,
+            EnergyPrediction.prediction_hour
+        )
+        totals = {}
+        
+        def energy_rows(result):
+            for pred in result:
+                date_str = pred.prediction_date.isoformat()
+                day_totals = totals.setdefault(date_str, {})
+                day_totals[pred.device_id] = day_totals.get(pred.device_id, 0) + pred.predicted_energy
+                yield date_str, pred.device_id, pred.prediction_hour, (
+                    f'{{"created_at":"{pred.created_at.isoformat()}Z",'
+                    f'"predicted_energy":{json.dumps(pred.predicted_energy)}}}'
+                )
         
-        # Get peak demand predictions
-        peak_query = PeakDemandPrediction.query.filter(
+        result = db.session.execute(energy_query.execution_options(yield_per=batch_size))
+        try:
+            yield from iter_nested_json_object(energy_rows(result), 3, batch_size)
+        finally:
+            result.close()
+        
+        # Peak demand predictions nested as date -> hour, keeping each day's peak
+        peak_query = db.select(*PredictionController.PEAK_PREDICTION_COLUMNS).where(
             PeakDemandPrediction.prediction_date >= start_date,
             PeakDemandPrediction.prediction_date <= end_date
-        )
-        
-        peak_predictions = peak_query.order_by(
+        ).order_by(
             PeakDemandPrediction.prediction_date,
             PeakDemandPrediction.prediction_hour
-        ).all()
-        
-        # Get device information for mapping
-        devices = {}
-        for device in Device.query.all():
-            devices[device.id] = device.to_dict()
-        
-        # Format data for mobile app
-        result = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat(),
-            'devices': devices,
-            'energy_predictions': {},
-            'peak_demand_predictions': {},
-            'daily_summaries': {}
-        }
-        
-        # Process energy predictions
-        for pred in energy_predictions:
-            date_str = pred.prediction_date.isoformat()
-            if date_str not in result['energy_predictions']:
-                result['energy_predictions'][date_str] = {}
-                
-            if pred.device_id not in result['energy_predictions'][date_str]:
-                result['energy_predictions'][date_str][pred.device_id] = {}
-                
-            result['energy_predictions'][date_str][pred.device_id][pred.prediction_hour] = {
-                'predicted_energy': pred.predicted_energy,
-                'created_at': pred.created_at.isoformat() + 'Z'
-            }
-        
-        # Process peak demand predictions
-        for pred in peak_predictions:
-            date_str = pred.prediction_date.isoformat()
-            if date_str not in result['peak_demand_predictions']:
-                result['peak_demand_predictions'][date_str] = {}
-                
-            result['peak_demand_predictions'][date_str][pred.prediction_hour] = {
-                'predicted_peak_demand': pred.predicted_peak_demand,
-                'created_at': pred.created_at.isoformat() + 'Z'
-            }
-        
-        # Generate daily summaries
-        for date_str in result['energy_predictions']:
-            result['daily_summaries'][date_str] = {
-                'total_energy': {},
-                'peak_demand': 0,
-                'peak_hour': 0
-            }
-            
-            # Calculate total energy per device
-            for device_id in result['energy_predictions'][date_str]:
-                device_total = sum(
-                    hour_data['predicted_energy'] 
-                    for hour_data in result['energy_predictions'][date_str][device_id].values()
-                )
-                result['daily_summaries'][date_str]['total_energy'][device_id] = device_total
-            
-            # Find peak demand hour
-            if date_str in result['peak_demand_predictions']:
-                peak_hour = max(
-                    result['peak_demand_predictions'][date_str].items(),
-                    key=lambda x: x[1]['predicted_peak_demand'],
-                    default=(0, {'predicted_peak_demand': 0})
+        )
+        peaks = {}
+        
+        def peak_rows(result):
+            for pred in result:
+                date_str = pred.prediction_date.isoformat()
+                if date_str not in peaks or pred.predicted_peak_demand > peaks[date_str][0]:
+                    peaks[date_str] = (pred.predicted_peak_demand, pred.prediction_hour)
+                yield date_str, pred.prediction_hour, (
+                    f'{{"created_at":"{pred.created_at.isoformat()}Z",'
+                    f'"predicted_peak_demand":{json.dumps(pred.predicted_peak_demand)}}}'
                 )
-                result['daily_summaries'][date_str]['peak_demand'] = peak_hour[1]['predicted_peak_demand']
-                result['daily_summaries'][date_str]['peak_hour'] = int(peak_hour[0])
         
-        return result
+        yield ',"peak_demand_predictions":'
+        result = db.session.execute(peak_query.execution_options(yield_per=batch_size))
+        try:
+            yield from iter_nested_json_object(peak_rows(result), 2, batch_size)
+        finally:
+            result.close()
+        
+        # Daily summaries for the days with energy predictions
+        summaries = {}
+        for date_str, day_totals in totals.items():
+            peak_demand, peak_hour = peaks.get(date_str, (0, 0))
+            summaries[date_str] = {
+                'total_energy': day_totals,
+                'peak_demand': peak_demand,
+                'peak_hour': int(peak_hour)
+            }
+        yield f',"daily_summaries":{json.dumps(summaries, separators=(",", ":"))}}}'
     
     @staticmethod
     def get_device_predictions_summary(device_id, start_date=None, end_date=None):
@@ -378,19 +628,19 @@ class PredictionController:
             end_date = start_date + timedelta(days=7)  # Default to a week ahead
             
         # Get device information
-        device = Device.query.get(device_id)
+        device = db.session.get(Device, device_id)
         if not device:
             return None
             
         # Get energy predictions for the device
-        energy_predictions = EnergyPrediction.query.filter(
+        energy_predictions = db.session.execute(db.select(*PredictionController.ENERGY_PREDICTION_COLUMNS).where(
             EnergyPrediction.device_id == device_id,
             EnergyPrediction.prediction_date >= start_date,
             EnergyPrediction.prediction_date <= end_date
         ).order_by(
             EnergyPrediction.prediction_date,
             EnergyPrediction.prediction_hour
-        ).all()
+        ))
         
         # Format data for mobile app
         result = {
@@ -432,13 +682,13 @@ class PredictionController:
             end_date = start_date + timedelta(days=7)  # Default to a week ahead
             
         # Get peak demand predictions
-        peak_predictions = PeakDemandPrediction.query.filter(
+        peak_predictions = db.session.execute(db.select(*PredictionController.PEAK_PREDICTION_COLUMNS).where(
             PeakDemandPrediction.prediction_date >= start_date,
             PeakDemandPrediction.prediction_date <= end_date
         ).order_by(
             PeakDemandPrediction.prediction_date,
             PeakDemandPrediction.prediction_hour
-        ).all()
+        ))
         
         # Format data for mobile app
         result = {
@@ -0,0 +1,29 @@
+from app import db
+from datetime import datetime
+
+class CacheGeneration(db.Model):
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)  # bumped whenever the cached data changes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<CacheGeneration {self.name} {self.generation}>"
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'generation': self.generation,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+        }
+
+class DashboardSnapshot(db.Model):
+    __tablename__ = 'dashboard_snapshots'
+    
+    snapshot_date = db.Column(db.Date, primary_key=True)
+    document = db.Column(db.Text, nullable=False)  # serialized /dashboard/overview response
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DashboardSnapshot {self.snapshot_date}>"
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class ConsumptionRecord(db.Model):
     __tablename__ = 'consumption_records'
+    __table_args__ = (
+        # Serves every per-device time-range query and the ingest dedupe
+        db.Index('ix_consumption_device_timestamp', 'device_id', 'reading_timestamp', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -15,13 +19,104 @@ class ConsumptionRecord(db.Model):
     def __repr__(self):
         return f"<ConsumptionRecord {self.id} for device {self.device_id}>"
     
+    def to_dict(self):
+        return ConsumptionRecord.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """API representation of a record or of a selected row with the same column names"""
+        return {
+            'id': row.id,
+            'Appliance_Info': row.device_id,
+            'Voltage': f"{row.voltage:.1f}",
+            'Current': f"{row.current:.2f}",
+            'TimeOn': f"{row.time_on:.2f}",
+            'ActiveEnergy': f"{row.active_energy:.4f}",
+            'Reading_Time_Stamp': row.reading_timestamp.isoformat() + 'Z'
+        }
+    
+    # row_to_dict as compact JSON with sorted keys, as jsonify writes it outside debug mode; filled
+    # with (active_energy, device_id, current, reading_timestamp.isoformat(), time_on, voltage, id)
+    JSON_TEMPLATE = (
+        '{"ActiveEnergy":"%.4f","Appliance_Info":%d,"Current":"%.2f",'
+        '"Reading_Time_Stamp":"%sZ","TimeOn":"%.2f","Voltage":"%.1f","id":%d}'
+    )
+
+class ConsumptionSyncCursor(db.Model):
+    __tablename__ = 'consumption_sync_cursors'
+    
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), primary_key=True)
+    last_reading_timestamp = db.Column(db.DateTime, nullable=False)
+    record_count = db.Column(db.Integer, nullable=False)  # upstream readings at or below the cursor
+    last_record_hash = db.Column(db.String(40), nullable=False)  # sha1 of the reading at the cursor
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ConsumptionSyncCursor device {self.device_id} at {self.last_reading_timestamp}>"
+    
+    def to_dict(self):
+        return {
+            'device_id': self.device_id,
+            'last_reading_timestamp': self.last_reading_timestamp.isoformat() + 'Z',
+            'record_count': self.record_count,
+            'last_record_hash': self.last_record_hash,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+        }
+
+class ConsumptionHourlyRollup(db.Model):
+    __tablename__ = 'consumption_hourly_rollups'
+    
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # start of the UTC hour
+    energy_sum = db.Column(db.Float, nullable=False)  # in kWh
+    max_power = db.Column(db.Float, nullable=False)  # in W (voltage * current)
+    reading_count = db.Column(db.Integer, nullable=False)
+    voltage_min = db.Column(db.Float, nullable=False)
+    voltage_max = db.Column(db.Float, nullable=False)
+    current_min = db.Column(db.Float, nullable=False)
+    current_max = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f"<ConsumptionHourlyRollup device {self.device_id} at {self.bucket_start}>"
+    
+    def to_dict(self):
+        return {
+            'device_id': self.device_id,
+            'bucket_start': self.bucket_start.isoformat() + 'Z',
+            'energy_sum': self.energy_sum,
+            'max_power': self.max_power,
+            'reading_count': self.reading_count,
+            'voltage_min': self.voltage_min,
+            'voltage_max': self.voltage_max,
+            'current_min': self.current_min,
+            'current_max': self.current_max
+        }
+
+class ConsumptionDailyRollup(db.Model):
+    __tablename__ = 'consumption_daily_rollups'
+    
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # midnight UTC
+    energy_sum = db.Column(db.Float, nullable=False)  # in kWh
+    max_power = db.Column(db.Float, nullable=False)  # in W (voltage * current)
+    reading_count = db.Column(db.Integer, nullable=False)
+    voltage_min = db.Column(db.Float, nullable=False)
+    voltage_max = db.Column(db.Float, nullable=False)
+    current_min = db.Column(db.Float, nullable=False)
+    current_max = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f"<ConsumptionDailyRollup device {self.device_id} on {self.bucket_start.date()}>"
+    
     def to_dict(self):
         return {
-            'id': self.id,
-            'Appliance_Info': self.device_id,
-            'Voltage': f"{self.voltage:.1f}",
-            'Current': f"{self.current:.2f}",
-            'TimeOn': f"{self.time_on:.2f}",
-            'ActiveEnergy': f"{self.active_energy:.4f}",
-            'Reading_Time_Stamp': self.reading_timestamp.isoformat() + 'Z'
+            'device_id': self.device_id,
+            'bucket_start': self.bucket_start.isoformat() + 'Z',
+            'energy_sum': self.energy_sum,
+            'max_power': self.max_power,
+            'reading_count': self.reading_count,
+            'voltage_min': self.voltage_min,
+            'voltage_max': self.voltage_max,
+            'current_min': self.current_min,
+            'current_max': self.current_max
         }
@@ -3,6 +3,11 @@ from datetime import datetime
 
 class EnergyPrediction(db.Model):
     __tablename__ = 'energy_predictions'
+    __table_args__ = (
+        db.Index('ix_energy_predictions_device_date_hour', 'device_id', 'prediction_date', 'prediction_hour', unique=True),
+        # Date-only lookups across all devices
+        db.Index('ix_energy_predictions_date_hour', 'prediction_date', 'prediction_hour'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -18,18 +23,26 @@ class EnergyPrediction(db.Model):
         return f"<EnergyPrediction for device {self.device_id} on {self.prediction_date} hour {self.prediction_hour}>"
     
     def to_dict(self):
+        return EnergyPrediction.row_to_dict(self, self.device.name if self.device else None)
+    
+    @staticmethod
+    def row_to_dict(row, device_name):
+        """API representation of a prediction or of a selected row with the same column names"""
         return {
-            'id': self.id,
-            'device_id': self.device_id,
-            'device_name': self.device.name if self.device else None,
-            'predicted_energy': self.predicted_energy,
-            'prediction_date': self.prediction_date.isoformat(),
-            'prediction_hour': self.prediction_hour,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'id': row.id,
+            'device_id': row.device_id,
+            'device_name': device_name,
+            'predicted_energy': row.predicted_energy,
+            'prediction_date': row.prediction_date.isoformat(),
+            'prediction_hour': row.prediction_hour,
+            'created_at': row.created_at.isoformat() + 'Z'
         }
 
 class PeakDemandPrediction(db.Model):
     __tablename__ = 'peak_demand_predictions'
+    __table_args__ = (
+        db.Index('ix_peak_demand_predictions_date_hour', 'prediction_date', 'prediction_hour', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     predicted_peak_demand = db.Column(db.Float, nullable=False)  # in kW
@@ -41,10 +54,15 @@ class PeakDemandPrediction(db.Model):
         return f"<PeakDemandPrediction on {self.prediction_date} hour {self.prediction_hour}>"
     
     def to_dict(self):
+        return PeakDemandPrediction.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """API representation of a prediction or of a selected row with the same column names"""
         return {
-            'id': self.id,
-            'predicted_peak_demand': self.predicted_peak_demand,
-            'prediction_date': self.prediction_date.isoformat(),
-            'prediction_hour': self.prediction_hour,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'id': row.id,
+            'predicted_peak_demand': row.predicted_peak_demand,
+            'prediction_date': row.prediction_date.isoformat(),
+            'prediction_hour': row.prediction_hour,
+            'created_at': row.created_at.isoformat() + 'Z'
         }
@@ -0,0 +1,63 @@
+from app import db
+import json
+
+class SchedulerLease(db.Model):
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)  # host:pid:nonce of the leading process
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # UTC; free for others to take after this
+    
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} held by {self.holder}>"
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'acquired_at': self.acquired_at.isoformat() + 'Z',
+            'renewed_at': self.renewed_at.isoformat() + 'Z',
+            'expires_at': self.expires_at.isoformat() + 'Z'
+        }
+
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started', 'job_name', 'started_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False)
+    holder = db.Column(db.String(255))  # process that ran it, as in SchedulerLease.holder
+    status = db.Column(db.String(20), nullable=False)  # 'success' or 'failed'
+    started_at = db.Column(db.DateTime, nullable=False)
+    duration_seconds = db.Column(db.Float, nullable=False)
+    items_processed = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    db_writes = db.Column(db.Integer, nullable=False, default=0)  # INSERT/UPDATE/DELETE statements
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    upstream_requests = db.Column(db.Integer, nullable=False, default=0)
+    upstream_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    details = db.Column(db.Text)  # JSON: failed items, error, job-specific summary
+    
+    def __repr__(self):
+        return f"<JobRun {self.job_name} at {self.started_at}: {self.status}>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'holder': self.holder,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() + 'Z',
+            'duration_seconds': self.duration_seconds,
+            'items_processed': self.items_processed,
+            'failures': self.failures,
+            'db_writes': self.db_writes,
+            'rows_written': self.rows_written,
+            'upstream_requests': self.upstream_requests,
+            'upstream_seconds': self.upstream_seconds,
+            'details': json.loads(self.details) if self.details else None
+        }
@@ -0,0 +1,132 @@
+from app.models.cache import DashboardSnapshot
+from app.models.device import Device
+from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app import db
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DashboardSnapshots:
+    """Precomputed /dashboard/overview documents, one per date
+    
+    An overview only changes when predictions are generated or devices
+    change, so it is built at those times for every date from today to the
+    last predicted one and stored as serialized JSON. A date without a
+    snapshot (e.g. after midnight, before the next generation run) is built
+    on its first request. Only dates from DASHBOARD_SNAPSHOT_RETENTION_DAYS
+    ago to the last predicted date are stored; other dates a client asks
+    for are built on every request, so requests cannot grow the table or
+    the cost of a refresh.
+    """
+    
+    @staticmethod
+    def get(day):
+        """Serialized overview for a date, building it if missing and storing it if kept"""
+        snapshot = db.session.get(DashboardSnapshot, day)
+        if snapshot is not None:
+            return snapshot.document
+        
+        overview = DashboardSnapshots.build_overview(day)
+        document = DashboardSnapshots.serialize(overview)
+        today = datetime.now().date()
+        retention = current_app.config.get('DASHBOARD_SNAPSHOT_RETENTION_DAYS', 30)
+        # A later date is kept only while it has predictions, i.e. up to the last predicted one
+        if day < today - timedelta(days=retention) or (day > today and not overview['hourly_predictions']):
+            return document
+        
+        db.session.add(DashboardSnapshot(snapshot_date=day, document=document))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same date first
+            db.session.rollback()
+        return document
+    
+    @staticmethod
+    def refresh():
+        """Rebuild the snapshots of today, later predicted dates and retained recent ones
+        
+        Snapshots outside that window are deleted.
+        """
+        today = datetime.now().date()
+        retention = current_app.config.get('DASHBOARD_SNAPSHOT_RETENTION_DAYS', 30)
+        last_predicted = max(db.session.query(db.func.max(EnergyPrediction.prediction_date)).scalar() or today, today)
+        DashboardSnapshot.query.filter(db.or_(
+            DashboardSnapshot.snapshot_date < today - timedelta(days=retention),
+            DashboardSnapshot.snapshot_date > last_predicted
+        )).delete(synchronize_session=False)
+        
+        dates = {today + timedelta(days=day) for day in range((last_predicted - today).days + 1)}
+        dates.update(day for (day,) in db.session.query(DashboardSnapshot.snapshot_date))
+        
+        for day in sorted(dates):
+            db.session.merge(DashboardSnapshot(
+                snapshot_date=day,
+                document=DashboardSnapshots.serialize(DashboardSnapshots.build_overview(day)),
+                generated_at=datetime.utcnow()
+            ))
+        db.session.commit()
+        logger.info(f"Refreshed {len(dates)} dashboard snapshots")
+    
+    @staticmethod
+    def serialize(overview):
+        """Encode an overview exactly as jsonify would"""
+        return current_app.json.response(overview).get_data(as_text=True)
+    
+    @staticmethod
+    def build_overview(day):
+        """Devices, predicted energy for `day` and the day after, and peak demand for `day`"""
+        tomorrow = day + timedelta(days=1)
+        devices = [device.to_dict() for device in Device.query.order_by(Device.id)]
+        
+        # {date: {device_id: {hour: predicted_energy}}}
+        energy = {day: {}, tomorrow: {}}
+        for prediction_date, device_id, hour, predicted_energy in db.session.execute(
+            db.select(
+                EnergyPrediction.prediction_date,
+                EnergyPrediction.device_id,
+                EnergyPrediction.prediction_hour,
+                EnergyPrediction.predicted_energy
+            ).where(
+                EnergyPrediction.prediction_date >= day,
+                EnergyPrediction.prediction_date <= tomorrow
+            ).order_by(
+                EnergyPrediction.prediction_date,
+                EnergyPrediction.prediction_hour,
+                EnergyPrediction.device_id
+            )
+        ):
+            energy[prediction_date].setdefault(device_id, {})[hour] = predicted_energy
+        
+        # Per-device daily totals first, then their sum
+        today_total = sum(sum(hours.values()) for hours in energy[day].values())
+        tomorrow_total = sum(sum(hours.values()) for hours in energy[tomorrow].values())
+        
+        peak_demand, peak_hour = 0, None
+        for hour, demand in db.session.execute(
+            db.select(PeakDemandPrediction.prediction_hour, PeakDemandPrediction.predicted_peak_demand)
+            .where(PeakDemandPrediction.prediction_date == day)
+            .order_by(PeakDemandPrediction.prediction_hour)
+        ):
+            if demand > peak_demand:
+                peak_demand, peak_hour = demand, hour
+        
+        hourly_predictions = {}
+        for device_id, hours in energy[day].items():
+            for hour, predicted_energy in hours.items():
+                hourly_predictions.setdefault(hour, {})[device_id] = predicted_energy
+        
+        return {
+            'date': day.isoformat(),
+            'devices_count': len(devices),
+            'today_predicted_energy': today_total,
+            'tomorrow_predicted_energy': tomorrow_total,
+            'energy_change_percentage': ((tomorrow_total - today_total) / max(today_total, 1)) * 100 if today_total > 0 else 0,
+            'peak_demand': peak_demand,
+            'peak_hour': peak_hour if peak_hour is not None else 0,
+            'devices': devices,
+            'hourly_predictions': hourly_predictions
+        }
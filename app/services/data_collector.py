@@ -1,7 +1,12 @@
-import requests
+from app.utils.http_client import http_client
 from app.controllers.device_controller import DeviceController
 from app.controllers.consumption_controller import ConsumptionController
+from app.models.device import Device
+from app import db
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
+import time
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -34,13 +39,142 @@ class DataCollector:
             return False
     
     @staticmethod
-    def sync_all_consumption(device_ids):
+    def sync_all_consumption(device_ids, concurrency=None):
         """Sync consumption data for all specified devices"""
-        success = True
-        for device_id in device_ids:
-            if not DataCollector.sync_device_consumption(device_id):
-                success = False
-        return success
+        report = DataCollector.sync_consumption_report(device_ids, concurrency)
+        return report['success']
+    
+    @staticmethod
+    def sync_consumption_report(device_ids, concurrency=None):
+        """Sync consumption data for the given devices and report per-device results
+        
+        With a concurrency above 1, downloads of devices that have a sync cursor
+        run on a bounded thread pool while this thread (the only one with a
+        database session) writes the results as they arrive. Devices without a
+        cursor need their whole history, which is streamed into the database
+        one device at a time instead of being held in memory.
+        """
+        if concurrency is None:
+            concurrency = current_app.config.get('CONSUMPTION_SYNC_CONCURRENCY', 1)
+        concurrency = max(1, min(concurrency, len(device_ids) or 1))
+        
+        started = time.perf_counter()
+        if concurrency == 1:
+            results = [DataCollector._sync_device_timed(device_id) for device_id in device_ids]
+        else:
+            results = DataCollector._sync_concurrently(device_ids, concurrency)
+        
+        report = {
+            'success': all(result['success'] for result in results),
+            'concurrency': concurrency,
+            'elapsed_seconds': time.perf_counter() - started,
+            'synced': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'new_records': sum(result['new_records'] or 0 for result in results),
+            'devices': results
+        }
+        logger.info(f"Consumption sync finished in {report['elapsed_seconds']:.2f}s: "
+                    f"{report['synced']} devices synced, {report['failed']} failed, "
+                    f"{report['new_records']} new records")
+        return report
+    
+    @staticmethod
+    def _sync_device_timed(device_id):
+        """Run the sequential sync for one device and time it"""
+        started = time.perf_counter()
+        success = DataCollector.sync_device_consumption(device_id)
+        return {
+            'device_id': device_id,
+            'success': bool(success),
+            'new_records': None,
+            'fetch_seconds': None,
+            'write_seconds': None,
+            'total_seconds': time.perf_counter() - started,
+            'error': None if success else 'sync failed'
+        }
+    
+    @staticmethod
+    def _sync_concurrently(device_ids, concurrency):
+        """Fetch synced devices on a thread pool and ingest results on this thread
+        
+        A worker only keeps the readings newer than its device's cursor, so the
+        pool never holds a full history. Devices never synced before are run
+        through the streaming sequential sync on this thread meanwhile.
+        """
+        known_ids = {device_id for (device_id,) in db.session.query(Device.id).filter(Device.id.in_(device_ids))}
+        chunk_size = current_app.config.get('CONSUMPTION_STREAM_CHUNK_SIZE', 65536)
+        results = {}
+        
+        def fetch(device_id, cursor_state):
+            started = time.perf_counter()
+            api_url = f"{DataCollector.CONSUMPTION_API_BASE_URL}/{device_id}"
+            rows, summary = ConsumptionController.fetch_new_rows(api_url, device_id, cursor_state, chunk_size)
+            return rows, summary, time.perf_counter() - started
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='consumption-sync') as executor:
+            futures = {}
+            first_syncs = []
+            for device_id in device_ids:
+                if device_id not in known_ids:
+                    results[device_id] = DataCollector._device_result(device_id, error='device not found')
+                    continue
+                cursor_state = ConsumptionController.get_sync_cursor_state(device_id)
+                if cursor_state is None:
+                    first_syncs.append(device_id)
+                    continue
+                futures[executor.submit(fetch, device_id, cursor_state)] = (device_id, cursor_state)
+            
+            for device_id in first_syncs:
+                results[device_id] = DataCollector._sync_device_timed(device_id)
+            
+            for future in as_completed(futures):
+                device_id, cursor_state = futures[future]
+                try:
+                    rows, summary, fetch_seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching consumption data for device {device_id}: {str(e)}")
+                    results[device_id] = DataCollector._device_result(device_id, error=str(e))
+                    continue
+                
+                started = time.perf_counter()
+                try:
+                    if ConsumptionController.cursor_matches(cursor_state, summary):
+                        count = ConsumptionController.ingest_new_rows(device_id, rows, summary)
+                    else:
+                        logger.warning(f"Upstream history for device {device_id} changed below the sync cursor, running a full resync")
+                        api_url = f"{DataCollector.CONSUMPTION_API_BASE_URL}/{device_id}"
+                        if not ConsumptionController.sync_consumption_from_api(api_url, device_id, full_resync=True):
+                            raise RuntimeError('full resync failed')
+                        count = None
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error writing consumption data for device {device_id}: {str(e)}")
+                    results[device_id] = DataCollector._device_result(
+                        device_id, fetch_seconds=fetch_seconds, error=str(e)
+                    )
+                    continue
+                
+                results[device_id] = DataCollector._device_result(
+                    device_id,
+                    new_records=count,
+                    fetch_seconds=fetch_seconds,
+                    write_seconds=time.perf_counter() - started
+                )
+        
+        return [results[device_id] for device_id in device_ids]
+    
+    @staticmethod
+    def _device_result(device_id, new_records=None, fetch_seconds=None, write_seconds=None, error=None):
+        """Build one per-device entry of a sync report"""
+        return {
+            'device_id': device_id,
+            'success': error is None,
+            'new_records': new_records,
+            'fetch_seconds': fetch_seconds,
+            'write_seconds': write_seconds,
+            'total_seconds': (fetch_seconds or 0) + (write_seconds or 0),
+            'error': error
+        }
     
     @staticmethod
     def get_total_consumption(device_ids, days=30):
@@ -59,9 +193,7 @@ class DataCollector:
             
             logger.info(f"Getting total consumption from {api_url}")
             
-            response = requests.get(api_url)
-            response.raise_for_status()
-            return response.json()
+            return http_client.get_json(api_url)
         except Exception as e:
             logger.error(f"Error getting total consumption: {str(e)}")
             return []
@@ -0,0 +1,169 @@
+from app.models.consumption import ConsumptionRecord
+from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app.utils.helpers import to_utc_naive
+from app import db
+from flask import current_app
+from datetime import date, datetime
+import numpy as np
+import csv
+import io
+import os
+import zipfile
+
+class DataExport:
+    """Bulk export of readings and predictions for analysis
+    
+    Rows are read as plain tuples from a server-side cursor, a batch at a
+    time, without building ORM objects or per-field strings. CSV is
+    written while rows arrive. NumPy exports hold one device's columns at a
+    time and write one .npz per device (a single file for the fleet-wide
+    peak demand predictions).
+    """
+    # Exported columns per dataset; rows are ordered by device, then by time
+    DATASETS = {
+        'consumption': (
+            ConsumptionRecord,
+            ('device_id', 'reading_timestamp', 'voltage', 'current', 'time_on', 'active_energy')
+        ),
+        'energy_predictions': (
+            EnergyPrediction,
+            ('device_id', 'prediction_date', 'prediction_hour', 'predicted_energy')
+        ),
+        'peak_demand_predictions': (
+            PeakDemandPrediction,
+            ('prediction_date', 'prediction_hour', 'predicted_peak_demand')
+        )
+    }
+    FORMATS = ('csv', 'npz')
+    
+    @staticmethod
+    def columns(dataset):
+        return DataExport.DATASETS[dataset][1]
+    
+    @staticmethod
+    def query(dataset, device_ids=None, start_date=None, end_date=None):
+        """Select a dataset's export columns, filtered by device and an inclusive date range"""
+        if dataset not in DataExport.DATASETS:
+            raise ValueError(f"Unknown dataset '{dataset}'")
+        
+        model, columns = DataExport.DATASETS[dataset]
+        query = db.select(*[getattr(model, column) for column in columns])
+        
+        if device_ids and 'device_id' in columns:
+            query = query.where(model.device_id.in_(device_ids))
+        
+        if model is ConsumptionRecord:
+            timestamp = ConsumptionRecord.reading_timestamp
+            if start_date:
+                query = query.where(timestamp >= to_utc_naive(start_date))
+            if end_date:
+                query = query.where(timestamp <= to_utc_naive(end_date))
+            order = [timestamp]
+        else:
+            if start_date:
+                query = query.where(model.prediction_date >= DataExport._as_date(start_date))
+            if end_date:
+                query = query.where(model.prediction_date <= DataExport._as_date(end_date))
+            order = [model.prediction_date, model.prediction_hour]
+        
+        if 'device_id' in columns:
+            order.insert(0, model.device_id)
+        return query.order_by(*order)
+    
+    @staticmethod
+    def iter_batches(query, batch_size=None):
+        """Yield lists of row tuples from a server-side cursor"""
+        if batch_size is None:
+            batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 5000)
+        
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        try:
+            for rows in result.partitions():
+                yield rows
+        finally:
+            result.close()
+    
+    @staticmethod
+    def iter_csv(dataset, device_ids=None, start_date=None, end_date=None, batch_size=None):
+        """Yield a CSV document (header first) one batch of rows at a time"""
+        query = DataExport.query(dataset, device_ids, start_date, end_date)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(DataExport.columns(dataset))
+        
+        for rows in DataExport.iter_batches(query, batch_size):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    @staticmethod
+    def iter_device_arrays(dataset, device_ids=None, start_date=None, end_date=None, batch_size=None):
+        """Yield (device_id, {column: ndarray}) per device; device_id is None for fleet-wide data"""
+        query = DataExport.query(dataset, device_ids, start_date, end_date)
+        model, columns = DataExport.DATASETS[dataset]
+        by_device = 'device_id' in columns
+        current, rows = None, []
+        for batch in DataExport.iter_batches(query, batch_size):
+            for row in batch:
+                if by_device and row[0] != current:
+                    if rows:
+                        yield current, DataExport._to_arrays(model, columns, rows)
+                    current, rows = row[0], []
+                rows.append(row)
+        
+        if rows:
+            yield current, DataExport._to_arrays(model, columns, rows)
+    
+    @staticmethod
+    def npz_name(dataset, device_id):
+        if device_id is None:
+            return f"{dataset}.npz"
+        return f"{dataset}_device_{device_id}.npz"
+    
+    @staticmethod
+    def write_npz_dir(directory, dataset, device_ids=None, start_date=None, end_date=None):
+        """Write one .npz per device into a directory and return the paths written"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for device_id, arrays in DataExport.iter_device_arrays(dataset, device_ids, start_date, end_date):
+            path = os.path.join(directory, DataExport.npz_name(dataset, device_id))
+            np.savez(path, **arrays)
+            paths.append(path)
+        return paths
+    
+    @staticmethod
+    def write_npz_zip(fileobj, dataset, device_ids=None, start_date=None, end_date=None):
+        """Write one .npz per device into a zip archive and return how many were written"""
+        count = 0
+        # The .npz members are already zip archives of raw arrays, so store them as is
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_STORED) as archive:
+            for device_id, arrays in DataExport.iter_device_arrays(dataset, device_ids, start_date, end_date):
+                member = io.BytesIO()
+                np.savez(member, **arrays)
+                archive.writestr(DataExport.npz_name(dataset, device_id), member.getvalue())
+                count += 1
+        return count
+    
+    @staticmethod
+    def _to_arrays(model, columns, rows):
+        """Turn row tuples into one typed array per column"""
+        arrays = {}
+        for index, column in enumerate(columns):
+            values = [row[index] for row in rows]
+            python_type = model.__table__.c[column].type.python_type
+            if python_type is datetime:
+                arrays[column] = np.array(values, dtype='datetime64[s]')
+            elif python_type is date:
+                arrays[column] = np.array(values, dtype='datetime64[D]')
+            elif python_type is int:
+                arrays[column] = np.array(values, dtype=np.int64)
+            else:
+                arrays[column] = np.array(values, dtype=np.float64)
+        return arrays
+    
+    @staticmethod
+    def _as_date(value):
+        return value.date() if isinstance(value, datetime) else value
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+class FeaturePipeline:
+    """Columnar feature extraction shared by training, backtesting and inference
+    
+    Every path goes through `build`: raw readings (API dicts or DB rows) are
+    normalised with vectorised datetime/numeric conversion, rows that fail to
+    convert are dropped with a mask, and model features are derived per column.
+    """
+    ENERGY_FEATURE_NAMES = ['hour', 'day_of_week', 'month', 'time_on', 'current', 'voltage']
+    PEAK_FEATURE_NAMES = ['hour', 'day_of_week', 'month']
+    # Global model: one estimator for the fleet, told apart by device features
+    GLOBAL_ENERGY_FEATURE_NAMES = ENERGY_FEATURE_NAMES + ['device_id', 'rated_power_w']
+    
+    RAW_COLUMNS = ['device_id', 'reading_timestamp', 'voltage', 'current', 'time_on', 'active_energy']
+    NUMERIC_COLUMNS = ['voltage', 'current', 'time_on', 'active_energy']
+    
+    # External API field names for each raw column
+    API_FIELDS = {
+        'Reading_Time_Stamp': 'reading_timestamp',
+        'Voltage': 'voltage',
+        'Current': 'current',
+        'TimeOn': 'time_on',
+        'ActiveEnergy': 'active_energy'
+    }
+    
+    @staticmethod
+    def build(raw, kind='energy', device_id=None, rated_power=None):
+        """Turn raw readings into a model-ready frame
+        
+        kind='energy' keeps one row per reading with ENERGY_FEATURE_NAMES (plus
+        'active_energy' when present); kind='global_energy' adds the device
+        features in GLOBAL_ENERGY_FEATURE_NAMES, using `rated_power` (device id
+        to watts); kind='peak' sums power per (hour, day_of_week, month) with
+        PEAK_FEATURE_NAMES and 'power'.
+        """
+        frame = FeaturePipeline.normalize(raw, device_id)
+        
+        if kind == 'energy':
+            return FeaturePipeline.energy_features(frame)
+        if kind == 'global_energy':
+            return FeaturePipeline.global_energy_features(frame, rated_power or {})
+        if kind == 'peak':
+            return FeaturePipeline.peak_features(frame)
+        raise ValueError(f"Unknown feature set: {kind}")
+    
+    @staticmethod
+    def normalize(raw, device_id=None):
+        """Coerce raw readings to typed RAW_COLUMNS, dropping rows that don't convert
+        
+        Accepts a DataFrame with RAW_COLUMNS (as read from consumption_records) or
+        an iterable of external API records. Timestamps become naive UTC.
+        """
+        if isinstance(raw, pd.DataFrame):
+            frame = raw.copy()
+        else:
+            frame = pd.DataFrame.from_records(list(raw), columns=list(FeaturePipeline.API_FIELDS))
+            frame = frame.rename(columns=FeaturePipeline.API_FIELDS)
+        
+        if device_id is not None:
+            frame['device_id'] = device_id
+        
+        frame['reading_timestamp'] = FeaturePipeline.to_utc_timestamps(frame['reading_timestamp'])
+        
+        valid = frame['reading_timestamp'].notna().to_numpy()
+        for column in FeaturePipeline.NUMERIC_COLUMNS:
+            if column in frame:
+                frame[column] = FeaturePipeline.to_float(frame[column])
+                valid &= frame[column].notna().to_numpy()
+        
+        if not valid.all():
+            frame = frame[valid]
+        return frame.reset_index(drop=True)
+    
+    @staticmethod
+    def to_utc_timestamps(values):
+        """Parse a timestamp column to naive UTC datetime64, unparseable values become NaT"""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            if getattr(values.dt, 'tz', None) is not None:
+                return values.dt.tz_convert('UTC').dt.tz_localize(None)
+            return values
+        
+        # The API always sends UTC with a 'Z' suffix. Stripping it and parsing as
+        # naive is several times faster than offset-aware parsing; the check and
+        # strip run on a fixed-width unicode array to avoid per-string Python calls.
+        try:
+            text = np.asarray(values.to_numpy(), dtype=str)
+        except (TypeError, ValueError):
+            text = None
+        if text is not None and len(text) and text.dtype.itemsize:
+            codes = text.view(np.uint32).reshape(len(text), -1)
+            last = np.count_nonzero(codes, axis=1) - 1
+            rows = np.arange(len(text))
+            if (last >= 0).all() and (codes[rows, last] == ord('Z')).all():
+                codes[rows, last] = 0
+                return pd.Series(
+                    pd.to_datetime(text, format='ISO8601', errors='coerce'),
+                    index=values.index
+                )
+        
+        parsed = pd.to_datetime(values, utc=True, format='ISO8601', errors='coerce')
+        return parsed.dt.tz_localize(None)
+    
+    @staticmethod
+    def to_float(values):
+        """Convert a column to float64, unparseable values become NaN"""
+        try:
+            return values.astype(np.float64)
+        except (ValueError, TypeError):
+            return pd.to_numeric(values, errors='coerce').astype(np.float64)
+    
+    @staticmethod
+    def add_calendar_features(frame):
+        """Add hour / day_of_week / month columns from reading_timestamp"""
+        timestamps = frame['reading_timestamp'].dt
+        frame['hour'] = timestamps.hour.astype(np.int64)
+        frame['day_of_week'] = timestamps.dayofweek.astype(np.int64)
+        frame['month'] = timestamps.month.astype(np.int64)
+        return frame
+    
+    @staticmethod
+    def energy_features(frame):
+        """Per-reading features for the energy model"""
+        frame = FeaturePipeline.add_calendar_features(frame)
+        columns = list(FeaturePipeline.ENERGY_FEATURE_NAMES)
+        if 'active_energy' in frame:
+            columns.append('active_energy')
+        return frame[columns]
+    
+    @staticmethod
+    def global_energy_features(frame, rated_power):
+        """Per-reading features for the fleet-wide energy model"""
+        frame = FeaturePipeline.add_calendar_features(frame)
+        frame['device_id'] = frame['device_id'].astype(np.int64)
+        frame['rated_power_w'] = frame['device_id'].map(rated_power).fillna(0).astype(np.float64)
+        columns = list(FeaturePipeline.GLOBAL_ENERGY_FEATURE_NAMES)
+        if 'active_energy' in frame:
+            columns.append('active_energy')
+        return frame[columns]
+    
+    @staticmethod
+    def peak_features(frame):
+        """Total power in kW (P = V * I) per calendar slot for the peak demand model"""
+        frame = FeaturePipeline.add_calendar_features(frame)
+        frame['power'] = (frame['voltage'] * frame['current']) / 1000
+        return frame.groupby(FeaturePipeline.PEAK_FEATURE_NAMES, as_index=False)['power'].sum()
+    
+    @staticmethod
+    def horizon_frame(start_date, days_ahead, time_on=120, current=0.5, voltage=220):
+        """Raw-shaped rows for every hour of the prediction horizon
+        
+        Measurement columns are filled with the assumed operating point used for
+        forecasting, so the result can go through `build` like real readings.
+        """
+        timestamps = pd.date_range(pd.Timestamp(start_date), periods=days_ahead * 24, freq='h')
+        return pd.DataFrame({
+            'reading_timestamp': timestamps,
+            'time_on': float(time_on),
+            'current': float(current),
+            'voltage': float(voltage)
+        })
@@ -0,0 +1,179 @@
+from app.models.scheduler import JobRun
+from app.services.leader_election import leader_election
+from app.utils.metrics import metrics, format_labels, format_value
+from app import db
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The run being recorded on each thread, so DB writes are counted for the job that made them
+_local = threading.local()
+
+class JobRecorder:
+    """What one job run did, filled in by the job while it runs"""
+    
+    def __init__(self, job_name):
+        self.job_name = job_name
+        self.success = True
+        self.items = 0
+        self.failed = []  # [{'item': ..., 'error': ...}]
+        self.details = {}
+        self.db_writes = 0
+        self.rows_written = 0
+    
+    def add_items(self, count):
+        self.items += count or 0
+    
+    def add_failure(self, item, error):
+        """Record one item (e.g. a device) that failed without failing the whole run"""
+        self.failed.append({'item': item, 'error': error})
+    
+    def fail(self, error):
+        """Mark the whole run as failed"""
+        self.success = False
+        self.details['error'] = error
+
+class JobRuns:
+    """Reports of scheduled job runs, kept in job_runs and exported as metrics
+    
+    Jobs only run in the scheduler leader, so the in-process job metrics of
+    any other worker stay empty; the latest run of each job is therefore
+    also exported from the table, which every worker can read.
+    """
+    
+    @staticmethod
+    @contextmanager
+    def record(job_name):
+        """Time a job run, count its DB writes and upstream requests, and store the report
+        
+        Use inside an app context:
+            
+            with JobRuns.record('sync_consumption') as run:
+                run.add_items(new_records)
+        
+        An exception marks the run failed and is re-raised once it is stored.
+        Upstream requests are those the whole process made during the run.
+        """
+        if not event.contains(db.engine, 'after_cursor_execute', count_job_write):
+            event.listen(db.engine, 'after_cursor_execute', count_job_write)
+        
+        run = JobRecorder(job_name)
+        upstream_count, upstream_seconds = metrics.totals('energy_upstream_request_duration_seconds')
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        _local.run = run
+        try:
+            yield run
+        except Exception as e:
+            run.fail(str(e))
+            raise
+        finally:
+            _local.run = None
+            duration = time.perf_counter() - started
+            count, seconds = metrics.totals('energy_upstream_request_duration_seconds')
+            JobRuns._store(run, started_at, duration, count - upstream_count, seconds - upstream_seconds)
+    
+    @staticmethod
+    def recent(job_name=None, limit=20):
+        """The latest runs, newest first, optionally of one job"""
+        query = JobRun.query
+        if job_name:
+            query = query.filter(JobRun.job_name == job_name)
+        return [run.to_dict() for run in query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)]
+    
+    @staticmethod
+    def latest_per_job():
+        """The most recent run of each job"""
+        latest = db.select(
+            JobRun.job_name, db.func.max(JobRun.started_at).label('started_at')
+        ).group_by(JobRun.job_name).subquery()
+        return JobRun.query.join(
+            latest, db.and_(JobRun.job_name == latest.c.job_name, JobRun.started_at == latest.c.started_at)
+        ).order_by(JobRun.job_name).all()
+    
+    @staticmethod
+    def render_metrics():
+        """Gauges for the latest run of each job, in the Prometheus text format"""
+        gauges = {
+            'energy_job_last_run_timestamp_seconds': ('Start of the latest run of each job, by job and status', []),
+            'energy_job_last_duration_seconds': ('Run time of the latest run of each job', []),
+            'energy_job_last_items_processed': ('Items processed by the latest run of each job', []),
+            'energy_job_last_failures': ('Items that failed in the latest run of each job', [])
+        }
+        for run in JobRuns.latest_per_job():
+            labels = (('job', run.job_name),)
+            started = (run.started_at - datetime(1970, 1, 1)).total_seconds()
+            gauges['energy_job_last_run_timestamp_seconds'][1].append((labels + (('status', run.status),), started))
+            gauges['energy_job_last_duration_seconds'][1].append((labels, run.duration_seconds))
+            gauges['energy_job_last_items_processed'][1].append((labels, run.items_processed))
+            gauges['energy_job_last_failures'][1].append((labels, run.failures))
+        
+        lines = []
+        for name, (help, samples) in gauges.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _store(run, started_at, duration, upstream_requests, upstream_seconds):
+        status = 'success' if run.success else 'failed'
+        metrics.increment('energy_job_runs_total', job=run.job_name, status=status)
+        metrics.observe('energy_job_duration_seconds', duration, job=run.job_name)
+        metrics.increment('energy_job_items_total', run.items, job=run.job_name)
+        metrics.increment('energy_job_failures_total', len(run.failed), job=run.job_name)
+        metrics.increment('energy_job_db_writes_total', run.db_writes, job=run.job_name)
+        metrics.increment('energy_job_rows_written_total', run.rows_written, job=run.job_name)
+        
+        details = dict(run.details)
+        if run.failed:
+            details['failed'] = run.failed
+        retention = current_app.config.get('JOB_RUN_RETENTION_DAYS', 30)
+        try:
+            if not run.success:
+                # Whatever the job left unfinished
+                db.session.rollback()
+            JobRun.query.filter(
+                JobRun.started_at < datetime.utcnow() - timedelta(days=retention)
+            ).delete(synchronize_session=False)
+            db.session.add(JobRun(
+                job_name=run.job_name,
+                holder=leader_election.holder,
+                status=status,
+                started_at=started_at,
+                duration_seconds=duration,
+                items_processed=run.items,
+                failures=len(run.failed),
+                db_writes=run.db_writes,
+                rows_written=run.rows_written,
+                upstream_requests=upstream_requests,
+                upstream_seconds=upstream_seconds,
+                details=json.dumps(details, default=str) if details else None
+            ))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Could not store the report of {run.job_name}: {str(e)}")
+        
+        logger.info(f"Job {run.job_name} {status} in {duration:.2f}s: {run.items} items, "
+                    f"{len(run.failed)} failures, {run.db_writes} DB writes ({run.rows_written} rows), "
+                    f"{upstream_requests} upstream requests")
+
+
+def count_job_write(conn, cursor, statement, parameters, context, executemany):
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return
+    verb = statement.lstrip()[:6].upper()
+    if verb in ('INSERT', 'UPDATE', 'DELETE'):
+        run.db_writes += 1
+        if cursor.rowcount > 0:
+            run.rows_written += cursor.rowcount
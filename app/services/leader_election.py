@@ -0,0 +1,204 @@
+from app.models.scheduler import SchedulerLease
+from app import db
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class LeaderElection:
+    """Elects the one process that runs the scheduled jobs
+    
+    Every web worker (gunicorn, Passenger, the debug reloader) imports run.py
+    and starts a scheduler, so without this each job runs once per process.
+    Modes:
+    
+    - 'db': a scheduler_leases row names the leader and when its lease
+      expires. The leader renews it every heartbeat; if it stops (crash,
+      shutdown, lost host), another process takes over once the lease
+      expires. Works across hosts sharing the database, as long as their
+      clocks agree to well within the lease TTL.
+    - 'file': an exclusive flock on a lock file, released by the OS when
+      the holder exits. One host only. It is the default with SQLite, where
+      every process is on one host and heartbeat writes would contend for
+      the database lock.
+    - 'off': every process leads (single-process deployments).
+    """
+    NAME = 'scheduler'
+    
+    def __init__(self, mode='off', ttl=90, lock_path=None):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._holder = None
+        self._lock_file = None
+        self._expires_at = None
+        self.configure(mode, ttl, lock_path)
+    
+    def configure(self, mode='off', ttl=90, lock_path=None):
+        if mode == 'file' and fcntl is None:
+            logger.warning("File locks are not available on this platform, electing the scheduler leader through the database")
+            mode = 'db'
+        self.mode = mode
+        self.ttl = ttl
+        self.lock_path = lock_path
+    
+    @property
+    def holder(self):
+        """Identity of this process; renewed after a fork so workers never share it"""
+        self._check_fork()
+        return self._holder
+    
+    def acquire(self):
+        """Take or renew leadership and return whether this process leads
+        
+        Needs an app context in 'db' mode.
+        """
+        with self._lock:
+            self._check_fork()
+            if self.mode == 'off':
+                return True
+            if self.mode == 'file':
+                return self._acquire_file()
+            return self._acquire_db()
+    
+    def is_leader(self):
+        """Whether this process held the lease at its last acquire and it has not expired since"""
+        self._check_fork()
+        if self.mode == 'off':
+            return True
+        if self.mode == 'file':
+            return self._lock_file is not None
+        return self._expires_at is not None and datetime.utcnow() < self._expires_at
+    
+    def release(self):
+        """Give up leadership so a standby process can take over without waiting for expiry"""
+        with self._lock:
+            self._check_fork()
+            if self.mode == 'file' and self._lock_file is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                self._lock_file.close()
+                self._lock_file = None
+                logger.info("Released the scheduler lock file")
+            elif self.mode == 'db' and self._expires_at is not None:
+                table = SchedulerLease.__table__
+                try:
+                    db.session.execute(
+                        table.update().where(table.c.name == self.NAME, table.c.holder == self._holder)
+                        .values(expires_at=datetime.utcnow())
+                    )
+                    db.session.commit()
+                    logger.info("Released the scheduler lease")
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    logger.warning(f"Could not release the scheduler lease: {str(e)}")
+                self._expires_at = None
+    
+    def status(self):
+        """This process's view of the election, and the current lease in 'db' mode"""
+        status = {
+            'mode': self.mode,
+            'holder': self.holder,
+            'is_leader': self.is_leader(),
+            'ttl': self.ttl
+        }
+        if self.mode == 'db':
+            lease = db.session.get(SchedulerLease, self.NAME)
+            status['lease'] = lease.to_dict() if lease else None
+        elif self.mode == 'file':
+            status['lock_path'] = self.lock_path
+        return status
+    
+    def _acquire_db(self):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        table = SchedulerLease.__table__
+        try:
+            # Renew our own lease or take over an expired one in a single statement,
+            # so two processes can never both see themselves as the new leader
+            taken = db.session.execute(
+                table.update().where(
+                    table.c.name == self.NAME,
+                    db.or_(table.c.holder == self._holder, table.c.expires_at < now)
+                ).values(
+                    holder=self._holder,
+                    acquired_at=db.case((table.c.holder == self._holder, table.c.acquired_at), else_=now),
+                    renewed_at=now,
+                    expires_at=expires_at
+                )
+            ).rowcount == 1
+            if not taken and db.session.get(SchedulerLease, self.NAME) is None:
+                db.session.add(SchedulerLease(
+                    name=self.NAME, holder=self._holder, acquired_at=now, renewed_at=now, expires_at=expires_at
+                ))
+                taken = True
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # Includes losing the race to insert the first lease
+            db.session.rollback()
+            logger.warning(f"Could not acquire the scheduler lease: {str(e)}")
+            taken = False
+        
+        was_leader = self._expires_at is not None
+        self._expires_at = expires_at if taken else None
+        if taken and not was_leader:
+            logger.info(f"{self._holder} is now the scheduler leader")
+        elif was_leader and not taken:
+            logger.warning(f"{self._holder} lost the scheduler lease")
+        return taken
+    
+    def _acquire_file(self):
+        if self._lock_file is not None:
+            return True
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(self._holder + '\n')
+        lock_file.flush()
+        self._lock_file = lock_file
+        logger.info(f"{self._holder} is now the scheduler leader (lock file {self.lock_path})")
+        return True
+    
+    def _check_fork(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        if self._lock_file is not None:
+            # The parent's lock stays with the parent; closing our copy leaves it held
+            self._lock_file.close()
+            self._lock_file = None
+        self._pid = pid
+        self._holder = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+        self._expires_at = None
+
+
+leader_election = LeaderElection()
+
+
+def configure_leader_election(app):
+    """Apply the app's SCHEDULER_LEADER_ELECTION and lease settings to the shared election"""
+    mode = app.config.get('SCHEDULER_LEADER_ELECTION', 'auto')
+    if mode == 'auto':
+        database_uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        mode = 'file' if database_uri.startswith('sqlite') else 'db'
+    leader_election.configure(
+        mode=mode,
+        ttl=app.config.get('SCHEDULER_LEASE_TTL', 90),
+        lock_path=app.config.get('SCHEDULER_LOCK_FILE') or os.path.join(app.instance_path, 'scheduler.lock')
+    )
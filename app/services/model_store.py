@@ -0,0 +1,176 @@
+from collections import OrderedDict
+import joblib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ModelStore:
+    """Size-bounded LRU cache of loaded model artifacts
+    
+    Entries are keyed by path and remember the file version (mtime + size)
+    they were loaded from, so a retrained model is picked up on the next call
+    and unchanged files are never deserialized twice. With mmap_mode='r',
+    numpy arrays inside uncompressed artifacts are memory-mapped instead of
+    read into memory. `compress` (0-9) is the joblib compression level used
+    when saving; compressed artifacts cannot be memory-mapped.
+    """
+    
+    def __init__(self, max_entries=64, mmap_mode=None, compress=0):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (version, model)
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'evictions': 0,
+            'load_seconds': 0.0
+        }
+        self.configure(max_entries, mmap_mode, compress)
+    
+    def configure(self, max_entries=64, mmap_mode=None, compress=0):
+        self.max_entries = max(1, max_entries)
+        self.mmap_mode = mmap_mode or None
+        self.compress = compress
+        with self._lock:
+            self._evict()
+    
+    def settings(self):
+        """Keyword arguments for `configure` that reproduce this store's settings elsewhere"""
+        return {'max_entries': self.max_entries, 'mmap_mode': self.mmap_mode, 'compress': self.compress}
+    
+    @staticmethod
+    def _version(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def exists(self, path):
+        """Whether a model artifact is present on disk"""
+        return self._version(path) is not None
+    
+    def get(self, path):
+        """Return the model stored at path, loading it only if the file changed
+        
+        Returns None when the file does not exist.
+        """
+        version = self._version(path)
+        if version is None:
+            self.invalidate(path)
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+            if entry is not None:
+                self._stats['reloads'] += 1
+        
+        # Deserialize outside the lock so other models stay available meanwhile
+        started = time.perf_counter()
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        elapsed = time.perf_counter() - started
+        
+        with self._lock:
+            self._stats['load_seconds'] += elapsed
+            self._entries[path] = (version, model)
+            self._entries.move_to_end(path)
+            self._evict()
+        logger.debug(f"Loaded model {path} in {elapsed:.3f}s")
+        return model
+    
+    def load(self, path):
+        """Deserialize a private copy of a model, bypassing the cache
+        
+        For callers that modify the model, since cached instances are shared
+        with concurrent predictions.
+        """
+        return joblib.load(path)
+    
+    def save(self, path, model, metadata=None):
+        """Write a model artifact atomically and cache it under its new version
+        
+        `metadata` (a JSON-serialisable dict) is written to a sidecar file
+        after the model, see `load_metadata`.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Readers never see a half-written file
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        joblib.dump(model, tmp_path, compress=self.compress)
+        os.replace(tmp_path, path)
+        
+        if metadata is not None:
+            metadata_path = self.metadata_path(path)
+            tmp_path = f"{metadata_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, 'w') as f:
+                json.dump(metadata, f, default=str)
+            os.replace(tmp_path, metadata_path)
+        
+        version = self._version(path)
+        with self._lock:
+            if self.mmap_mode:
+                # Reload on next use so arrays come back memory-mapped
+                self._entries.pop(path, None)
+            else:
+                self._entries[path] = (version, model)
+                self._entries.move_to_end(path)
+                self._evict()
+    
+    @staticmethod
+    def metadata_path(path):
+        """Sidecar file holding a model's training metadata"""
+        return os.path.splitext(path)[0] + '.json'
+    
+    def load_metadata(self, path):
+        """Training metadata saved with a model, or None if there is none"""
+        try:
+            with open(self.metadata_path(path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def invalidate(self, path=None):
+        """Drop one cached model, or all of them"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+    
+    def stats(self):
+        """Hit/miss/reload/eviction counters and current occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['mmap_mode'] = self.mmap_mode
+        stats['compress'] = self.compress
+        return stats
+    
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+
+model_store = ModelStore()
+
+
+def configure_model_store(app):
+    """Apply the app's MODEL_* storage settings to the shared store"""
+    model_store.configure(
+        max_entries=app.config.get('MODEL_CACHE_SIZE', 64),
+        mmap_mode=app.config.get('MODEL_MMAP_MODE'),
+        compress=app.config.get('MODEL_COMPRESS', 0)
+    )
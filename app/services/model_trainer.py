@@ -1,47 +1,250 @@
 from app.controllers.prediction_controller import PredictionController
 from app.models.device import Device
+from app.services.training_data import TrainingDataSource
+from app.services.model_store import model_store
+from flask import current_app
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from threadpoolctl import threadpool_limits
+import multiprocessing
 import logging
-import requests
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# Kept alive for the lifetime of a training worker process
+_worker_thread_limits = None
+
 class ModelTrainer:
-    # API URL for devices
-    DEVICES_API_URL = "https://sereneinv.co.zw/minimeter/all-devices-registered/"
-    
     @staticmethod
-    def train_all_models():
+    def train_all_models(workers=None, force=False):
         """Train prediction models for all devices and peak demand"""
+        report = ModelTrainer.train_all_models_report(workers, force)
+        return report['success']
+    
+    @staticmethod
+    def train_all_models_report(workers=None, force=False):
+        """Train every model and report per-device status and timings
+        
+        Device models whose readings have not changed since they were last
+        trained are skipped unless `force` is set; `saved_seconds` adds up
+        what those models took to train last time.
+        
+        With more than one worker, per-device models are fitted in a process
+        pool: this process loads each device's readings from the database and
+        hands them to the pool, keeping a couple of devices queued per worker.
+        The available cores are split between workers through the forest's
+        n_jobs and native thread-pool limits.
+        """
+        if workers is None:
+            workers = current_app.config.get('TRAINING_WORKERS', 1)
+        
+        started = time.perf_counter()
+        report = {
+            'success': False,
+            'mode': 'global' if PredictionController.use_global_energy_model() else 'per_device',
+            'workers': 1,
+            'threads_per_worker': None,
+            'elapsed_seconds': None,
+            'peak_demand': None,
+            'global_energy': None,
+            'training_mode': current_app.config.get('TRAINING_MODE', 'full'),
+            'trained': 0,
+            'updated': 0,
+            'up_to_date': 0,
+            'skipped': 0,
+            'insufficient_data': 0,
+            'failed': 0,
+            'saved_seconds': 0.0,
+            'trained_devices': [],
+            'skipped_devices': [],
+            'devices': []
+        }
+        
         try:
-            # Get devices from API
-            response = requests.get(ModelTrainer.DEVICES_API_URL)
-            response.raise_for_status()
-            devices_data = response.json()
+            # Get devices from the local table (or the API as a fallback)
+            device_ids = TrainingDataSource.device_ids()
             
             # Train peak demand model
             logger.info("Training peak demand model")
-            peak_success = PredictionController.train_peak_demand_model()
+            report['peak_demand'] = ModelTrainer._timed(PredictionController.train_peak_demand_model)
+            
+            if report['mode'] == 'global':
+                logger.info("Training global energy prediction model")
+                global_started = time.perf_counter()
+                status = PredictionController.train_global_energy_model_status(force=force)
+                report['global_energy'] = {
+                    'success': status != 'insufficient_data',
+                    'status': status,
+                    'seconds': time.perf_counter() - global_started
+                }
+                report['success'] = report['peak_demand']['success'] and report['global_energy']['success']
+                return report
             
             # Train device-specific models
-            device_success = True
-            for device in devices_data:
-                device_id = device['id']
-                logger.info(f"Training energy prediction model for device {device_id}")
-                if not PredictionController.train_energy_prediction_model(device_id):
-                    device_success = False
-                    logger.warning(f"Failed to train model for device {device_id}")
+            workers = max(1, min(workers, len(device_ids) or 1))
+            threads = max(1, ModelTrainer.available_cpus() // workers)
+            report['workers'] = workers
+            report['threads_per_worker'] = threads
+            
+            if workers == 1:
+                results = [ModelTrainer._train_device(device_id, threads, force) for device_id in device_ids]
+            else:
+                results = ModelTrainer._train_in_pool(device_ids, workers, threads, force)
             
-            return peak_success and device_success
+            for result in results:
+                report[result['status']] += 1
+                if result['status'] in ('trained', 'updated'):
+                    report['trained_devices'].append(result['device_id'])
+                elif result['status'] in ('skipped', 'up_to_date'):
+                    report['skipped_devices'].append(result['device_id'])
+                report['saved_seconds'] += result['saved_seconds'] or 0.0
+                if result['status'] == 'insufficient_data':
+                    logger.warning(f"Not enough data to train model for device {result['device_id']}")
+                elif result['status'] == 'failed':
+                    logger.warning(f"Failed to train model for device {result['device_id']}: {result['error']}")
+            report['devices'] = results
+            report['success'] = report['peak_demand']['success'] and not report['insufficient_data'] and not report['failed']
+            return report
         except Exception as e:
             logger.error(f"Error training models: {str(e)}")
-            return False
+            return report
+        finally:
+            report['elapsed_seconds'] = time.perf_counter() - started
+            logger.info(f"Model training finished in {report['elapsed_seconds']:.2f}s with "
+                        f"{report['workers']} worker(s): {report['trained']} devices trained, "
+                        f"{report['updated']} updated, {report['up_to_date']} up to date, "
+                        f"{report['skipped']} skipped (saving {report['saved_seconds']:.2f}s), "
+                        f"{report['insufficient_data']} without enough data, {report['failed']} failed")
+    
+    @staticmethod
+    def init_training_worker(threads, store_settings=None):
+        """Cap BLAS/OpenMP pools in a training worker at its share of the cores
+        
+        Forests parallelise through n_jobs and gradient boosting through
+        OpenMP; either way a worker uses at most `threads` cores. A spawned
+        worker never runs create_app, so it also gets the parent's model store
+        settings (compression, mmap mode) for the models it saves.
+        """
+        global _worker_thread_limits
+        _worker_thread_limits = threadpool_limits(limits=threads)
+        if store_settings:
+            model_store.configure(**store_settings)
+    
+    @staticmethod
+    def train_device_model(device_id, raw, model_path, plan=None, n_jobs=None):
+        """Fit (or extend) and save one device's energy model from loaded readings
+        
+        Runs without an app context or database session, in a worker process or
+        in the caller's process.
+        """
+        started = time.perf_counter()
+        status = PredictionController.train_energy_model_from_frame(raw, model_path, plan, n_jobs)
+        return ModelTrainer._device_result(device_id, len(raw), time.perf_counter() - started,
+                                           status=status, plan=plan)
+    
+    @staticmethod
+    def available_cpus():
+        """CPUs this process may run on"""
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+    
+    @staticmethod
+    def _train_device(device_id, n_jobs, force=False):
+        """Load one device's readings and train its model in this process"""
+        logger.info(f"Training energy prediction model for device {device_id}")
+        started = time.perf_counter()
+        try:
+            plan = PredictionController.energy_training_plan(device_id, force=force)
+            raw = TrainingDataSource.get_device_frame(device_id, since=plan['since'])
+            return ModelTrainer.train_device_model(
+                device_id, raw, PredictionController.device_model_path(device_id), plan, n_jobs
+            )
+        except Exception as e:
+            return ModelTrainer._device_result(device_id, None, time.perf_counter() - started,
+                                               status='failed', error=str(e))
+    
+    @staticmethod
+    def _train_in_pool(device_ids, workers, threads, force=False):
+        """Fit device models on a process pool while this process loads their data"""
+        results = {}
+        queued = deque(device_ids)
+        pending = {}
+        
+        # spawn rather than fork: the scheduler and HTTP pools run threads in this process
+        context = multiprocessing.get_context(current_app.config.get('TRAINING_START_METHOD', 'spawn'))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=ModelTrainer.init_training_worker,
+                                 initargs=(threads, model_store.settings())) as executor:
+            while queued or pending:
+                # Bound how many loaded frames wait in memory for a free worker
+                while queued and len(pending) < workers * 2:
+                    device_id = queued.popleft()
+                    logger.info(f"Training energy prediction model for device {device_id}")
+                    try:
+                        plan = PredictionController.energy_training_plan(device_id, force=force)
+                        raw = TrainingDataSource.get_device_frame(device_id, since=plan['since'])
+                        if not plan['incremental']:
+                            # Check here so unchanged devices never reach the pool
+                            plan['fingerprint'] = PredictionController.training_fingerprint(raw)
+                    except Exception as e:
+                        results[device_id] = ModelTrainer._device_result(device_id, None, 0.0,
+                                                                         status='failed', error=str(e))
+                        continue
+                    if PredictionController.training_data_unchanged(plan, plan['fingerprint']):
+                        results[device_id] = ModelTrainer._device_result(device_id, len(raw), 0.0,
+                                                                         status='skipped', plan=plan)
+                        continue
+                    future = executor.submit(ModelTrainer.train_device_model, device_id, raw,
+                                             PredictionController.device_model_path(device_id), plan, threads)
+                    pending[future] = device_id
+                
+                if not pending:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    device_id = pending.pop(future)
+                    try:
+                        results[device_id] = future.result()
+                    except Exception as e:
+                        results[device_id] = ModelTrainer._device_result(device_id, None, None,
+                                                                         status='failed', error=str(e))
+        
+        return [results[device_id] for device_id in device_ids]
+    
+    @staticmethod
+    def _timed(train):
+        """Run a training function and time it"""
+        started = time.perf_counter()
+        success = train()
+        return {'success': bool(success), 'seconds': time.perf_counter() - started}
+    
+    @staticmethod
+    def _device_result(device_id, rows, seconds, status='trained', error=None, plan=None):
+        """Build one per-device entry of a training report"""
+        saved_seconds = None
+        if status == 'skipped' and plan and plan['metadata']:
+            saved_seconds = plan['metadata'].get('train_seconds')
+        return {
+            'device_id': device_id,
+            'status': status,
+            'rows': rows,
+            'seconds': seconds,
+            'saved_seconds': saved_seconds,
+            'error': error
+        }
     
     @staticmethod
     def generate_predictions(days_ahead=1):
-        """Generate predictions for the specified number of days ahead"""
+        """Generate predictions for the specified number of days ahead
+        
+        Returns the number of predictions written, or None on failure.
+        """
         try:
             logger.info(f"Generating predictions for {days_ahead} days ahead")
             return PredictionController.generate_predictions(days_ahead)
         except Exception as e:
             logger.error(f"Error generating predictions: {str(e)}")
-            return False
+            return None
@@ -1,10 +1,9 @@
 from app.controllers.prediction_controller import PredictionController
 from app.models.device import Device
 from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app.services.model_store import model_store
 from datetime import datetime, timedelta
-import joblib
 import numpy as np
-import os
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,12 +30,12 @@ class Predictor:
             return [pred.to_dict() for pred in existing_predictions]
         
         # If no predictions exist, generate them
-        model_path = f'models/energy_model_device_{device_id}.pkl'
-        if not os.path.exists(model_path):
+        model_path = PredictionController.energy_model_path(device_id)
+        if model_store.get(model_path) is None:
             # Train model if it doesn't exist
             logger.info(f"Model for device {device_id} not found, training now")
             PredictionController.train_energy_prediction_model(device_id)
-            if not os.path.exists(model_path):
+            if model_store.get(model_path) is None:
                 logger.error(f"Failed to train model for device {device_id}")
                 return []
         
@@ -76,11 +75,11 @@ class Predictor:
         
         # If no predictions exist, generate them
         model_path = 'models/peak_demand_model.pkl'
-        if not os.path.exists(model_path):
+        if model_store.get(model_path) is None:
             # Train model if it doesn't exist
             logger.info("Peak demand model not found, training now")
             PredictionController.train_peak_demand_model()
-            if not os.path.exists(model_path):
+            if model_store.get(model_path) is None:
                 logger.error("Failed to train peak demand model")
                 return []
         
@@ -0,0 +1,181 @@
+from app.models.cache import CacheGeneration
+from app import db
+from flask import request, make_response
+from werkzeug.utils import import_string
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """Storage for cached responses
+    
+    A shared backend (Redis, memcached, ...) only needs these three methods;
+    set RESPONSE_CACHE_BACKEND to its import path to use it.
+    """
+    
+    def get(self, key):
+        raise NotImplementedError
+    
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+    
+    def clear(self):
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU with per-entry expiry, private to each worker process"""
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+class ResponseCache:
+    """Cache for GET endpoints whose data only changes when predictions are regenerated
+    
+    Keys combine the endpoint, its view arguments, the sorted non-empty query
+    arguments, today's date (defaults such as "the coming week" move with it)
+    and the current generation. The generation is a counter in the database,
+    bumped by `invalidate` whenever predictions or devices change, so every
+    worker process stops serving old entries at once and they age out of its
+    backend. Responses carry a strong ETag of their body, and a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    GENERATION = 'predictions'
+    
+    def __init__(self, backend=None, ttl=21600, enabled=True):
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+        self.configure(backend, ttl, enabled)
+    
+    def configure(self, backend=None, ttl=21600, enabled=True):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+    
+    def cached(self, view):
+        """Decorate a view so its 200 responses are cached and served with ETags"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or request.method != 'GET':
+                return view(*args, **kwargs)
+            
+            key = self.key(self.generation())
+            entry = self.backend.get(key)
+            if entry is None:
+                self._count('misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = (body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+                self.backend.set(key, entry, self.ttl)
+            else:
+                self._count('hits')
+            
+            body, mimetype, etag = entry
+            response = make_response(body)
+            response.mimetype = mimetype
+            response.set_etag(etag)
+            # Clients may keep the body but must revalidate it on every use
+            response.cache_control.no_cache = True
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                self._count('not_modified')
+            return response
+        return wrapper
+    
+    def key(self, generation):
+        """Cache key for the current request"""
+        view_args = sorted((request.view_args or {}).items())
+        query_args = sorted((name, value.strip()) for name, value in request.args.items(multi=True) if value.strip())
+        return f"{request.endpoint}|{view_args}|{query_args}|{date.today().isoformat()}|{generation}"
+    
+    def generation(self):
+        """Current generation of the cached data, shared by all processes"""
+        generation = db.session.execute(
+            db.select(CacheGeneration.generation).where(CacheGeneration.name == self.GENERATION)
+        ).scalar()
+        return generation or 0
+    
+    def invalidate(self):
+        """Start a new generation so no process serves responses cached before now
+        
+        Commits its own transaction; call it after the change has been committed.
+        """
+        table = CacheGeneration.__table__
+        bumped = db.session.execute(
+            table.update().where(table.c.name == self.GENERATION).values(
+                generation=table.c.generation + 1, updated_at=datetime.utcnow()
+            )
+        )
+        if bumped.rowcount == 0:
+            db.session.execute(table.insert().values(name=self.GENERATION, generation=1, updated_at=datetime.utcnow()))
+        db.session.commit()
+        self.backend.clear()
+        self._count('invalidations')
+        logger.debug("Response cache invalidated")
+    
+    def stats(self):
+        """Hit/miss/304 counters and the size of an in-process backend"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['ttl'] = self.ttl
+        stats['backend'] = type(self.backend).__name__
+        if isinstance(self.backend, MemoryCacheBackend):
+            stats['entries'] = len(self.backend)
+            stats['max_entries'] = self.backend.max_entries
+        return stats
+    
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+response_cache = ResponseCache()
+
+
+def configure_response_cache(app):
+    """Apply the app's RESPONSE_CACHE_* settings to the shared cache"""
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        backend = MemoryCacheBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    else:
+        backend = import_string(backend)()
+    response_cache.configure(
+        backend=backend,
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 21600),
+        enabled=app.config.get('RESPONSE_CACHE_ENABLED', True)
+    )
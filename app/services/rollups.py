@@ -0,0 +1,242 @@
+from app.models.consumption import ConsumptionRecord, ConsumptionHourlyRollup, ConsumptionDailyRollup
+from app.models.device import Device
+from app.utils.helpers import to_utc_naive
+from app import db
+from datetime import timedelta
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+class ConsumptionRollups:
+    """Hourly and daily per-device aggregates of consumption_records
+    
+    Every hour an ingest touches is recomputed from its raw readings, and the
+    days containing those hours from their hourly rows, so rollups stay exact
+    whatever order readings arrive in. Range totals read daily rollups for
+    whole days, hourly rollups for whole hours around them and raw readings
+    only for the partial hours at the edges.
+    """
+    # Hourly rollup columns from raw readings (power = voltage * current, in W)
+    HOURLY_AGGREGATES = {
+        'energy_sum': ('active_energy', 'sum'),
+        'max_power': ('power', 'max'),
+        'reading_count': ('active_energy', 'size'),
+        'voltage_min': ('voltage', 'min'),
+        'voltage_max': ('voltage', 'max'),
+        'current_min': ('current', 'min'),
+        'current_max': ('current', 'max')
+    }
+    # Daily rollup columns from hourly rollups
+    DAILY_AGGREGATES = {
+        'energy_sum': ('energy_sum', 'sum'),
+        'max_power': ('max_power', 'max'),
+        'reading_count': ('reading_count', 'sum'),
+        'voltage_min': ('voltage_min', 'min'),
+        'voltage_max': ('voltage_max', 'max'),
+        'current_min': ('current_min', 'min'),
+        'current_max': ('current_max', 'max')
+    }
+    
+    @staticmethod
+    def floor_hour(timestamp):
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def floor_day(timestamp):
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def ceil_hour(timestamp):
+        floor = ConsumptionRollups.floor_hour(timestamp)
+        return floor if floor == timestamp else floor + HOUR
+    
+    @staticmethod
+    def ceil_day(timestamp):
+        floor = ConsumptionRollups.floor_day(timestamp)
+        return floor if floor == timestamp else floor + DAY
+    
+    @staticmethod
+    def refresh(device_id, hours):
+        """Recompute the rollups covering a set of touched hour buckets
+        
+        Touched hours are refreshed one calendar day at a time, from the first
+        to the last touched hour of that day: a large ingest costs one range
+        query per day rather than one per hour, and a first full-history sync
+        never reads more than a day of raw readings at once.
+        """
+        ranges = {}
+        for hour in hours:
+            day = ConsumptionRollups.floor_day(hour)
+            start, end = ranges.get(day, (hour, hour + HOUR))
+            ranges[day] = (min(start, hour), max(end, hour + HOUR))
+        
+        for day in sorted(ranges):
+            ConsumptionRollups.refresh_range(device_id, *ranges[day])
+    
+    @staticmethod
+    def refresh_range(device_id, start, end):
+        """Rebuild hourly rollups in [start, end) and daily rollups for the days around it
+        
+        `start` and `end` must be on hour boundaries. Runs in the caller's
+        transaction.
+        """
+        connection = db.session.connection()
+        raw = pd.read_sql(
+            db.select(
+                ConsumptionRecord.reading_timestamp,
+                ConsumptionRecord.voltage,
+                ConsumptionRecord.current,
+                ConsumptionRecord.active_energy
+            ).where(
+                ConsumptionRecord.device_id == device_id,
+                ConsumptionRecord.reading_timestamp >= start,
+                ConsumptionRecord.reading_timestamp < end
+            ),
+            connection
+        )
+        raw['power'] = raw['voltage'] * raw['current']
+        hourly_rows = ConsumptionRollups._aggregate(
+            device_id, raw, 'reading_timestamp', 'h', ConsumptionRollups.HOURLY_AGGREGATES
+        )
+        ConsumptionRollups._replace(ConsumptionHourlyRollup, device_id, start, end, hourly_rows)
+        
+        day_start, day_end = ConsumptionRollups.floor_day(start), ConsumptionRollups.ceil_day(end)
+        hourly = pd.read_sql(
+            db.select(ConsumptionHourlyRollup).where(
+                ConsumptionHourlyRollup.device_id == device_id,
+                ConsumptionHourlyRollup.bucket_start >= day_start,
+                ConsumptionHourlyRollup.bucket_start < day_end
+            ),
+            connection
+        )
+        daily_rows = ConsumptionRollups._aggregate(
+            device_id, hourly, 'bucket_start', 'D', ConsumptionRollups.DAILY_AGGREGATES
+        )
+        ConsumptionRollups._replace(ConsumptionDailyRollup, device_id, day_start, day_end, daily_rows)
+    
+    @staticmethod
+    def _aggregate(device_id, frame, time_column, freq, aggregates):
+        """Group a frame into time buckets and return rollup row dicts"""
+        if frame.empty:
+            return []
+        
+        buckets = pd.to_datetime(frame[time_column]).dt.floor(freq)
+        grouped = frame.groupby(buckets).agg(**aggregates)
+        rows = []
+        for bucket, values in zip(grouped.index, grouped.to_dict('records')):
+            row = {column: float(value) for column, value in values.items()}
+            row['reading_count'] = int(row['reading_count'])
+            row['device_id'] = device_id
+            row['bucket_start'] = bucket.to_pydatetime()
+            rows.append(row)
+        return rows
+    
+    @staticmethod
+    def _replace(model, device_id, start, end, rows):
+        """Swap a device's rollup rows in [start, end) for new ones"""
+        table = model.__table__
+        db.session.execute(table.delete().where(
+            table.c.device_id == device_id,
+            table.c.bucket_start >= start,
+            table.c.bucket_start < end
+        ))
+        if rows:
+            db.session.execute(table.insert(), rows)
+    
+    @staticmethod
+    def backfill(device_ids=None, window_days=31):
+        """Rebuild all rollups from raw readings, one device and window at a time
+        
+        Each device is committed separately. Returns the number of devices and
+        hourly buckets written.
+        """
+        query = db.session.query(
+            ConsumptionRecord.device_id,
+            db.func.min(ConsumptionRecord.reading_timestamp),
+            db.func.max(ConsumptionRecord.reading_timestamp)
+        ).group_by(ConsumptionRecord.device_id)
+        if device_ids:
+            query = query.filter(ConsumptionRecord.device_id.in_(device_ids))
+        
+        summary = {'devices': 0, 'hours': 0}
+        for device_id, first, last in query.all():
+            for model in (ConsumptionHourlyRollup, ConsumptionDailyRollup):
+                db.session.execute(model.__table__.delete().where(model.__table__.c.device_id == device_id))
+            
+            start = ConsumptionRollups.floor_day(first)
+            end = ConsumptionRollups.floor_day(last) + DAY
+            while start < end:
+                stop = min(start + timedelta(days=window_days), end)
+                ConsumptionRollups.refresh_range(device_id, start, stop)
+                start = stop
+            db.session.commit()
+            
+            hours = ConsumptionHourlyRollup.query.filter_by(device_id=device_id).count()
+            summary['devices'] += 1
+            summary['hours'] += hours
+            logger.info(f"Rebuilt rollups for device {device_id}: {hours} hours from {first} to {last}")
+        return summary
+    
+    @staticmethod
+    def range_totals(device_ids=None, start_date=None, end_date=None):
+        """Energy and reading count per device for readings with start_date <= timestamp <= end_date
+        
+        Either bound may be None. Returns {device_id: (total_energy, reading_count)}.
+        """
+        start, end = to_utc_naive(start_date), to_utc_naive(end_date)
+        totals = {}
+        if not device_ids:
+            # Every query then leads with device_id, so (device_id, timestamp)
+            # keys serve the time ranges instead of full scans
+            device_ids = [device_id for (device_id,) in db.session.query(Device.id)]
+        
+        def add(model, lower, upper, upper_inclusive=False):
+            if model is ConsumptionRecord:
+                device, timestamp = ConsumptionRecord.device_id, ConsumptionRecord.reading_timestamp
+                energy, count = db.func.sum(ConsumptionRecord.active_energy), db.func.count(ConsumptionRecord.id)
+            else:
+                device, timestamp = model.device_id, model.bucket_start
+                energy, count = db.func.sum(model.energy_sum), db.func.sum(model.reading_count)
+            
+            query = db.session.query(device, energy, count).filter(device.in_(device_ids))
+            if lower is not None:
+                query = query.filter(timestamp >= lower)
+            if upper is not None:
+                query = query.filter(timestamp <= upper if upper_inclusive else timestamp < upper)
+            
+            for device_id, device_energy, device_count in query.group_by(device):
+                energy_total, count_total = totals.get(device_id, (0.0, 0))
+                totals[device_id] = (energy_total + (device_energy or 0.0), count_total + int(device_count or 0))
+        
+        if start is not None and end is not None and start > end:
+            return totals
+        
+        # Partial hours at the edges come from raw readings
+        hour_start = ConsumptionRollups.ceil_hour(start) if start is not None else None
+        hour_end = ConsumptionRollups.floor_hour(end) if end is not None else None
+        if hour_start is not None and hour_end is not None and hour_start > hour_end:
+            # Within a single hour
+            add(ConsumptionRecord, start, end, upper_inclusive=True)
+            return totals
+        if start is not None and start < hour_start:
+            add(ConsumptionRecord, start, hour_start)
+        if end is not None:
+            add(ConsumptionRecord, hour_end, end, upper_inclusive=True)
+        
+        # Whole days from daily rollups, whole hours around them from hourly ones
+        day_start = ConsumptionRollups.ceil_day(hour_start) if hour_start is not None else None
+        day_end = ConsumptionRollups.floor_day(hour_end) if hour_end is not None else None
+        if day_start is not None and day_end is not None and day_start >= day_end:
+            add(ConsumptionHourlyRollup, hour_start, hour_end)
+            return totals
+        
+        add(ConsumptionDailyRollup, day_start, day_end)
+        if hour_start is not None and hour_start < day_start:
+            add(ConsumptionHourlyRollup, hour_start, day_start)
+        if hour_end is not None and day_end < hour_end:
+            add(ConsumptionHourlyRollup, day_end, hour_end)
+        return totals
@@ -0,0 +1,104 @@
+from app.models.consumption import ConsumptionRecord
+from app.models.device import Device
+from app.utils.data_collector import DataCollector
+from app.services.feature_pipeline import FeaturePipeline
+from app import db
+from flask import current_app
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TrainingDataSource:
+    """Load raw consumption readings for model training as DataFrames
+    
+    Readings come from the local consumption_records table, which the hourly
+    sync job keeps current. The external API is only used as a fallback when
+    TRAINING_API_FALLBACK is enabled and the local table has too little data,
+    or when TRAINING_DATA_SOURCE is set to 'api'.
+    """
+    RAW_COLUMNS = FeaturePipeline.RAW_COLUMNS
+    
+    @staticmethod
+    def use_api():
+        return current_app.config.get('TRAINING_DATA_SOURCE', 'db') == 'api'
+    
+    @staticmethod
+    def api_fallback_enabled():
+        return current_app.config.get('TRAINING_API_FALLBACK', True)
+    
+    @staticmethod
+    def device_ids():
+        """IDs of devices to train, from the local devices table"""
+        if not TrainingDataSource.use_api():
+            ids = [device_id for (device_id,) in db.session.query(Device.id).order_by(Device.id)]
+            if ids or not TrainingDataSource.api_fallback_enabled():
+                return ids
+        
+        return [device['id'] for device in DataCollector.fetch_devices()]
+    
+    @staticmethod
+    def load_frame(device_ids=None, columns=None, since=None):
+        """Read readings for some (or all) devices with a single columnar query
+        
+        With `since`, only readings stamped after it are returned.
+        """
+        columns = columns or TrainingDataSource.RAW_COLUMNS
+        query = db.select(*[getattr(ConsumptionRecord, column) for column in columns])
+        
+        if device_ids is not None:
+            query = query.where(ConsumptionRecord.device_id.in_(device_ids))
+        if since is not None:
+            query = query.where(ConsumptionRecord.reading_timestamp > since)
+        
+        return pd.read_sql(query, db.session.connection())
+    
+    @staticmethod
+    def get_device_frame(device_id, min_rows=24, since=None):
+        """Readings for one device, falling back to the API if the DB has too few
+        
+        With `since`, only readings stamped after it are returned, and a short
+        local result is not treated as missing data.
+        """
+        if not TrainingDataSource.use_api():
+            frame = TrainingDataSource.load_frame([device_id], since=since)
+            if since is not None or len(frame) >= min_rows or not TrainingDataSource.api_fallback_enabled():
+                return frame
+            logger.info(f"Only {len(frame)} local readings for device {device_id}, falling back to the API")
+        
+        frame = TrainingDataSource.from_api_records(device_id, DataCollector.fetch_device_consumption(device_id))
+        if since is not None:
+            frame = frame[frame['reading_timestamp'] > since].reset_index(drop=True)
+        return frame
+    
+    @staticmethod
+    def get_fleet_frame(columns=None, min_rows=48, since=None):
+        """Readings for every device, falling back to the API if the DB has too few
+        
+        With `since`, only readings stamped after it are returned, and a short
+        local result is not treated as missing data.
+        """
+        if not TrainingDataSource.use_api():
+            frame = TrainingDataSource.load_frame(columns=columns, since=since)
+            if since is not None or len(frame) >= min_rows or not TrainingDataSource.api_fallback_enabled():
+                return frame
+            logger.info(f"Only {len(frame)} local readings, falling back to the API")
+        
+        frames = [
+            TrainingDataSource.from_api_records(device['id'], DataCollector.fetch_device_consumption(device['id']))
+            for device in DataCollector.fetch_devices()
+        ]
+        frame = pd.concat(frames, ignore_index=True) if frames else TrainingDataSource.empty_frame()
+        if since is not None:
+            frame = frame[frame['reading_timestamp'] > since].reset_index(drop=True)
+        return frame[columns] if columns else frame
+    
+    @staticmethod
+    def empty_frame():
+        return pd.DataFrame(columns=TrainingDataSource.RAW_COLUMNS)
+    
+    @staticmethod
+    def from_api_records(device_id, records_data):
+        """Convert external API readings to the same columns as the local table"""
+        frame = FeaturePipeline.normalize(records_data, device_id)
+        return frame[TrainingDataSource.RAW_COLUMNS]
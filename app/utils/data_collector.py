@@ -1,6 +1,6 @@
 # Create this new file to centralize API URLs and data collection utilities
 
-import requests
+from app.utils.http_client import http_client
 import logging
 from datetime import datetime, timedelta
 
@@ -16,9 +16,7 @@ class DataCollector:
     def fetch_devices():
         """Fetch all devices from the API"""
         try:
-            response = requests.get(DataCollector.DEVICES_API_URL)
-            response.raise_for_status()
-            return response.json()
+            return http_client.get_json(DataCollector.DEVICES_API_URL)
         except Exception as e:
             logger.error(f"Error fetching devices: {str(e)}")
             return []
@@ -28,9 +26,7 @@ class DataCollector:
         """Fetch consumption data for a device"""
         try:
             api_url = f"{DataCollector.CONSUMPTION_API_BASE_URL}/{device_id}"
-            response = requests.get(api_url)
-            response.raise_for_status()
-            return response.json()
+            return http_client.get_json(api_url)
         except Exception as e:
             logger.error(f"Error fetching consumption for device {device_id}: {str(e)}")
             return []
@@ -47,9 +43,7 @@ class DataCollector:
             device_ids_str = ",".join(map(str, device_ids))
             api_url = f"{DataCollector.TOTAL_CONSUMPTION_API_URL}?device_ids={device_ids_str}&start_date={start_date_str}&end_date={end_date_str}"
             
-            response = requests.get(api_url)
-            response.raise_for_status()
-            return response.json()
+            return http_client.get_json(api_url)
         except Exception as e:
             logger.error(f"Error fetching total consumption: {str(e)}")
             return []
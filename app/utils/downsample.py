@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of `threshold - 2` equal
+    buckets in between, the point forming the largest triangle with the
+    point kept before it and the mean of the next bucket. Peaks and dips
+    survive, which plain decimation or averaging would flatten. `x` must be
+    sorted; returns all indices when there are no more points than
+    `threshold`.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold < 3:
+        raise ValueError("threshold must be at least 3")
+    if n <= threshold:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+
+        # Twice the triangle areas; the factor doesn't change the argmax
+        areas = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
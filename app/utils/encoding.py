@@ -0,0 +1,85 @@
+from flask import current_app, request
+from collections import OrderedDict
+import gzip
+import threading
+import zlib
+
+# Types worth compressing; CSV and NDJSON come from the export and streaming endpoints
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+# Compressed bodies of recent ETagged (cached) responses, keyed by ETag
+_compressed_bodies = OrderedDict()
+_compressed_lock = threading.Lock()
+_COMPRESSED_ENTRIES = 64
+
+
+def gzip_response(response):
+    """after_request hook: gzip large JSON/CSV bodies for clients that accept it
+
+    Buffered bodies below API_GZIP_MIN_BYTES are left alone. Streamed
+    bodies are compressed as they are sent. A compressed response's ETag is
+    made weak, so it still matches If-None-Match against the identity
+    representation while telling clients the bytes differ.
+    """
+    if not current_app.config.get('API_GZIP_ENABLED', True) or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if not request.accept_encodings['gzip']:
+        return response
+    etag, weak = response.get_etag()
+    if response.status_code == 304:
+        # Revalidated: answer with the ETag the compressed 200 carried
+        if etag and etag in _compressed_bodies:
+            response.set_etag(etag, weak=True)
+        return response
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers or response.direct_passthrough
+            or request.method == 'HEAD'):
+        return response
+
+    level = current_app.config.get('API_GZIP_LEVEL', 6)
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config.get('API_GZIP_MIN_BYTES', 1024):
+            return response
+        response.set_data(_compress(body, level, etag))
+
+    response.headers['Content-Encoding'] = 'gzip'
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _compress(body, level, etag=None):
+    """gzip a body, reusing the result for a body already compressed under the same ETag"""
+    if etag:
+        with _compressed_lock:
+            compressed = _compressed_bodies.get(etag)
+            if compressed is not None:
+                _compressed_bodies.move_to_end(etag)
+                return compressed
+
+    compressed = gzip.compress(body, compresslevel=level, mtime=0)
+    if etag:
+        with _compressed_lock:
+            _compressed_bodies[etag] = compressed
+            while len(_compressed_bodies) > _COMPRESSED_ENTRIES:
+                _compressed_bodies.popitem(last=False)
+    return compressed
+
+
+def _gzip_stream(chunks, level):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        # Chunks are already batches of rows; a sync flush sends each one on as it
+        # is produced instead of holding it until deflate fills a block
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
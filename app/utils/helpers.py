@@ -1,4 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import base64
+import binascii
+import json
 
 def parse_iso_datetime(datetime_str):
     """Parse ISO datetime string to datetime object"""
@@ -11,6 +14,13 @@ def parse_iso_datetime(datetime_str):
     
     return datetime.fromisoformat(datetime_str)
 
+def to_utc_naive(dt):
+    """Convert an aware datetime to naive UTC, which is how timestamps are stored"""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
 def format_iso_datetime(dt):
     """Format datetime object to ISO datetime string"""
     if not dt:
@@ -18,6 +28,30 @@ def format_iso_datetime(dt):
     
     return dt.isoformat() + 'Z'
 
+def encode_cursor(values):
+    """Pack a dict of JSON-serialisable keyset values into an opaque URL-safe token"""
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Unpack a token made by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+def parse_duration(value):
+    """Parse a duration such as '15m', '1h' or '1d' into seconds"""
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    number, unit = value[:-1], value[-1:].lower()
+    if unit not in units or not number.isdigit() or int(number) == 0:
+        raise ValueError(f"Invalid duration '{value}', expected e.g. 15m, 1h or 1d")
+    return int(number) * units[unit]
+
 def get_date_range(days=7):
     """Get date range for the last N days"""
     end_date = datetime.now()
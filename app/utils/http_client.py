@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Pooled HTTP client shared by every call to the external metering API
+
+    One requests.Session keeps connections alive across calls and threads,
+    every request gets a timeout, idempotent requests are retried with
+    exponential backoff, and ETag / Last-Modified validators are replayed so
+    unchanged payloads come back as 304 Not Modified.
+
+    get_json and streamed callers keep separate validators, even for the same
+    URL: a 304 to a streamed sync must mean "nothing new since the last body
+    that was ingested", not since a body get_json decoded for someone else.
+    """
+
+    def __init__(self, connect_timeout=5, read_timeout=60, retries=3, backoff_factor=0.5,
+                 pool_size=16, max_cached_body_bytes=1024 * 1024):
+        self._lock = threading.Lock()
+        self._validators = {}  # url -> headers from store_validators, sent with revalidate=True
+        self._json_cache = {}  # url -> (headers, body) of get_json, body replayed on 304
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'not_modified': 0,
+            'cache_hits': 0
+        }
+        self.session = requests.Session()
+        self.configure(connect_timeout, read_timeout, retries, backoff_factor, pool_size, max_cached_body_bytes)
+
+    def configure(self, connect_timeout=5, read_timeout=60, retries=3, backoff_factor=0.5,
+                  pool_size=16, max_cached_body_bytes=1024 * 1024):
+        """(Re)build the connection pools with new settings"""
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_cached_body_bytes = max_cached_body_bytes
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, params=None, timeout=None, stream=False, revalidate=False, **kwargs):
+        """GET a URL through the shared session
+
+        With revalidate=True the validators stored for this URL with
+        store_validators are sent, so the caller must handle a 304 response.
+        Nothing is stored here; call store_validators once the body has been
+        processed.
+        """
+        headers = dict(kwargs.pop('headers', None) or {})
+        if revalidate:
+            with self._lock:
+                headers.update(self._validators.get(url, {}))
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout or self.timeout,
+                stream=stream,
+                **kwargs
+            )
+        except requests.RequestException:
+            metrics.observe('energy_upstream_request_duration_seconds', time.perf_counter() - started, outcome='error')
+            self._count('requests')
+            self._count('errors')
+            raise
+        # Until the headers arrive for streamed bodies, which are read by the caller
+        outcome = 'not_modified' if response.status_code == 304 else 'error' if response.status_code >= 400 else 'ok'
+        metrics.observe('energy_upstream_request_duration_seconds', time.perf_counter() - started, outcome=outcome)
+
+        retries = getattr(response.raw, 'retries', None)
+        with self._lock:
+            self._stats['requests'] += 1
+            if retries is not None:
+                self._stats['retries'] += len(retries.history)
+            if response.status_code == 304:
+                self._stats['not_modified'] += 1
+            elif response.status_code >= 400:
+                self._stats['errors'] += 1
+        return response
+
+    def get_json(self, url, params=None, timeout=None, revalidate=True):
+        """GET a URL and decode its JSON body, replaying a cached body on 304
+
+        Only bodies up to max_cached_body_bytes are kept for revalidation. The
+        validators are only ever replayed by get_json, never by streamed
+        requests for the same URL.
+        """
+        cached = None
+        if revalidate:
+            with self._lock:
+                cached = self._json_cache.get(url)
+        response = self.get(url, params=params, timeout=timeout, headers=cached[0] if cached else None)
+        if response.status_code == 304 and cached is not None:
+            self._count('cache_hits')
+            return json.loads(cached[1])
+
+        response.raise_for_status()
+        body = response.content
+        validators = self.validators_from(response)
+        if revalidate and validators and len(body) <= self.max_cached_body_bytes:
+            with self._lock:
+                self._json_cache[url] = (validators, body)
+        return json.loads(body)
+
+    @staticmethod
+    def validators_from(response):
+        """Conditional request headers to replay for a response, if it has any"""
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        return validators
+
+    def store_validators(self, url, validators):
+        """Remember validators for a URL whose streamed body has been fully processed"""
+        if not validators:
+            return
+        with self._lock:
+            self._validators[url] = validators
+
+    def forget(self, url):
+        """Drop stored validators so the next request for a URL is unconditional"""
+        with self._lock:
+            self._validators.pop(url, None)
+            self._json_cache.pop(url, None)
+
+    def stats(self):
+        """Request, retry and revalidation counters plus connection reuse"""
+        opened = pooled_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    pooled_requests += pool.num_requests
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_urls'] = len(self._validators.keys() | self._json_cache.keys())
+        stats['connections_opened'] = opened
+        stats['connections_reused'] = max(pooled_requests - opened, 0)
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+http_client = HttpClient()
+
+
+def configure_http_client(app):
+    """Apply the app's HTTP_* settings to the shared client"""
+    http_client.configure(
+        connect_timeout=app.config.get('HTTP_CONNECT_TIMEOUT', 5),
+        read_timeout=app.config.get('HTTP_READ_TIMEOUT', 60),
+        retries=app.config.get('HTTP_RETRIES', 3),
+        backoff_factor=app.config.get('HTTP_BACKOFF_FACTOR', 0.5),
+        pool_size=app.config.get('HTTP_POOL_SIZE', 16),
+        max_cached_body_bytes=app.config.get('HTTP_MAX_CACHED_BODY_BYTES', 1024 * 1024)
+    )
@@ -0,0 +1,135 @@
+from flask import g, request
+from bisect import bisect_left
+import threading
+import time
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+JOB_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered in the Prometheus text format
+
+    Each process keeps its own values, as with any Prometheus client without
+    a multiprocess collector: scraping a multi-worker server returns the
+    worker that answered. Job metrics are also kept in the job_runs table
+    for that reason (see JobRuns).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (kind, help, buckets)
+        self._values = {}  # name -> {labels: value, or [bucket counts, sum, count]}
+
+    def counter(self, name, help):
+        self._metrics[name] = ('counter', help, None)
+        self._values.setdefault(name, {})
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        self._metrics[name] = ('histogram', help, tuple(buckets))
+        self._values.setdefault(name, {})
+
+    def increment(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self._metrics[name][2]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name].get(key)
+            if series is None:
+                series = self._values[name][key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            series[0][bisect_left(buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self, name):
+        """(count, sum) of a histogram across all its label sets"""
+        with self._lock:
+            series = list(self._values[name].values())
+        return sum(s[2] for s in series), sum(s[1] for s in series)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, (kind, help, buckets) in self._metrics.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self._values[name].items()):
+                    if kind == 'counter':
+                        lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+                        continue
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else format_value(bound)
+                        lines.append(f"{name}_bucket{format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(key)} {format_value(total)}")
+                    lines.append(f"{name}_count{format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{label}="{escape_label(value)}"' for label, value in key) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value in (float('inf'), float('-inf')):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+metrics = MetricsRegistry()
+metrics.counter('energy_http_requests_total', 'HTTP requests served, by route, method and status')
+metrics.histogram('energy_http_request_duration_seconds', 'Time to produce an HTTP response, by route and method')
+metrics.histogram('energy_upstream_request_duration_seconds', 'Requests to the external metering API, by outcome')
+metrics.counter('energy_job_runs_total', 'Scheduled job runs, by job and status')
+metrics.histogram('energy_job_duration_seconds', 'Scheduled job run time, by job', JOB_DURATION_BUCKETS)
+metrics.counter('energy_job_items_total', 'Items processed by scheduled jobs (records ingested, models trained, predictions written)')
+metrics.counter('energy_job_failures_total', 'Items that failed in scheduled jobs (devices that did not sync or train)')
+metrics.counter('energy_job_db_writes_total', 'INSERT/UPDATE/DELETE statements run by scheduled jobs')
+metrics.counter('energy_job_rows_written_total', 'Rows inserted, updated or deleted by scheduled jobs')
+
+
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # url_rule keeps the label set small: /api/consumption/<int:device_id>, not every id
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('energy_http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method)
+        metrics.increment('energy_http_requests_total', route=route, method=request.method,
+                          status=response.status_code)
+    return response
+
+
+def init_metrics(app):
+    """Time every request into the HTTP metrics, unless METRICS_ENABLED is off
+
+    Streamed responses are timed until the view returns, not until the
+    last chunk is sent.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
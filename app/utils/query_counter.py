@@ -0,0 +1,62 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from functools import wraps
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its view allows"""
+
+
+def query_budget(limit):
+    """Declare the most SQL statements one request to a view may run
+
+    Checked after each request when SQL_QUERY_BUDGET is 'warn' or 'raise', so
+    an N+1 query pattern shows up as soon as a view runs one extra statement
+    per row.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+
+def check_query_budget(response):
+    budget = g.get('query_budget')
+    count = g.get('sql_query_count', 0)
+    if budget is not None and count > budget:
+        message = f"{request.method} {request.path} ran {count} SQL statements, budget is {budget}"
+        if g.query_budget_mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+def init_query_budget(app, engine):
+    """Count statements per request and enforce view budgets, unless SQL_QUERY_BUDGET is 'off'
+
+    Nothing is registered when it is off, so it costs nothing in production.
+    """
+    mode = app.config.get('SQL_QUERY_BUDGET', 'off')
+    if mode == 'off':
+        return
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    @app.before_request
+    def start_query_count():
+        g.sql_query_count = 0
+        g.query_budget_mode = mode
+
+    app.after_request(check_query_budget)
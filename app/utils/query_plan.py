@@ -0,0 +1,34 @@
+from sqlalchemy import event
+import re
+
+# A plan step that reads every row of a table, directly or in the order of one
+# of its indexes (a SEARCH reads only the rows matching the index key)
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$')
+
+
+def capture_statements(engine, fn, *args, **kwargs):
+    """Run fn and return the (statement, parameters) pairs it sent to the database"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        fn(*args, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def sqlite_full_scans(connection, statement, parameters):
+    """Tables SQLite would read in full to run a statement"""
+    plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans = []
+    for row in plan:
+        match = FULL_SCAN.match(row[-1])
+        if match:
+            scans.append(match.group(1))
+    return scans
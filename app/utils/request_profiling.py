@@ -0,0 +1,119 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from datetime import datetime
+import cProfile
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Longest repr of a slow statement's parameters written to the log
+_MAX_LOGGED_PARAMETERS = 1000
+
+# SLOW_QUERY_MS in seconds, set by init_request_profiling; None logs nothing
+_slow_query_seconds = None
+
+
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    context.statement_started = time.perf_counter()
+
+
+def stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context.statement_started
+    if has_request_context() and 'db_started' in g:
+        g.db_statements += 1
+        g.db_seconds += seconds
+
+    if _slow_query_seconds is not None and seconds >= _slow_query_seconds:
+        parameters = repr(parameters)
+        if len(parameters) > _MAX_LOGGED_PARAMETERS:
+            parameters = parameters[:_MAX_LOGGED_PARAMETERS] + '...'
+        where = f" in {request.method} {request.path}" if has_request_context() else ''
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms{where}): {' '.join(statement.split())} -- parameters: {parameters}")
+
+
+def start_request_timing():
+    g.db_started = time.perf_counter()
+    g.db_statements = 0
+    g.db_seconds = 0.0
+
+
+def add_server_timing(response):
+    """after_request hook: report DB and total time in a Server-Timing header"""
+    started = g.pop('db_started', None)
+    if started is not None:
+        total_ms = (time.perf_counter() - started) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={g.db_seconds * 1000:.2f};desc="{g.db_statements} queries", app;dur={total_ms:.2f}'
+        )
+    return response
+
+
+def profiling_requested(app):
+    mode = app.config.get('PROFILE_REQUESTS', 'off')
+    return mode == 'all' or (mode == 'header' and request.headers.get(app.config.get('PROFILE_HEADER', 'X-Profile')))
+
+
+def profile_path(directory, elapsed_ms):
+    """Where a request's profile is saved: timestamp, method, path and duration in the name"""
+    path = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S.%f')}-{request.method}-{path}-{elapsed_ms:.0f}ms.prof"
+    return os.path.join(directory, name)
+
+
+def init_request_profiling(app, engine):
+    """Register the request profiling hooks that are turned on in the config
+
+    - REQUEST_TIMING: count statements and DB time per request and send them,
+      with the total time, in a Server-Timing header.
+    - SLOW_QUERY_MS: log statements that take at least this long, with
+      their parameters (0 turns it off).
+    - PROFILE_REQUESTS: run cProfile over requests, 'all' of them or those
+      sending the PROFILE_HEADER header ('header'), and save a .prof file per
+      request in PROFILE_DIR. Only the view is profiled, not the sending of
+      a streamed body.
+
+    Whatever is off registers nothing, so it costs nothing per request or
+    per statement.
+    """
+    timing = app.config.get('REQUEST_TIMING', False)
+    slow_query_ms = app.config.get('SLOW_QUERY_MS', 0)
+    profile_mode = app.config.get('PROFILE_REQUESTS', 'off')
+
+    if timing or slow_query_ms:
+        global _slow_query_seconds
+        _slow_query_seconds = slow_query_ms / 1000 if slow_query_ms else None
+        if not event.contains(engine, 'before_cursor_execute', start_statement_timer):
+            event.listen(engine, 'before_cursor_execute', start_statement_timer)
+            event.listen(engine, 'after_cursor_execute', stop_statement_timer)
+
+    if timing:
+        app.before_request(start_request_timing)
+        app.after_request(add_server_timing)
+
+    if profile_mode != 'off':
+        directory = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+
+        @app.before_request
+        def start_profiler():
+            if profiling_requested(app):
+                g.profiler_started = time.perf_counter()
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+        @app.after_request
+        def save_profile(response):
+            profiler = g.pop('profiler', None)
+            if profiler is None:
+                return response
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - g.pop('profiler_started')) * 1000
+            os.makedirs(directory, exist_ok=True)
+            path = profile_path(directory, elapsed_ms)
+            profiler.dump_stats(path)
+            response.headers['X-Profile-File'] = os.path.basename(path)
+            logger.info(f"Saved the profile of {request.method} {request.path} to {path}")
+            return response
@@ -0,0 +1,70 @@
+from app import db
+import sqlalchemy as sa
+
+
+def insert_ignoring_duplicates(table, index_elements):
+    """Build an INSERT that silently skips rows violating a unique constraint
+
+    Uses the dialect-native form where one exists (ON CONFLICT DO NOTHING on
+    SQLite/PostgreSQL, INSERT IGNORE on MySQL) and falls back to a plain INSERT
+    otherwise, so callers should still dedupe against existing rows first.
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect in ('mysql', 'mariadb'):
+        return sa.insert(table).prefix_with('IGNORE')
+
+    return sa.insert(table)
+
+
+def has_unique_key(table_name, columns):
+    """Whether a table has a unique index or constraint on exactly `columns`
+
+    insert_ignoring_duplicates names its conflict target, which PostgreSQL and
+    SQLite reject unless such a key exists.
+    """
+    inspector = sa.inspect(db.engine)
+    if not inspector.has_table(table_name):
+        return False
+    keys = [index['column_names'] for index in inspector.get_indexes(table_name) if index['unique']]
+    keys += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table_name)]
+    return any(set(key) == set(columns) for key in keys)
+
+
+def epoch_bucket(column, seconds):
+    """SQL expression flooring a naive UTC timestamp column to whole `seconds` since the epoch
+
+    Evaluates to integer epoch seconds, so buckets line up across dialects
+    (midnight UTC for daily buckets).
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        epoch = sa.cast(sa.func.strftime('%s', column), sa.Integer)
+    elif dialect == 'postgresql':
+        epoch = sa.cast(sa.func.floor(sa.extract('epoch', column)), sa.BigInteger)
+    elif dialect in ('mysql', 'mariadb'):
+        # UNIX_TIMESTAMP() would apply the session time zone
+        epoch = sa.func.timestampdiff(sa.text('SECOND'), '1970-01-01', column)
+    else:
+        raise NotImplementedError(f"Time buckets are not supported on {dialect}")
+
+    return epoch // seconds * seconds
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from any iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
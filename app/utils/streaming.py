@@ -0,0 +1,157 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from an iterable of chunks
+
+    Chunks may be bytes (decoded as UTF-8) or str. Only the element currently
+    being decoded is buffered, so a large response body never has to be held
+    in memory as one Python list.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    started = False
+    finished = False
+
+    for chunk in chunks:
+        if finished:
+            break
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        if not chunk:
+            continue
+
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == ']':
+                finished = True
+                break
+            if buffer[pos] == ',':
+                pos += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Element is incomplete, wait for more data
+
+            if end >= len(buffer):
+                break  # A trailing scalar may still continue in the next chunk
+
+            yield item
+            pos = end
+
+    if finished:
+        return
+
+    # Stream ended: whatever is left must close the array
+    buffer = (buffer[pos:] + utf8.decode(b'', final=True)).strip()
+    if not started:
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            raise ValueError("Expected a JSON array")
+        buffer = buffer[1:].strip()
+    if buffer.startswith(','):
+        buffer = buffer[1:].strip()
+    if buffer and buffer != ']':
+        if not buffer.endswith(']'):
+            raise ValueError("Truncated JSON array")
+        item, end = decoder.raw_decode(buffer)
+        if buffer[end:].strip() != ']':
+            raise ValueError("Malformed JSON array")
+        yield item
+    elif not buffer:
+        raise ValueError("Truncated JSON array")
+
+
+def iter_ndjson(items, batch_size=500, encode=json.dumps):
+    """Encode items as newline-delimited JSON, yielding a few hundred lines at a time
+
+    Items that are already JSON text can be passed with encode=str.
+    """
+    lines = []
+    for item in items:
+        lines.append(encode(item))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_json_array_text(items, batch_size=500, encode=json.dumps):
+    """Encode items as one JSON array, yielding it in pieces as items arrive"""
+    yield '['
+    separator = ''
+    elements = []
+    for item in items:
+        elements.append(encode(item))
+        if len(elements) >= batch_size:
+            yield separator + ','.join(elements)
+            separator = ','
+            elements = []
+    if elements:
+        yield separator + ','.join(elements)
+    yield ']'
+
+
+def iter_nested_json_object(rows, depth, batch_size=500):
+    """Encode sorted rows of `depth` keys and a value as nested JSON objects, in pieces
+
+    Each row is (key_1, ..., key_depth, value), where value is already JSON
+    text and rows sharing leading keys are adjacent. Keys are written as
+    strings, like json.dumps writes int and str keys. Only the current batch
+    of rows is held, whatever the size of the object.
+    """
+    keys_json = {}
+
+    def key_json(key):
+        encoded = keys_json.get(key)
+        if encoded is None:
+            encoded = keys_json[key] = json.dumps(str(key))
+        return encoded
+
+    pieces = ['{']
+    previous = None
+    count = 0
+    for row in rows:
+        keys, value = row[:depth], row[depth]
+        common = 0
+        if previous is not None:
+            while common < depth - 1 and keys[common] == previous[common]:
+                common += 1
+            pieces.append('}' * (depth - 1 - common) + ',')
+        for key in keys[common:depth - 1]:
+            pieces.append(key_json(key) + ':{')
+        pieces.append(key_json(keys[-1]) + ':' + value)
+        previous = keys
+
+        count += 1
+        if count >= batch_size:
+            yield ''.join(pieces)
+            pieces = []
+            count = 0
+    if previous is not None:
+        pieces.append('}' * (depth - 1))
+    pieces.append('}')
+    yield ''.join(pieces)
@@ -1,11 +1,26 @@
-from flask import Blueprint, jsonify, request, render_template
+from flask import Blueprint, Response, jsonify, request, render_template, stream_with_context, current_app, send_file
 from app.controllers.device_controller import DeviceController
 from app.controllers.consumption_controller import ConsumptionController
 from app.controllers.prediction_controller import PredictionController
-from datetime import datetime, timedelta
+from app.services.model_trainer import ModelTrainer
+from app.services.data_export import DataExport
+from app.services.response_cache import response_cache
+from app.services.dashboard import DashboardSnapshots
+from app.services.leader_election import leader_election
+from app.services.job_runs import JobRuns
+from datetime import datetime
 from app.utils.data_collector import DataCollector
+from app.utils.http_client import http_client
+from app.utils.streaming import iter_ndjson, iter_json_array_text
+from app.utils.helpers import parse_iso_datetime, parse_duration
+from app.utils.query_counter import query_budget
+from app.utils.encoding import gzip_response
+from app.utils.metrics import metrics
+import tempfile
+from app.services.model_store import model_store
 
 api_bp = Blueprint('api', __name__)
+api_bp.after_request(gzip_response)
 
 # Root endpoint for API documentation
 @api_bp.route('/', methods=['GET'])
@@ -14,11 +29,13 @@ def api_docs():
 
 # Device endpoints
 @api_bp.route('/devices', methods=['GET'])
+@query_budget(1)
 def get_devices():
     devices = DeviceController.get_all_devices()
     return jsonify(devices)
 
 @api_bp.route('/devices/<int:device_id>', methods=['GET'])
+@query_budget(1)
 def get_device(device_id):
     device = DeviceController.get_device_by_id(device_id)
     if device:
@@ -64,8 +81,47 @@ def sync_devices():
         return jsonify({'message': 'Devices synced successfully'})
     return jsonify({'error': 'Failed to sync devices'}), 500
 
+@api_bp.route('/http/stats', methods=['GET'])
+def get_http_stats():
+    """Counters for the shared upstream HTTP client"""
+    return jsonify(http_client.stats())
+
+@api_bp.route('/models/stats', methods=['GET'])
+def get_model_cache_stats():
+    """Counters for the in-process model cache"""
+    return jsonify(model_store.stats())
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_response_cache_stats():
+    """Counters for this process's response cache"""
+    stats = response_cache.stats()
+    stats['generation'] = response_cache.generation()
+    return jsonify(stats)
+
+@api_bp.route('/scheduler/status', methods=['GET'])
+def get_scheduler_status():
+    """Which process runs the scheduled jobs, as seen from this one"""
+    return jsonify(leader_election.status())
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request and job metrics in the Prometheus text format"""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    body = metrics.render() + JobRuns.render_metrics()
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_bp.route('/jobs/runs', methods=['GET'])
+def get_job_runs():
+    """Reports of the latest scheduled job runs, newest first"""
+    limit = request.args.get('limit', 20, type=int)
+    if not 0 < limit <= 500:
+        return jsonify({'error': 'limit must be between 1 and 500'}), 400
+    return jsonify(JobRuns.recent(request.args.get('job'), limit))
+
 # Consumption endpoints
 @api_bp.route('/consumption/<int:device_id>', methods=['GET'])
+@query_budget(1)
 def get_device_consumption(device_id):
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -75,10 +131,48 @@ def get_device_consumption(device_id):
     if end_date:
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
     
-    records = ConsumptionController.get_device_consumption(device_id, start_date, end_date)
-    return jsonify(records)
+    resolution = request.args.get('resolution')
+    max_points = request.args.get('max_points', type=int)
+    if resolution or max_points is not None:
+        # Chart series: time buckets aggregated in SQL and/or LTTB downsampling
+        if max_points is not None and max_points < 3:
+            return jsonify({'error': 'max_points must be at least 3'}), 400
+        try:
+            resolution = parse_duration(resolution) if resolution else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        series = ConsumptionController.get_device_consumption_series(
+            device_id, start_date, end_date, resolution, max_points
+        )
+        return jsonify(series)
+    
+    stream = request.args.get('stream')
+    if stream:
+        # Rows go out as they are read, so memory stays flat for any range
+        if stream not in ('ndjson', 'json'):
+            return jsonify({'error': "stream must be 'ndjson' or 'json'"}), 400
+        records = ConsumptionController.iter_device_consumption(device_id, start_date, end_date, as_json=True)
+        if stream == 'ndjson':
+            return Response(stream_with_context(iter_ndjson(records, encode=str)), mimetype='application/x-ndjson')
+        return Response(stream_with_context(iter_json_array_text(records, encode=str)), mimetype='application/json')
+    
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is not None or cursor:
+        max_limit = current_app.config.get('CONSUMPTION_MAX_PAGE_SIZE', 10000)
+        if limit is not None and not 0 < limit <= max_limit:
+            return jsonify({'error': f'limit must be between 1 and {max_limit}'}), 400
+        try:
+            page = ConsumptionController.get_device_consumption_page(device_id, start_date, end_date, limit, cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page)
+    
+    records = ConsumptionController.get_device_consumption_json(device_id, start_date, end_date)
+    return current_app.response_class(records + '\n', mimetype='application/json')
 
 @api_bp.route('/consumption/total', methods=['GET'])
+@query_budget(7)
 def get_total_consumption():
     device_ids = request.args.get('device_ids')
     start_date = request.args.get('start_date')
@@ -108,8 +202,38 @@ def sync_consumption(device_id):
         return jsonify({'message': 'Consumption data synced successfully'})
     return jsonify({'error': 'Failed to sync consumption data'}), 500
 
+# Bulk export
+@api_bp.route('/export/<dataset>', methods=['GET'])
+def export_data(dataset):
+    """Export readings or predictions for many devices as CSV or zipped .npz files"""
+    export_format = request.args.get('format', 'csv')
+    device_ids = request.args.get('device_ids')
+    
+    if dataset not in DataExport.DATASETS:
+        return jsonify({'error': f"Unknown dataset, expected one of {', '.join(DataExport.DATASETS)}"}), 404
+    if export_format not in DataExport.FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(DataExport.FORMATS)}"}), 400
+    if device_ids:
+        device_ids = [int(id) for id in device_ids.split(',')]
+    start_date = parse_iso_datetime(request.args.get('start_date'))
+    end_date = parse_iso_datetime(request.args.get('end_date'))
+    
+    if export_format == 'csv':
+        return Response(
+            stream_with_context(DataExport.iter_csv(dataset, device_ids, start_date, end_date)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={dataset}.csv'}
+        )
+    
+    # Zip members need their sizes up front, so the archive is spooled to disk first
+    archive = tempfile.TemporaryFile()
+    DataExport.write_npz_zip(archive, dataset, device_ids, start_date, end_date)
+    archive.seek(0)
+    return send_file(archive, mimetype='application/zip', as_attachment=True, download_name=f'{dataset}.zip')
+
 # Prediction endpoints
 @api_bp.route('/predictions/energy', methods=['GET'])
+@query_budget(1)
 def get_energy_predictions():
     device_id = request.args.get('device_id')
     prediction_date = request.args.get('date')
@@ -123,6 +247,7 @@ def get_energy_predictions():
     return jsonify(predictions)
 
 @api_bp.route('/predictions/peak', methods=['GET'])
+@query_budget(1)
 def get_peak_predictions():
     prediction_date = request.args.get('date')
     
@@ -137,11 +262,24 @@ def train_models():
     # Get JSON data if provided, otherwise use empty dict
     data = request.get_json(silent=True) or {}
     device_id = data.get('device_id')
+    # Retrain even when the training data has not changed
+    force = data.get('force', False)
+    if not isinstance(force, bool):
+        return jsonify({'error': 'force must be true or false'}), 400
+    
+    if data.get('all'):
+        # Train every model, as the nightly job does
+        report = ModelTrainer.train_all_models_report(force=force)
+        return jsonify(report), 200 if report['success'] else 500
     
     if device_id:
         # Train model for specific device
-        success = PredictionController.train_energy_prediction_model(device_id)
-        if success:
+        status = PredictionController.train_energy_model_status(device_id, force=force)
+        if status == 'unknown_device':
+            return jsonify({'error': 'Device not found'}), 404
+        if status in ('skipped', 'up_to_date'):
+            return jsonify({'message': f'Energy prediction model for device {device_id} is already up to date'})
+        if status != 'insufficient_data':
             return jsonify({'message': f'Energy prediction model for device {device_id} trained successfully'})
         return jsonify({'error': 'Failed to train model, not enough data'}), 400
     else:
@@ -155,15 +293,18 @@ def train_models():
 def generate_predictions():
     data = request.get_json(silent=True) or {}
     days_ahead = data.get('days_ahead', 1)
+    if not isinstance(days_ahead, int) or isinstance(days_ahead, bool) or days_ahead < 1:
+        return jsonify({'error': 'days_ahead must be a positive integer'}), 400
     
-    success = PredictionController.generate_predictions(days_ahead)
-    if success:
+    written = PredictionController.generate_predictions(days_ahead)
+    if written is not None:
         return jsonify({'message': f'Predictions generated for the next {days_ahead} days'})
     return jsonify({'error': 'Failed to generate predictions'}), 500
 
 # Add these new endpoints to the existing api_bp Blueprint
 
 @api_bp.route('/predictions/all', methods=['GET'])
+@query_budget(3)
 def get_all_predictions():
     """Get all predictions for a date range"""
     start_date = request.args.get('start_date')
@@ -177,10 +318,13 @@ def get_all_predictions():
     if device_ids:
         device_ids = [int(id) for id in device_ids.split(',')]
     
-    predictions = PredictionController.get_all_predictions(start_date, end_date, device_ids)
-    return jsonify(predictions)
+    # Encoded from the query rows as it is sent, so it is neither buffered nor cached whole
+    predictions = PredictionController.iter_all_predictions_json(start_date, end_date, device_ids)
+    return Response(stream_with_context(predictions), mimetype='application/json')
 
 @api_bp.route('/predictions/device/<int:device_id>/summary', methods=['GET'])
+@query_budget(3)
+@response_cache.cached
 def get_device_predictions_summary(device_id):
     """Get a summary of predictions for a specific device"""
     start_date = request.args.get('start_date')
@@ -197,6 +341,8 @@ def get_device_predictions_summary(device_id):
     return jsonify({'error': 'Device not found'}), 404
 
 @api_bp.route('/predictions/peak/summary', methods=['GET'])
+@query_budget(2)
+@response_cache.cached
 def get_peak_demand_summary():
     """Get a summary of peak demand predictions"""
     start_date = request.args.get('start_date')
@@ -211,58 +357,15 @@ def get_peak_demand_summary():
     return jsonify(summary)
 
 @api_bp.route('/dashboard/overview', methods=['GET'])
+@query_budget(6)
+@response_cache.cached
 def get_dashboard_overview():
     """Get an overview of energy consumption and predictions for the dashboard"""
-    # Get today's date
-    today = datetime.now().date()
-    tomorrow = today + timedelta(days=1)
-    
-    # Get all devices
-    devices = DeviceController.get_all_devices()
-    
-    # Get today's energy predictions
-    energy_predictions = PredictionController.get_all_predictions(today, today)
-    
-    # Get peak demand for today
-    peak_demand = PredictionController.get_peak_demand_summary(today, today)
-    
-    # Calculate total predicted energy for today and tomorrow
-    today_total = 0
-    tomorrow_total = 0
-    
-    today_str = today.isoformat()
-    tomorrow_str = tomorrow.isoformat()
-    
-    if today_str in energy_predictions.get('daily_summaries', {}):
-        for device_id, energy in energy_predictions['daily_summaries'][today_str]['total_energy'].items():
-            today_total += energy
-    
-    # Get tomorrow's predictions
-    tomorrow_predictions = PredictionController.get_all_predictions(tomorrow, tomorrow)
-    
-    if tomorrow_str in tomorrow_predictions.get('daily_summaries', {}):
-        for device_id, energy in tomorrow_predictions['daily_summaries'][tomorrow_str]['total_energy'].items():
-            tomorrow_total += energy
-    
-    # Format response
-    result = {
-        'date': today.isoformat(),
-        'devices_count': len(devices),
-        'today_predicted_energy': today_total,
-        'tomorrow_predicted_energy': tomorrow_total,
-        'energy_change_percentage': ((tomorrow_total - today_total) / max(today_total, 1)) * 100 if today_total > 0 else 0,
-        'peak_demand': peak_demand['overall_peak']['demand'] if peak_demand['overall_peak']['demand'] > 0 else 0,
-        'peak_hour': peak_demand['overall_peak']['hour'] if peak_demand['overall_peak']['hour'] is not None else 0,
-        'devices': devices,
-        'hourly_predictions': {}
-    }
-    
-    # Add hourly predictions for today
-    if today_str in energy_predictions.get('energy_predictions', {}):
-        for device_id in energy_predictions['energy_predictions'][today_str]:
-            for hour, data in energy_predictions['energy_predictions'][today_str][device_id].items():
-                if hour not in result['hourly_predictions']:
-                    result['hourly_predictions'][hour] = {}
-                result['hourly_predictions'][hour][device_id] = data['predicted_energy']
+    # Defaults to today; snapshots are precomputed when predictions are generated
+    day = request.args.get('date')
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date() if day else datetime.now().date()
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
     
-    return jsonify(result)
+    return current_app.response_class(DashboardSnapshots.get(day), mimetype='application/json')
@@ -0,0 +1,97 @@
+"""Consumption sync across many devices: sequential vs bounded concurrency
+
+Run from the project root:
+    python -m benchmarks.bench_concurrent_sync
+
+A local stand-in for the external API serves `all-records-per-device/<id>`
+with an injected delay per request, so wall-clock time is dominated by
+upstream round trips the way it is in production.
+"""
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+import time
+
+from app import create_app, db
+from app.models.device import Device
+from app.services.data_collector import DataCollector
+from app.utils.http_client import http_client
+
+DEVICES = 60
+READINGS_PER_DEVICE = 500
+LATENCY_SECONDS = 0.1
+FAILING_DEVICE = 7  # Served as HTTP 500 to exercise per-device failure reporting
+CONCURRENCY_LEVELS = [1, 8, 32]
+
+
+def make_payload(device_id):
+    start = datetime(2024, 1, 1)
+    return json.dumps([
+        {
+            'Appliance_Info': device_id,
+            'Voltage': '220.0',
+            'Current': '0.50',
+            'TimeOn': '1.00',
+            'ActiveEnergy': '0.0018',
+            'Reading_Time_Stamp': (start + timedelta(minutes=i)).isoformat() + 'Z'
+        }
+        for i in range(READINGS_PER_DEVICE)
+    ]).encode()
+
+
+class StandInApi(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    payloads = {}
+
+    def do_GET(self):
+        time.sleep(LATENCY_SECONDS)
+        device_id = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+        if device_id == FAILING_DEVICE:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = self.payloads[device_id]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    StandInApi.payloads = {device_id: make_payload(device_id) for device_id in range(1, DEVICES + 1)}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    DataCollector.CONSUMPTION_API_BASE_URL = f"http://127.0.0.1:{server.server_port}/all-records-per-device"
+
+    app = create_app('testing')
+    # Retrying the failing device would add backoff time unrelated to concurrency
+    http_client.configure(retries=0, pool_size=max(CONCURRENCY_LEVELS))
+    device_ids = list(range(1, DEVICES + 1))
+    print(f"{DEVICES} devices, {LATENCY_SECONDS * 1000:.0f} ms injected latency, device {FAILING_DEVICE} fails")
+    print(f"{'concurrency':>12} {'elapsed (s)':>12} {'synced':>7} {'failed':>7} {'new rows':>9}")
+
+    for concurrency in CONCURRENCY_LEVELS:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add_all(Device(id=device_id, name=f'bench {device_id}', rated_power='100 W')
+                               for device_id in device_ids)
+            db.session.commit()
+
+            report = DataCollector.sync_consumption_report(device_ids, concurrency)
+            new_rows = sum(result['new_records'] or 0 for result in report['devices'])
+            print(f"{concurrency:>12} {report['elapsed_seconds']:>12.2f} {report['synced']:>7} "
+                  f"{report['failed']:>7} {new_rows:>9}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
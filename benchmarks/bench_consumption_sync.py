@@ -0,0 +1,95 @@
+"""Consumption sync: per-record existence checks vs chunked bulk upsert
+
+Run from the project root:
+    python -m benchmarks.bench_consumption_sync
+
+Each scenario preloads `history` readings for one device and then syncs a
+payload containing the full history plus one hour of new minute readings,
+which is what the hourly job receives from the external API.
+"""
+from datetime import datetime, timedelta
+import time
+
+from app import create_app, db
+from app.models.consumption import ConsumptionRecord
+from app.models.device import Device
+from app.controllers.consumption_controller import ConsumptionController
+
+HISTORY_SIZES = [1000, 10000, 50000]
+NEW_READINGS = 60
+DEVICE_ID = 1
+
+
+def make_payload(count, start):
+    return [
+        {
+            'Appliance_Info': DEVICE_ID,
+            'Voltage': '220.0',
+            'Current': '0.50',
+            'TimeOn': '1.00',
+            'ActiveEnergy': '0.0018',
+            'Reading_Time_Stamp': (start + timedelta(minutes=i)).isoformat() + 'Z'
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_sync(device_id, records_data):
+    """The original per-record path, kept here for comparison"""
+    count = 0
+    for record_data in records_data:
+        timestamp = datetime.fromisoformat(record_data.get('Reading_Time_Stamp').replace('Z', '+00:00'))
+        existing_record = ConsumptionRecord.query.filter_by(
+            device_id=device_id,
+            reading_timestamp=timestamp
+        ).first()
+        if not existing_record:
+            db.session.add(ConsumptionRecord(
+                device_id=device_id,
+                voltage=float(record_data.get('Voltage')),
+                current=float(record_data.get('Current')),
+                time_on=float(record_data.get('TimeOn')),
+                active_energy=float(record_data.get('ActiveEnergy')),
+                reading_timestamp=timestamp
+            ))
+            count += 1
+    db.session.commit()
+    return count
+
+
+def bulk_sync(device_id, records_data):
+    count = ConsumptionController.bulk_insert_records(device_id, records_data)
+    db.session.commit()
+    return count
+
+
+def run_scenario(app, history, sync_fn):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(Device(id=DEVICE_ID, name='bench', rated_power='100 W'))
+        db.session.commit()
+
+        start = datetime(2024, 1, 1)
+        payload = make_payload(history + NEW_READINGS, start)
+        ConsumptionController.bulk_insert_records(DEVICE_ID, payload[:history])
+        db.session.commit()
+
+        began = time.perf_counter()
+        inserted = sync_fn(DEVICE_ID, payload)
+        elapsed = time.perf_counter() - began
+        assert inserted == NEW_READINGS, inserted
+        return elapsed
+
+
+def main():
+    app = create_app('testing')
+    print(f"{'history':>10} {'legacy (s)':>12} {'bulk (s)':>10} {'speedup':>9}")
+    for history in HISTORY_SIZES:
+        legacy = run_scenario(app, history, legacy_sync)
+        bulk = run_scenario(app, history, bulk_sync)
+        print(f"{history:>10} {legacy:>12.3f} {bulk:>10.3f} {legacy / bulk:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Prediction generation: per-hour predict calls vs one batched call per model
+
+Run from the project root:
+    python -m benchmarks.bench_generate_predictions
+
+Every device gets a copy of the same RandomForest (100 trees) in a temporary
+models/ directory. The legacy path makes 24 x days_ahead predict calls per
+device, so it is timed on a subset of devices and scaled linearly.
+"""
+from datetime import datetime, timedelta
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from app import create_app, db
+from app.models.device import Device
+from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app.controllers.prediction_controller import PredictionController
+
+DEVICES = 200
+DAYS_AHEAD = 30
+LEGACY_SAMPLE_DEVICES = 5
+
+
+def train_template_models():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'hour': rng.integers(0, 24, 2000),
+        'day_of_week': rng.integers(0, 7, 2000),
+        'month': rng.integers(1, 13, 2000),
+        'time_on': rng.uniform(0, 60, 2000),
+        'current': rng.uniform(0, 2, 2000),
+        'voltage': rng.uniform(210, 230, 2000)
+    })
+    y = X['current'] * X['voltage'] / 60000
+    os.makedirs('models', exist_ok=True)
+    energy = RandomForestRegressor(n_estimators=100, random_state=42).fit(X, y)
+    joblib.dump(energy, 'models/energy_model_device_1.pkl')
+    peak = RandomForestRegressor(n_estimators=100, random_state=42).fit(X[['hour', 'day_of_week', 'month']], y)
+    joblib.dump(peak, 'models/peak_demand_model.pkl')
+    for device_id in range(2, DEVICES + 1):
+        shutil.copy('models/energy_model_device_1.pkl', f'models/energy_model_device_{device_id}.pkl')
+
+
+def legacy_generate(device_ids, days_ahead):
+    """The original per-hour loop, kept here for comparison"""
+    for device_id in device_ids:
+        model = joblib.load(f'models/energy_model_device_{device_id}.pkl')
+        for day in range(days_ahead):
+            prediction_date = (datetime.now() + timedelta(days=day)).date()
+            EnergyPrediction.query.filter_by(device_id=device_id, prediction_date=prediction_date).delete()
+            for hour in range(24):
+                features_df = pd.DataFrame({
+                    'hour': [hour],
+                    'day_of_week': [prediction_date.weekday()],
+                    'month': [prediction_date.month],
+                    'time_on': [120],
+                    'current': [0.5],
+                    'voltage': [220]
+                })
+                db.session.add(EnergyPrediction(
+                    device_id=device_id,
+                    predicted_energy=float(model.predict(features_df)[0]),
+                    prediction_date=prediction_date,
+                    prediction_hour=hour
+                ))
+    db.session.commit()
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        train_template_models()
+        app = create_app('testing')
+        with app.app_context():
+            db.session.add_all(Device(id=device_id, name=f'bench {device_id}', rated_power='100 W')
+                               for device_id in range(1, DEVICES + 1))
+            db.session.commit()
+
+            sample = list(range(1, LEGACY_SAMPLE_DEVICES + 1))
+            began = time.perf_counter()
+            legacy_generate(sample, DAYS_AHEAD)
+            legacy_seconds = (time.perf_counter() - began) * DEVICES / len(sample)
+
+            began = time.perf_counter()
+            assert PredictionController.generate_predictions(DAYS_AHEAD) is not None
+            batched_seconds = time.perf_counter() - began
+
+            energy_rows = EnergyPrediction.query.count()
+            peak_rows = PeakDemandPrediction.query.count()
+            assert energy_rows == DEVICES * DAYS_AHEAD * 24, energy_rows
+
+        print(f"{DEVICES} devices, days_ahead={DAYS_AHEAD}: {energy_rows:,} energy + {peak_rows} peak rows")
+        print(f"{'legacy (extrapolated from ' + str(LEGACY_SAMPLE_DEVICES) + ' devices)':<40} {legacy_seconds:>8.1f} s")
+        print(f"{'batched (energy + peak)':<40} {batched_seconds:>8.1f} s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Energy models: one RandomForest per device vs one global fleet model
+
+Run from the project root:
+    python -m benchmarks.bench_global_model
+
+A synthetic fleet with different rated powers and daily usage profiles is
+written to an in-memory DB, trained through ModelTrainer in both modes, and
+scored on the last 20% of each device's readings. One extra device has only
+a handful of readings, which per-device mode cannot model at all.
+"""
+from datetime import datetime
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app import create_app, db
+from app.models.device import Device
+from app.controllers.consumption_controller import ConsumptionController
+from app.controllers.prediction_controller import PredictionController
+from app.services.feature_pipeline import FeaturePipeline
+from app.services.model_trainer import ModelTrainer
+
+DEVICES = 40
+DAYS = 14
+READING_MINUTES = 10
+HOLDOUT_FRACTION = 0.2
+COLD_START_READINGS = 12
+
+
+def make_fleet(rng):
+    """Readings per device as raw frames, plus each device's rated power"""
+    steps = DAYS * 24 * 60 // READING_MINUTES
+    timestamps = pd.date_range(datetime(2024, 3, 1), periods=steps, freq=f'{READING_MINUTES}min')
+    hours = timestamps.hour.to_numpy()
+    fleet = {}
+    for device_id in range(1, DEVICES + 2):
+        rated_power = float(rng.choice([60, 100, 500, 1200, 2000]))
+        peak_hour = rng.integers(0, 24)
+        usage = 0.2 + 0.8 * np.exp(-((hours - peak_hour) % 24) ** 2 / 8)
+        on = rng.random(steps) < usage
+        current = on * rated_power / 220 * rng.uniform(0.8, 1.0, steps)
+        time_on = on * READING_MINUTES * rng.uniform(0.5, 1.0, steps)
+        frame = pd.DataFrame({
+            'device_id': device_id,
+            'reading_timestamp': timestamps,
+            'voltage': rng.normal(220, 3, steps),
+            'current': current,
+            'time_on': time_on,
+            'active_energy': 220 * current * time_on / 60000 + rng.normal(0, 0.0005, steps).clip(0)
+        })
+        if device_id == DEVICES + 1:
+            frame = frame.iloc[:COLD_START_READINGS + 4]
+        fleet[device_id] = (frame, rated_power)
+    return fleet
+
+
+def split(frame):
+    cut = max(int(len(frame) * (1 - HOLDOUT_FRACTION)), 1)
+    return frame.iloc[:cut], frame.iloc[cut:]
+
+
+def load_fleet(app, fleet):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for device_id, (frame, rated_power) in fleet.items():
+            db.session.add(Device(id=device_id, name=f'bench {device_id}', rated_power=f'{rated_power:g} W'))
+            train, _ = split(frame)
+            ConsumptionController.bulk_insert_rows(device_id, train.to_dict('records'))
+        db.session.commit()
+
+
+def evaluate(app, fleet, mode):
+    errors, cold_start_error = [], None
+    with app.app_context():
+        rated_power = PredictionController.device_rated_power()
+        for device_id, (frame, _) in fleet.items():
+            _, holdout = split(frame)
+            path = PredictionController.energy_model_path(device_id)
+            if not os.path.exists(path):
+                continue
+            model = joblib.load(path)
+            if mode == 'global':
+                features = FeaturePipeline.build(holdout, 'global_energy', rated_power=rated_power)
+                X = features[PredictionController.GLOBAL_ENERGY_FEATURE_NAMES]
+            else:
+                features = FeaturePipeline.build(holdout, 'energy')
+                X = features[PredictionController.ENERGY_FEATURE_NAMES]
+            error = np.abs(model.predict(X) - features['active_energy'].to_numpy()).mean()
+            if device_id == DEVICES + 1:
+                cold_start_error = error
+            else:
+                errors.append(error)
+    return float(np.mean(errors)), cold_start_error
+
+
+def main():
+    rng = np.random.default_rng(7)
+    fleet = make_fleet(rng)
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        app = create_app('testing')
+        app.config['TRAINING_API_FALLBACK'] = False
+        load_fleet(app, fleet)
+
+        print(f"{DEVICES} devices x {DAYS} days of {READING_MINUTES}-minute readings, "
+              f"+1 device with {COLD_START_READINGS} readings")
+        print(f"{'mode':<11} {'train (s)':>10} {'models':>7} {'size (MB)':>10} "
+              f"{'load (s)':>9} {'MAE (kWh)':>10} {'cold-start MAE':>15}")
+        for mode in ('per_device', 'global'):
+            shutil.rmtree('models', ignore_errors=True)
+            app.config['ENERGY_MODEL_MODE'] = mode
+            with app.app_context():
+                began = time.perf_counter()
+                ModelTrainer.train_all_models()
+                train_seconds = time.perf_counter() - began
+
+            files = [os.path.join('models', name) for name in os.listdir('models') if name.startswith('energy_')]
+            size_mb = sum(os.path.getsize(path) for path in files) / 1e6
+            began = time.perf_counter()
+            for path in files:
+                joblib.load(path)
+            load_seconds = time.perf_counter() - began
+
+            mae, cold_start = evaluate(app, fleet, mode)
+            cold_start = f"{cold_start:.5f}" if cold_start is not None else 'no model'
+            print(f"{mode:<11} {train_seconds:>10.1f} {len(files):>7} {size_mb:>10.1f} "
+                  f"{load_seconds:>9.2f} {mae:>10.5f} {cold_start:>15}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
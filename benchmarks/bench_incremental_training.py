@@ -0,0 +1,134 @@
+"""Nightly device-model training: full retrain vs incremental (warm-start) updates
+
+Run from the project root:
+    python -m benchmarks.bench_incremental_training
+
+Each device starts with HISTORY_DAYS of 10-minute readings and gets one more
+day before every nightly run. Both TRAINING_MODE settings are timed through
+ModelTrainer for NIGHTS nights, and every night's models are scored on the
+following day. Incremental mode still rebuilds fully every
+TRAINING_FULL_REBUILD_DAYS, so its steady-state cost is amortised over that
+period.
+"""
+from datetime import datetime
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app import create_app, db
+from app.models.device import Device
+from app.controllers.consumption_controller import ConsumptionController
+from app.controllers.prediction_controller import PredictionController
+from app.services.feature_pipeline import FeaturePipeline
+from app.services.model_trainer import ModelTrainer
+
+DEVICES = 5
+HISTORY_DAYS = 180
+NIGHTS = 7
+READING_MINUTES = 10
+READINGS_PER_DAY = 24 * 60 // READING_MINUTES
+
+
+def make_readings(rng, device_id, days):
+    steps = days * READINGS_PER_DAY
+    timestamps = pd.date_range(datetime(2024, 1, 1), periods=steps, freq=f'{READING_MINUTES}min')
+    hours = timestamps.hour.to_numpy()
+    peak_hour = rng.integers(0, 24)
+    # Usage drifts slowly so recent readings carry information old ones don't
+    drift = np.linspace(0.8, 1.2, steps)
+    on = rng.random(steps) < (0.2 + 0.8 * np.exp(-((hours - peak_hour) % 24) ** 2 / 8))
+    current = on * drift * rng.uniform(1.5, 2.5, steps)
+    time_on = on * READING_MINUTES * rng.uniform(0.5, 1.0, steps)
+    return pd.DataFrame({
+        'device_id': device_id,
+        'reading_timestamp': timestamps,
+        'voltage': rng.normal(220, 3, steps),
+        'current': current,
+        'time_on': time_on,
+        'active_energy': 220 * current * time_on / 60000 + rng.normal(0, 0.0005, steps).clip(0)
+    })
+
+
+def day_slice(frame, day):
+    return frame.iloc[day * READINGS_PER_DAY:(day + 1) * READINGS_PER_DAY]
+
+
+def insert(readings):
+    for device_id, frame in readings.items():
+        ConsumptionController.bulk_insert_rows(device_id, frame.to_dict('records'))
+    db.session.commit()
+
+
+def score(readings, day):
+    errors = []
+    for device_id, frame in readings.items():
+        features = FeaturePipeline.build(day_slice(frame, day), 'energy')
+        model = joblib.load(PredictionController.device_model_path(device_id))
+        predicted = model.predict(features[PredictionController.ENERGY_FEATURE_NAMES])
+        errors.append(np.abs(predicted - features['active_energy'].to_numpy()).mean())
+    return float(np.mean(errors))
+
+
+def run(app, readings, mode):
+    """Initial full training, then NIGHTS nights of one new day each"""
+    shutil.rmtree('models', ignore_errors=True)
+    app.config['TRAINING_MODE'] = mode
+    nightly_seconds, errors = [], []
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for device_id in readings:
+            db.session.add(Device(id=device_id, name=f'bench {device_id}', rated_power='500 W'))
+        insert({device_id: frame.iloc[:HISTORY_DAYS * READINGS_PER_DAY] for device_id, frame in readings.items()})
+        ModelTrainer.train_all_models()
+
+        for night in range(NIGHTS):
+            day = HISTORY_DAYS + night
+            insert({device_id: day_slice(frame, day) for device_id, frame in readings.items()})
+            began = time.perf_counter()
+            report = ModelTrainer.train_all_models_report()
+            nightly_seconds.append(time.perf_counter() - began)
+            assert report['failed'] == 0 and report['insufficient_data'] == 0
+            errors.append(score(readings, day + 1))
+
+    files = [PredictionController.device_model_path(device_id) for device_id in readings]
+    size_mb = sum(os.path.getsize(path) for path in files) / 1e6
+    trees = joblib.load(files[0]).n_estimators
+    return nightly_seconds, float(np.mean(errors)), size_mb, trees
+
+
+def main():
+    rng = np.random.default_rng(11)
+    readings = {
+        device_id: make_readings(rng, device_id, HISTORY_DAYS + NIGHTS + 1)
+        for device_id in range(1, DEVICES + 1)
+    }
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        app = create_app('testing')
+        app.config['TRAINING_API_FALLBACK'] = False
+        rebuild_days = app.config['TRAINING_FULL_REBUILD_DAYS']
+
+        print(f"{DEVICES} devices, {HISTORY_DAYS} days of history, {NIGHTS} nights of one new day")
+        print(f"{'mode':<12} {'night (s)':>10} {'MAE next day':>13} {'trees':>6} {'size (MB)':>10}")
+        results = {}
+        for mode in ('full', 'incremental'):
+            nightly_seconds, mae, size_mb, trees = run(app, readings, mode)
+            results[mode] = float(np.mean(nightly_seconds))
+            print(f"{mode:<12} {results[mode]:>10.2f} {mae:>13.5f} {trees:>6} {size_mb:>10.1f}")
+
+        amortised = (results['full'] + (rebuild_days - 1) * results['incremental']) / rebuild_days
+        print(f"incremental with a full rebuild every {rebuild_days} days: {amortised:.2f} s/night "
+              f"({results['full'] / amortised:.1f}x less than full)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
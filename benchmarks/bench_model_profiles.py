@@ -0,0 +1,98 @@
+"""Device energy model profiles: artifact size, load time, predict latency, accuracy
+
+Run from the project root:
+    python -m benchmarks.bench_model_profiles
+
+Every MODEL_PROFILE is fitted on the first 80% of each synthetic device's
+readings and saved through ModelStore with and without joblib compression
+(MODEL_COMPRESS). Load time is a cold joblib.load of each artifact; predict
+latency is one 48-hour forecast batch; MAE is measured on the held-out 20%.
+"""
+from datetime import datetime
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.controllers.prediction_controller import PredictionController
+from app.services.feature_pipeline import FeaturePipeline
+from app.services.model_store import ModelStore
+
+DEVICES = 3
+DAYS = 120
+READING_MINUTES = 10
+HOLDOUT_FRACTION = 0.2
+COMPRESS_LEVELS = (0, 3)
+PREDICT_REPEATS = 50
+
+
+def make_readings(rng):
+    steps = DAYS * 24 * 60 // READING_MINUTES
+    timestamps = pd.date_range(datetime(2024, 1, 1), periods=steps, freq=f'{READING_MINUTES}min')
+    hours = timestamps.hour.to_numpy()
+    peak_hour = rng.integers(0, 24)
+    on = rng.random(steps) < (0.2 + 0.8 * np.exp(-((hours - peak_hour) % 24) ** 2 / 8))
+    current = on * rng.uniform(1.5, 2.5, steps)
+    time_on = on * READING_MINUTES * rng.uniform(0.5, 1.0, steps)
+    return pd.DataFrame({
+        'reading_timestamp': timestamps,
+        'voltage': rng.normal(220, 3, steps),
+        'current': current,
+        'time_on': time_on,
+        'active_energy': 220 * current * time_on / 60000 + rng.normal(0, 0.0005, steps).clip(0)
+    })
+
+
+def main():
+    rng = np.random.default_rng(5)
+    devices = [make_readings(rng) for _ in range(DEVICES)]
+    cut = int(len(devices[0]) * (1 - HOLDOUT_FRACTION))
+    horizon = FeaturePipeline.build(FeaturePipeline.horizon_frame(datetime(2024, 6, 1), 2), 'energy')
+    horizon = horizon[PredictionController.ENERGY_FEATURE_NAMES]
+    workdir = tempfile.mkdtemp()
+
+    print(f"{DEVICES} devices x {cut:,} training readings, per-artifact averages")
+    print(f"{'profile':<9} {'compress':>8} {'fit (s)':>8} {'size (MB)':>10} "
+          f"{'load (ms)':>10} {'predict (ms)':>13} {'MAE (kWh)':>10}")
+    try:
+        for profile in PredictionController.ENERGY_MODEL_PROFILES:
+            began = time.perf_counter()
+            models = [PredictionController.fit_energy_model(frame.iloc[:cut], profile=profile) for frame in devices]
+            fit_seconds = (time.perf_counter() - began) / DEVICES
+
+            errors = []
+            for model, frame in zip(models, devices):
+                holdout = FeaturePipeline.build(frame.iloc[cut:], 'energy')
+                predicted = model.predict(holdout[PredictionController.ENERGY_FEATURE_NAMES])
+                errors.append(np.abs(predicted - holdout['active_energy'].to_numpy()).mean())
+
+            latencies = []
+            for _ in range(PREDICT_REPEATS):
+                began = time.perf_counter()
+                models[0].predict(horizon)
+                latencies.append(time.perf_counter() - began)
+
+            for compress in COMPRESS_LEVELS:
+                store = ModelStore(compress=compress)
+                paths = [os.path.join(workdir, f'{profile}_{compress}_{i}.pkl') for i in range(DEVICES)]
+                for path, model in zip(paths, models):
+                    store.save(path, model)
+                size_mb = np.mean([os.path.getsize(path) for path in paths]) / 1e6
+
+                began = time.perf_counter()
+                for path in paths:
+                    joblib.load(path)
+                load_ms = (time.perf_counter() - began) / DEVICES * 1000
+
+                print(f"{profile:<9} {compress:>8} {fit_seconds:>8.2f} {size_mb:>10.2f} {load_ms:>10.1f} "
+                      f"{np.median(latencies) * 1000:>13.2f} {np.mean(errors):>10.5f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
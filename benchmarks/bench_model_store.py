@@ -0,0 +1,76 @@
+"""Model loading: joblib.load per call vs the in-process ModelStore
+
+Run from the project root:
+    python -m benchmarks.bench_model_store
+
+Simulates repeated prediction runs over a fleet of device models. Each
+run fetches every model once, so after the first pass the store should
+answer from memory. The cache is also timed with mmap_mode='r'.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from app.services.model_store import ModelStore
+
+MODELS = 50
+RUNS = 5
+
+
+def make_models(directory):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((2000, 6)), columns=['hour', 'day_of_week', 'month', 'time_on', 'current', 'voltage'])
+    y = rng.random(2000)
+    template = os.path.join(directory, 'energy_model_device_1.pkl')
+    joblib.dump(RandomForestRegressor(n_estimators=100, random_state=42).fit(X, y), template)
+    paths = [template]
+    for device_id in range(2, MODELS + 1):
+        path = os.path.join(directory, f'energy_model_device_{device_id}.pkl')
+        shutil.copy(template, path)
+        paths.append(path)
+    return paths
+
+
+def run(load, paths):
+    began = time.perf_counter()
+    for _ in range(RUNS):
+        for path in paths:
+            load(path)
+    return time.perf_counter() - began
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        paths = make_models(directory)
+        size_mb = os.path.getsize(paths[0]) / 1e6
+        print(f"{MODELS} models of {size_mb:.1f} MB, {RUNS} runs over the fleet")
+
+        seconds = run(joblib.load, paths)
+        print(f"{'joblib.load every call':<28} {seconds:>8.2f} s")
+
+        for mmap_mode in (None, 'r'):
+            store = ModelStore(max_entries=MODELS, mmap_mode=mmap_mode)
+            seconds = run(store.get, paths)
+            stats = store.stats()
+            label = f"ModelStore (mmap={mmap_mode})"
+            print(f"{label:<28} {seconds:>8.2f} s  hits={stats['hits']} misses={stats['misses']} "
+                  f"load={stats['load_seconds']:.2f} s")
+
+        store = ModelStore(max_entries=MODELS // 2)
+        seconds = run(store.get, paths)
+        stats = store.stats()
+        print(f"{'ModelStore (half capacity)':<28} {seconds:>8.2f} s  hits={stats['hits']} "
+              f"evictions={stats['evictions']}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""API response encoding: bytes on the wire and encode time
+
+Run from the project root:
+    python -m benchmarks.bench_response_encoding
+
+A SQLite file is loaded with a year of 5-minute readings for one device and
+a month of hourly predictions for a fleet. Then:
+
+- the full consumption list is encoded through row_to_dict + jsonify and
+  through ConsumptionController.record_json, and the two are checked to decode equal;
+- a few endpoints are fetched without and with Accept-Encoding: gzip.
+"""
+from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from flask import jsonify
+
+from app import create_app, db
+from app.models.device import Device
+from app.models.consumption import ConsumptionRecord
+from app.models.prediction import EnergyPrediction
+from app.controllers.consumption_controller import ConsumptionController
+from app.services.response_cache import response_cache
+
+READINGS = 365 * 24 * 12
+DEVICES = 20
+PREDICTION_DAYS = 30
+REPEATS = 3
+START = datetime(2024, 1, 1)
+ENDPOINTS = [
+    '/api/consumption/1',
+    '/api/consumption/1?stream=ndjson',
+    '/api/consumption/1?resolution=1h',
+    f'/api/predictions/all?start_date={START.date()}&end_date={(START + timedelta(days=PREDICTION_DAYS - 1)).date()}',
+    '/api/devices'
+]
+
+
+def load(app, rng):
+    with app.app_context():
+        for device_id in range(1, DEVICES + 1):
+            db.session.add(Device(id=device_id, name=f'bench {device_id}', rated_power='500 W'))
+        db.session.commit()
+
+        timestamps = pd.date_range(START, periods=READINGS, freq='5min').to_pydatetime()
+        current = rng.uniform(0.1, 2.0, READINGS)
+        db.session.execute(ConsumptionRecord.__table__.insert(), [
+            {
+                'device_id': 1,
+                'voltage': float(rng.normal(220, 2)),
+                'current': float(current[i]),
+                'time_on': 5.0,
+                'active_energy': float(current[i] * 220 * 5 / 60000),
+                'reading_timestamp': timestamps[i]
+            }
+            for i in range(READINGS)
+        ])
+
+        created = datetime.utcnow()
+        db.session.execute(EnergyPrediction.__table__.insert(), [
+            {
+                'device_id': device_id,
+                'predicted_energy': float(value),
+                'prediction_date': (START + timedelta(days=day)).date(),
+                'prediction_hour': hour,
+                'created_at': created
+            }
+            for device_id in range(1, DEVICES + 1)
+            for day in range(PREDICTION_DAYS)
+            for hour, value in enumerate(rng.uniform(0, 0.5, 24))
+        ])
+        db.session.commit()
+
+
+def timed(function):
+    function()
+    began = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function()
+    return result, (time.perf_counter() - began) / REPEATS
+
+
+def compare_encoders(app):
+    with app.test_request_context():
+        def dicts():
+            return jsonify(ConsumptionController.get_device_consumption(1)).get_data()
+
+        def template():
+            return ConsumptionController.get_device_consumption_json(1).encode()
+
+        old, old_seconds = timed(dicts)
+        new, new_seconds = timed(template)
+        assert json.loads(old) == json.loads(new)
+        print(f"{'consumption list':<22} {old_seconds * 1000:>10.0f} {new_seconds * 1000:>10.0f} "
+              f"{old_seconds / new_seconds:>7.1f}x")
+
+
+def compare_wire_bytes(app):
+    response_cache.enabled = False
+    client = app.test_client()
+    print(f"{'endpoint':<40} {'identity':>11} {'gzip':>11} {'ratio':>6} {'gzip ms':>8}")
+    for url in ENDPOINTS:
+        plain = client.get(url)
+        began = time.perf_counter()
+        packed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        body = packed.get_data()
+        seconds = time.perf_counter() - began
+        encoding = packed.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            assert gzip.decompress(body) == plain.get_data()
+        label = url.split('?')[0] + ('?' + url.split('?')[1][:14] if '?' in url else '')
+        print(f"{label:<40} {len(plain.get_data()):>11,} {len(body):>11,} "
+              f"{len(plain.get_data()) / len(body):>5.1f}x {seconds * 1000:>8.0f}"
+              + ('' if encoding else '  (below threshold, not compressed)'))
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        app = create_app('development')
+        app.config['DEBUG'] = False  # compact JSON, as in production
+        app.config['SQLALCHEMY_ECHO'] = False
+        load(app, np.random.default_rng(5))
+        print(f"{READINGS:,} readings, {DEVICES * PREDICTION_DAYS * 24:,} predictions")
+
+        print(f"{'encode':<22} {'dicts (ms)':>10} {'fast (ms)':>10} {'speedup':>8}")
+        compare_encoders(app)
+        print()
+        compare_wire_bytes(app)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
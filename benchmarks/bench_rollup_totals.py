@@ -0,0 +1,104 @@
+"""Consumption range totals: SUM over raw readings vs hourly/daily rollups
+
+Run from the project root:
+    python -m benchmarks.bench_rollup_totals
+
+A year of 10-minute readings per device is written to a SQLite file through
+ConsumptionController.bulk_insert_rows (which keeps the rollups current),
+then get_total_consumption is timed with CONSUMPTION_TOTALS_FROM_ROLLUPS off
+and on for ranges of different lengths. Range edges fall mid-hour, so the
+rollup path also reads raw readings at both ends.
+"""
+from datetime import datetime, timedelta
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import create_app, db
+from app.models.device import Device
+from app.controllers.consumption_controller import ConsumptionController
+from app.services.rollups import ConsumptionRollups
+
+DEVICES = 20
+DAYS = 365
+READING_MINUTES = 10
+REPEATS = 5
+START = datetime(2024, 1, 1)
+RANGES = {
+    '1 day': timedelta(days=1),
+    '30 days': timedelta(days=30),
+    '365 days': timedelta(days=364, hours=23)
+}
+
+
+def load(app, rng):
+    steps = DAYS * 24 * 60 // READING_MINUTES
+    timestamps = pd.date_range(START, periods=steps, freq=f'{READING_MINUTES}min').to_pydatetime()
+    with app.app_context():
+        for device_id in range(1, DEVICES + 1):
+            db.session.add(Device(id=device_id, name=f'bench {device_id}', rated_power='500 W'))
+        db.session.commit()
+
+        began = time.perf_counter()
+        for device_id in range(1, DEVICES + 1):
+            current = rng.uniform(0.1, 2.0, steps)
+            rows = [
+                {
+                    'device_id': device_id,
+                    'voltage': 220.0,
+                    'current': float(current[i]),
+                    'time_on': float(READING_MINUTES),
+                    'active_energy': float(current[i] * 220 * READING_MINUTES / 60000),
+                    'reading_timestamp': timestamps[i]
+                }
+                for i in range(steps)
+            ]
+            ConsumptionController.bulk_insert_rows(device_id, rows)
+            db.session.commit()
+        return steps * DEVICES, time.perf_counter() - began
+
+
+def timed_totals(app, from_rollups, start, end):
+    app.config['CONSUMPTION_TOTALS_FROM_ROLLUPS'] = from_rollups
+    with app.app_context():
+        ConsumptionController.get_total_consumption(None, start, end)
+        began = time.perf_counter()
+        for _ in range(REPEATS):
+            totals = ConsumptionController.get_total_consumption(None, start, end)
+        return totals, (time.perf_counter() - began) / REPEATS
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        app = create_app('development')
+        app.config['SQLALCHEMY_ECHO'] = False
+        readings, ingest_seconds = load(app, np.random.default_rng(3))
+        print(f"{readings:,} readings ingested with rollups in {ingest_seconds:.1f}s")
+
+        with app.app_context():
+            began = time.perf_counter()
+            summary = ConsumptionRollups.backfill()
+            print(f"backfill of {summary['hours']:,} hourly buckets: {time.perf_counter() - began:.1f}s")
+
+        print(f"{'range':<10} {'raw SUM (ms)':>13} {'rollups (ms)':>13} {'speedup':>8}")
+        for label, length in RANGES.items():
+            start = START + timedelta(days=7, minutes=17)
+            end = start + length
+            raw, raw_seconds = timed_totals(app, False, start, end)
+            rolled, rollup_seconds = timed_totals(app, True, start, end)
+            assert np.allclose([row['total_energy'] for row in raw], [row['total_energy'] for row in rolled])
+            print(f"{label:<10} {raw_seconds * 1000:>13.1f} {rollup_seconds * 1000:>13.1f} "
+                  f"{raw_seconds / rollup_seconds:>7.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,120 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = False
     TESTING = False
+    
+    # Rows per multi-row INSERT when ingesting consumption readings
+    CONSUMPTION_INSERT_CHUNK_SIZE = int(os.environ.get('CONSUMPTION_INSERT_CHUNK_SIZE', 500))
+    # Bytes read at a time when streaming consumption payloads from the external API
+    CONSUMPTION_STREAM_CHUNK_SIZE = int(os.environ.get('CONSUMPTION_STREAM_CHUNK_SIZE', 65536))
+    # Devices fetched in parallel by the consumption sync job (1 = sequential)
+    CONSUMPTION_SYNC_CONCURRENCY = int(os.environ.get('CONSUMPTION_SYNC_CONCURRENCY', 8))
+    # Answer consumption totals from the hourly/daily rollup tables. Off by default:
+    # run `flask backfill-rollups` on an existing database before turning it on, and
+    # only when every reading is written through the sync path
+    CONSUMPTION_TOTALS_FROM_ROLLUPS = os.environ.get('CONSUMPTION_TOTALS_FROM_ROLLUPS', 'false').lower() == 'true'
+    # Readings per page of GET /api/consumption/<device_id>?limit=..., and the cap on limit
+    CONSUMPTION_PAGE_SIZE = int(os.environ.get('CONSUMPTION_PAGE_SIZE', 1000))
+    CONSUMPTION_MAX_PAGE_SIZE = int(os.environ.get('CONSUMPTION_MAX_PAGE_SIZE', 10000))
+    # Rows fetched per round trip from the server-side cursor behind ?stream=...
+    CONSUMPTION_STREAM_BATCH_SIZE = int(os.environ.get('CONSUMPTION_STREAM_BATCH_SIZE', 1000))
+    # Rows fetched per round trip by bulk exports (/api/export, `flask export-data`)
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))
+    
+    # Cache for prediction and dashboard reads, invalidated when predictions are
+    # generated. Backend is 'memory' (per process) or the import path of a
+    # CacheBackend subclass; TTL in seconds
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 6 * 3600))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    # Days of past dashboard overview snapshots kept and refreshed
+    DASHBOARD_SNAPSHOT_RETENTION_DAYS = int(os.environ.get('DASHBOARD_SNAPSHOT_RETENTION_DAYS', 30))
+    
+    # gzip API JSON/CSV responses for clients that accept it; buffered bodies
+    # smaller than API_GZIP_MIN_BYTES are sent as they are
+    API_GZIP_ENABLED = os.environ.get('API_GZIP_ENABLED', 'true').lower() == 'true'
+    API_GZIP_MIN_BYTES = int(os.environ.get('API_GZIP_MIN_BYTES', 1024))
+    API_GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL', 6))
+    
+    # Shared HTTP client for the external metering API
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 16))
+    # Largest JSON body kept in memory to answer 304 revalidations
+    HTTP_MAX_CACHED_BODY_BYTES = int(os.environ.get('HTTP_MAX_CACHED_BODY_BYTES', 1024 * 1024))
+    
+    # Where training reads readings from: 'db' (consumption_records) or 'api'
+    TRAINING_DATA_SOURCE = os.environ.get('TRAINING_DATA_SOURCE', 'db')
+    # Download from the API when the local table has too few readings
+    TRAINING_API_FALLBACK = os.environ.get('TRAINING_API_FALLBACK', 'true').lower() == 'true'
+    # 'per_device' (one model file per device) or 'global' (one model for the fleet)
+    ENERGY_MODEL_MODE = os.environ.get('ENERGY_MODEL_MODE', 'per_device')
+    # Processes fitting per-device models (1 = sequential in this process); cores
+    # are split between them (forest n_jobs and BLAS/OpenMP thread limits)
+    TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS', 1))
+    # multiprocessing start method for training workers
+    TRAINING_START_METHOD = os.environ.get('TRAINING_START_METHOD', 'spawn')
+    # 'full' retrains device models from scratch; 'incremental' adds trees fitted on
+    # readings since the last training, rebuilding fully every few days or once the
+    # forest reaches TRAINING_MAX_TREES
+    TRAINING_MODE = os.environ.get('TRAINING_MODE', 'full')
+    TRAINING_INCREMENTAL_TREES = int(os.environ.get('TRAINING_INCREMENTAL_TREES', 10))
+    TRAINING_FULL_REBUILD_DAYS = int(os.environ.get('TRAINING_FULL_REBUILD_DAYS', 7))
+    TRAINING_MAX_TREES = int(os.environ.get('TRAINING_MAX_TREES', 300))
+    # Loaded models kept in memory per process, and joblib mmap mode ('r' or unset)
+    MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 64))
+    MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE') or None
+    # Device energy estimator: 'default', 'compact' (depth/leaf-capped forest) or
+    # 'hist_gb' (histogram gradient boosting)
+    MODEL_PROFILE = os.environ.get('MODEL_PROFILE', 'default')
+    # joblib compression level for saved models (0-9; 0 keeps them mmap-able)
+    MODEL_COMPRESS = int(os.environ.get('MODEL_COMPRESS', 0))
+    
+    # Which process runs the scheduled jobs when several serve the app: 'auto' ('file'
+    # with SQLite, else 'db'), 'db' (lease row renewed every heartbeat, works across
+    # hosts), 'file' (flock on SCHEDULER_LOCK_FILE, one host) or 'off' (every process)
+    SCHEDULER_LEADER_ELECTION = os.environ.get('SCHEDULER_LEADER_ELECTION', 'auto')
+    SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 90))
+    SCHEDULER_LEASE_HEARTBEAT = int(os.environ.get('SCHEDULER_LEASE_HEARTBEAT', 30))
+    # Defaults to scheduler.lock in the instance folder
+    SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE') or None
+    # Seconds a job may start late (e.g. while the previous run was still going)
+    # before that run is dropped
+    SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.environ.get('SCHEDULER_MISFIRE_GRACE_SECONDS', 600))
+    
+    # Request/job metrics at /api/metrics, and days of job run reports kept
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    JOB_RUN_RETENTION_DAYS = int(os.environ.get('JOB_RUN_RETENTION_DAYS', 30))
+    
+    # Per-request SQL statement budgets declared with @query_budget:
+    # 'off', 'warn' (log) or 'raise' (fail the request)
+    SQL_QUERY_BUDGET = os.environ.get('SQL_QUERY_BUDGET', 'off')
+    # Request profiling; each part registers nothing while it is off.
+    # Server-Timing header with statement count, DB time and total time
+    REQUEST_TIMING = os.environ.get('REQUEST_TIMING', 'false').lower() == 'true'
+    # Log statements taking at least this many milliseconds, with parameters (0 = off)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+    # cProfile requests into PROFILE_DIR (default: instance/profiles): 'off', 'header'
+    # (requests sending PROFILE_HEADER) or 'all'. Keep 'header' off on public servers
+    PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'off')
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or None
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///energy_monitor.db')
+    SQL_QUERY_BUDGET = os.environ.get('SQL_QUERY_BUDGET', 'warn')
+    REQUEST_TIMING = os.environ.get('REQUEST_TIMING', 'true').lower() == 'true'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 250))
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQL_QUERY_BUDGET = 'raise'
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -0,0 +1,30 @@
+"""Generation counters for the API response cache
+
+Revision ID: 3b1f0c9e7a42
+Revises: 8d69871d67ee
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c9e7a42'
+down_revision = '8d69871d67ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'cache_generations' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('cache_generations',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('cache_generations')
@@ -0,0 +1,63 @@
+"""Composite indexes and unique keys for the hot query shapes
+
+consumption_records (device_id, reading_timestamp), energy_predictions
+(device_id, prediction_date, prediction_hour) and peak_demand_predictions
+(prediction_date, prediction_hour) become unique. Duplicate rows are removed
+first, keeping the newest (highest id) of each group, since older databases
+never enforced these keys. Indexes that already exist are left alone.
+
+Revision ID: 8d69871d67ee
+Revises: f725448fbe96
+Create Date: 2026-10-17 05:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d69871d67ee'
+down_revision = 'f725448fbe96'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns, unique)
+INDEXES = [
+    ('consumption_records', 'ix_consumption_device_timestamp', ['device_id', 'reading_timestamp'], True),
+    ('energy_predictions', 'ix_energy_predictions_device_date_hour', ['device_id', 'prediction_date', 'prediction_hour'], True),
+    ('energy_predictions', 'ix_energy_predictions_date_hour', ['prediction_date', 'prediction_hour'], False),
+    ('peak_demand_predictions', 'ix_peak_demand_predictions_date_hour', ['prediction_date', 'prediction_hour'], True)
+]
+
+
+def delete_duplicates(table, columns):
+    """Keep only the highest id of each group of rows sharing `columns`"""
+    keys = ', '.join(columns)
+    # The derived table lets MySQL delete from the table it reads
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM {table} GROUP BY {keys}) AS keep)"
+    )
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table, name, columns, unique in INDEXES:
+        indexes = inspector.get_indexes(table)
+        if any(index['name'] == name for index in indexes):
+            continue
+        if unique:
+            delete_duplicates(table, columns)
+        op.create_index(name, table, columns, unique=unique)
+
+    # The unique index replaces the constraint added before migrations existed
+    constraints = inspector.get_unique_constraints('consumption_records')
+    if any(constraint['name'] == 'uq_consumption_device_timestamp' for constraint in constraints):
+        with op.batch_alter_table('consumption_records') as batch_op:
+            batch_op.drop_constraint('uq_consumption_device_timestamp', type_='unique')
+
+
+def downgrade():
+    for table, name, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
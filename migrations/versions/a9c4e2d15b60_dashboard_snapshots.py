@@ -0,0 +1,30 @@
+"""Precomputed dashboard overview documents
+
+Revision ID: a9c4e2d15b60
+Revises: 3b1f0c9e7a42
+Create Date: 2026-10-17 11:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e2d15b60'
+down_revision = '3b1f0c9e7a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'dashboard_snapshots' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('dashboard_snapshots',
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('document', sa.Text(), nullable=False),
+        sa.Column('generated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('snapshot_date')
+        )
+
+
+def downgrade():
+    op.drop_table('dashboard_snapshots')
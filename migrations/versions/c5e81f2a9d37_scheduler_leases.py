@@ -0,0 +1,32 @@
+"""Scheduler leader lease
+
+Revision ID: c5e81f2a9d37
+Revises: a9c4e2d15b60
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e81f2a9d37'
+down_revision = 'a9c4e2d15b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'scheduler_leases' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('scheduler_leases',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False),
+        sa.Column('renewed_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('scheduler_leases')
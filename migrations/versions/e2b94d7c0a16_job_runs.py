@@ -0,0 +1,42 @@
+"""Scheduled job run reports
+
+Revision ID: e2b94d7c0a16
+Revises: c5e81f2a9d37
+Create Date: 2026-10-17 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b94d7c0a16'
+down_revision = 'c5e81f2a9d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'job_runs' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_name', sa.String(length=50), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('items_processed', sa.Integer(), nullable=False),
+        sa.Column('failures', sa.Integer(), nullable=False),
+        sa.Column('db_writes', sa.Integer(), nullable=False),
+        sa.Column('rows_written', sa.Integer(), nullable=False),
+        sa.Column('upstream_requests', sa.Integer(), nullable=False),
+        sa.Column('upstream_seconds', sa.Float(), nullable=False),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_job_runs_job_started', 'job_runs', ['job_name', 'started_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_job_runs_job_started', table_name='job_runs')
+    op.drop_table('job_runs')
@@ -0,0 +1,103 @@
+"""Baseline schema
+
+Databases created by db.create_all() before migrations were introduced
+already have these tables; they are only created where missing, so
+`flask db upgrade` works on new and existing databases alike.
+
+Revision ID: f725448fbe96
+Revises: 
+Create Date: 2026-10-17 05:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f725448fbe96'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'devices' not in existing:
+        op.create_table('devices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('meter_number', sa.String(length=50), nullable=True),
+        sa.Column('rated_power', sa.String(length=50), nullable=False),
+        sa.Column('relay_status', sa.String(length=10), nullable=True),
+        sa.Column('date_added', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'peak_demand_predictions' not in existing:
+        op.create_table('peak_demand_predictions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('predicted_peak_demand', sa.Float(), nullable=False),
+        sa.Column('prediction_date', sa.Date(), nullable=False),
+        sa.Column('prediction_hour', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    for table in ('consumption_hourly_rollups', 'consumption_daily_rollups'):
+        if table not in existing:
+            op.create_table(table,
+            sa.Column('device_id', sa.Integer(), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('energy_sum', sa.Float(), nullable=False),
+            sa.Column('max_power', sa.Float(), nullable=False),
+            sa.Column('reading_count', sa.Integer(), nullable=False),
+            sa.Column('voltage_min', sa.Float(), nullable=False),
+            sa.Column('voltage_max', sa.Float(), nullable=False),
+            sa.Column('current_min', sa.Float(), nullable=False),
+            sa.Column('current_max', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+            sa.PrimaryKeyConstraint('device_id', 'bucket_start')
+            )
+    if 'consumption_records' not in existing:
+        op.create_table('consumption_records',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('voltage', sa.Float(), nullable=False),
+        sa.Column('current', sa.Float(), nullable=False),
+        sa.Column('time_on', sa.Float(), nullable=False),
+        sa.Column('active_energy', sa.Float(), nullable=False),
+        sa.Column('reading_timestamp', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('device_id', 'reading_timestamp', name='uq_consumption_device_timestamp')
+        )
+    if 'consumption_sync_cursors' not in existing:
+        op.create_table('consumption_sync_cursors',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('last_reading_timestamp', sa.DateTime(), nullable=False),
+        sa.Column('record_count', sa.Integer(), nullable=False),
+        sa.Column('last_record_hash', sa.String(length=40), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id')
+        )
+    if 'energy_predictions' not in existing:
+        op.create_table('energy_predictions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('predicted_energy', sa.Float(), nullable=False),
+        sa.Column('prediction_date', sa.Date(), nullable=False),
+        sa.Column('prediction_hour', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('energy_predictions')
+    op.drop_table('consumption_sync_cursors')
+    op.drop_table('consumption_records')
+    op.drop_table('consumption_hourly_rollups')
+    op.drop_table('consumption_daily_rollups')
+    op.drop_table('peak_demand_predictions')
+    op.drop_table('devices')
@@ -1,12 +1,13 @@
 from app import create_app, db
 from scheduler import setup_scheduler
+import multiprocessing
 import os
 
 # Create app instance
 app = create_app(os.getenv('FLASK_ENV', 'default'))
 
-# Set up scheduler
-scheduler = setup_scheduler(app)
+# Set up scheduler (not in training worker processes, which re-import this module)
+scheduler = setup_scheduler(app) if multiprocessing.parent_process() is None else None
 
 if __name__ == '__main__':
     with app.app_context():
@@ -2,16 +2,32 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from app.services.data_collector import DataCollector
 from app.services.model_trainer import ModelTrainer
 from app.models.device import Device
+from app.utils.http_client import http_client
+from app.services.leader_election import leader_election
+from app.services.job_runs import JobRuns
 from app import create_app, db
+from datetime import datetime
+from functools import wraps
+import atexit
 import logging
-import requests
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def setup_scheduler(app):
-    """Set up the background scheduler for automated tasks"""
-    scheduler = BackgroundScheduler()
+    """Set up the background scheduler for automated tasks
+    
+    Every process serving the app runs this, but only the elected leader
+    (see LeaderElection) runs the jobs; the others skip each run and take
+    over if the leader goes away.
+    """
+    scheduler = BackgroundScheduler(job_defaults={
+        # A run still going when the next one is due is not started twice, and
+        # runs missed meanwhile collapse into one
+        'max_instances': 1,
+        'coalesce': True,
+        'misfire_grace_time': app.config.get('SCHEDULER_MISFIRE_GRACE_SECONDS', 600)
+    })
     
     # Add jobs with app context
     with app.app_context():
@@ -49,42 +65,105 @@ def setup_scheduler(app):
             minute=30,
             args=[app]
         )
+        
+        # Renew the lease, or take it over from a leader that has gone away
+        if leader_election.mode != 'off':
+            scheduler.add_job(
+                leader_heartbeat_job,
+                'interval',
+                seconds=app.config.get('SCHEDULER_LEASE_HEARTBEAT', 30),
+                next_run_time=datetime.now(),
+                args=[app]
+            )
     
     # Start the scheduler
     scheduler.start()
-    logger.info("Scheduler started")
+    atexit.register(shutdown_scheduler, scheduler, app)
+    logger.info(f"Scheduler started (leader election: {leader_election.mode})")
     return scheduler
 
+def shutdown_scheduler(scheduler, app):
+    """Stop the scheduler and hand leadership to a standby process"""
+    scheduler.shutdown(wait=False)
+    with app.app_context():
+        leader_election.release()
+
+def leader_heartbeat_job(app):
+    """Job to keep or take the scheduler lease"""
+    with app.app_context():
+        leader_election.acquire()
+
+def leader_only(job):
+    """Run a scheduled job only in the process that holds the scheduler lease"""
+    @wraps(job)
+    def wrapper(app):
+        with app.app_context():
+            is_leader = leader_election.acquire()
+        if not is_leader:
+            logger.debug(f"Skipping {job.__name__}, another process is the scheduler leader")
+            return
+        return job(app)
+    return wrapper
+
+@leader_only
 def sync_devices_job(app):
     """Job to sync devices from external API"""
     with app.app_context():
         logger.info("Running device sync job")
-        DataCollector.sync_all_devices()
+        with JobRuns.record('sync_devices') as run:
+            if not DataCollector.sync_all_devices():
+                run.fail('device sync failed')
+            run.add_items(Device.query.count())
 
+@leader_only
 def sync_consumption_job(app):
     """Job to sync consumption data from external API"""
     with app.app_context():
         logger.info("Running consumption sync job")
-        try:
-            # Get device IDs from the API
-            response = requests.get(DataCollector.DEVICES_API_URL)
-            response.raise_for_status()
-            devices_data = response.json()
-            device_ids = [device['id'] for device in devices_data]
-            
-            # Sync consumption data for each device
-            DataCollector.sync_all_consumption(device_ids)
-        except Exception as e:
-            logger.error(f"Error in consumption sync job: {str(e)}")
+        with JobRuns.record('sync_consumption') as run:
+            try:
+                # Get device IDs from the API
+                devices_data = http_client.get_json(DataCollector.DEVICES_API_URL)
+                device_ids = [device['id'] for device in devices_data]
+                
+                # Sync consumption data for each device
+                report = DataCollector.sync_consumption_report(device_ids)
+                run.add_items(report['new_records'])
+                for result in report['devices']:
+                    if not result['success']:
+                        run.add_failure(result['device_id'], result['error'])
+                run.details.update(
+                    devices=len(device_ids), synced=report['synced'], concurrency=report['concurrency']
+                )
+                logger.info(f"Upstream HTTP stats: {http_client.stats()}")
+            except Exception as e:
+                logger.error(f"Error in consumption sync job: {str(e)}")
+                run.fail(str(e))
 
+@leader_only
 def train_models_job(app):
     """Job to train prediction models"""
     with app.app_context():
         logger.info("Running model training job")
-        ModelTrainer.train_all_models()
+        with JobRuns.record('train_models') as run:
+            report = ModelTrainer.train_all_models_report()
+            run.add_items(report['trained'] + report['updated'])
+            for result in report['devices']:
+                if result['status'] in ('failed', 'insufficient_data'):
+                    run.add_failure(result['device_id'], result['error'] or result['status'])
+            run.details.update({
+                name: report[name] for name in ('mode', 'workers', 'up_to_date', 'skipped', 'saved_seconds')
+            })
+            if not report['success']:
+                run.fail('model training failed')
 
+@leader_only
 def generate_predictions_job(app):
     """Job to generate predictions"""
     with app.app_context():
         logger.info("Running prediction generation job")
-        ModelTrainer.generate_predictions(days_ahead=2)
+        with JobRuns.record('generate_predictions') as run:
+            written = ModelTrainer.generate_predictions(days_ahead=2)
+            if written is None:
+                run.fail('prediction generation failed')
+            run.add_items(written)
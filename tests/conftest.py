@@ -0,0 +1,89 @@
+from app import create_app, db
+from app.controllers.consumption_controller import ConsumptionController
+from app.models.device import Device
+from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app.services.response_cache import response_cache
+from datetime import date, datetime, timedelta
+import pytest
+
+
+@pytest.fixture
+def app():
+    """An app on a fresh in-memory database, with the testing config"""
+    app = create_app('testing')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def uncached(app):
+    """The response cache switched off, so every request reaches the view
+
+    Depends on `app` because create_app re-applies RESPONSE_CACHE_ENABLED.
+    """
+    enabled, response_cache.enabled = response_cache.enabled, False
+    yield
+    response_cache.enabled = enabled
+
+
+@pytest.fixture
+def device_readings(app, tmp_path, monkeypatch):
+    """Two devices with three days of hourly readings; models are saved under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    start = datetime(2026, 9, 1)
+    with app.app_context():
+        for device_id in (1, 2):
+            db.session.add(Device(id=device_id, name=f'Device {device_id}', rated_power='500 W'))
+            ConsumptionController.bulk_insert_rows(device_id, [
+                {
+                    'device_id': device_id,
+                    'voltage': 220.0,
+                    'current': 0.2 + 0.1 * (hour % 7),
+                    'time_on': 60.0,
+                    'active_energy': 0.05 * (hour % 5 + device_id),
+                    'reading_timestamp': start + timedelta(hours=hour)
+                }
+                for hour in range(72)
+            ])
+        db.session.commit()
+
+
+@pytest.fixture
+def seed_predictions(app):
+    """Function adding devices with hourly energy (and peak) predictions, inside an app context"""
+    return add_predictions
+
+
+def add_predictions(device_count, days=3, start=None):
+    """Add devices with hourly energy predictions, and peak predictions, for `days` days from `start`"""
+    start = start or date.today()
+    dates = [start + timedelta(days=day) for day in range(days)]
+    first_id = (db.session.query(db.func.max(Device.id)).scalar() or 0) + 1
+    device_ids = list(range(first_id, first_id + device_count))
+
+    for device_id in device_ids:
+        db.session.add(Device(id=device_id, name=f'Device {device_id}', rated_power='500 W'))
+    db.session.flush()
+    db.session.execute(db.insert(EnergyPrediction), [
+        {
+            'device_id': device_id,
+            'predicted_energy': 0.1 * device_id + 0.01 * hour,
+            'prediction_date': day,
+            'prediction_hour': hour
+        }
+        for device_id in device_ids for day in dates for hour in range(24)
+    ])
+    if first_id == 1:
+        db.session.execute(db.insert(PeakDemandPrediction), [
+            {'predicted_peak_demand': 1.0 + hour / 24, 'prediction_date': day, 'prediction_hour': hour}
+            for day in dates for hour in range(24)
+        ])
+    db.session.commit()
+    return device_ids
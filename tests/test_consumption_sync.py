@@ -0,0 +1,161 @@
+"""Consumption sync against a local stand-in for the metering API
+
+The stand-in serves `all-records-per-device/<id>` with an injected delay per
+request and ETag revalidation, so concurrent and sequential syncs can be
+compared on what they store and how long the round trips take.
+"""
+from app import db
+from app.controllers.consumption_controller import ConsumptionController
+from app.models.consumption import ConsumptionRecord
+from app.models.device import Device
+from app.services.data_collector import DataCollector
+from app.utils.http_client import http_client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta
+import json
+import threading
+import time
+import pytest
+
+LATENCY_SECONDS = 0.2
+DEVICES = 6
+
+
+class StandInApi(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    readings = {}  # device_id -> number of readings served
+    failing = set()
+    requests = []
+
+    def do_GET(self):
+        time.sleep(LATENCY_SECONDS)
+        device_id = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+        self.requests.append(device_id)
+        if device_id in self.failing:
+            self.reply(500, b'')
+            return
+
+        count = self.readings[device_id]
+        etag = f'"{device_id}-{count}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.reply(304, b'')
+            return
+        start = datetime(2026, 9, 1)
+        body = json.dumps([
+            {
+                'Appliance_Info': device_id,
+                'Voltage': '220.0',
+                'Current': '0.50',
+                'TimeOn': '1.00',
+                'ActiveEnergy': f'{0.001 * (i + 1):.4f}',
+                'Reading_Time_Stamp': (start + timedelta(minutes=i)).isoformat() + 'Z'
+            }
+            for i in range(count)
+        ]).encode()
+        self.reply(200, body, etag)
+
+    def reply(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(app, monkeypatch):
+    StandInApi.readings = {device_id: 100 for device_id in range(1, DEVICES + 1)}
+    StandInApi.failing = set()
+    StandInApi.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        DataCollector, 'CONSUMPTION_API_BASE_URL', f'http://127.0.0.1:{server.server_port}/all-records-per-device'
+    )
+    # Retries of the failing device would add backoff unrelated to what is measured
+    http_client.configure(retries=0, pool_size=DEVICES)
+
+    with app.app_context():
+        for device_id in range(1, DEVICES + 1):
+            db.session.add(Device(id=device_id, name=f'Device {device_id}', rated_power='500 W'))
+        db.session.commit()
+    yield StandInApi
+    server.shutdown()
+    server.server_close()
+
+
+def stored(device_id):
+    return db.session.query(db.func.count(ConsumptionRecord.id)).filter_by(device_id=device_id).scalar()
+
+
+def timed_sync(concurrency):
+    started = time.perf_counter()
+    report = DataCollector.sync_consumption_report(list(range(1, DEVICES + 1)), concurrency)
+    return report, time.perf_counter() - started
+
+
+def test_concurrent_sync_stores_new_readings_once(app, stand_in):
+    with app.app_context():
+        report, _ = timed_sync(DEVICES)
+        assert report['success']
+        assert [stored(device_id) for device_id in range(1, DEVICES + 1)] == [100] * DEVICES
+
+        stand_in.readings[2] = 130
+        report, _ = timed_sync(DEVICES)
+        assert report['success']
+        assert {result['device_id']: result['new_records'] for result in report['devices']} == {
+            1: 0, 2: 30, 3: 0, 4: 0, 5: 0, 6: 0
+        }
+        assert stored(2) == 130
+
+
+def test_concurrent_sync_overlaps_upstream_latency(app, stand_in):
+    with app.app_context():
+        timed_sync(1)
+        for device_id in stand_in.readings:
+            stand_in.readings[device_id] += 10
+
+        _, sequential = timed_sync(1)
+        for device_id in stand_in.readings:
+            stand_in.readings[device_id] += 10
+        report, concurrent = timed_sync(DEVICES)
+
+    assert report['success']
+    assert sequential >= DEVICES * LATENCY_SECONDS
+    assert concurrent < sequential / 2
+
+
+def test_first_sync_streams_instead_of_buffering(app, stand_in, monkeypatch):
+    buffered = []
+    fetch_new_rows = ConsumptionController.fetch_new_rows
+
+    def spy(api_url, device_id, cursor_state, chunk_size=65536):
+        buffered.append((device_id, cursor_state))
+        return fetch_new_rows(api_url, device_id, cursor_state, chunk_size)
+
+    monkeypatch.setattr(ConsumptionController, 'fetch_new_rows', staticmethod(spy))
+    with app.app_context():
+        timed_sync(DEVICES)
+        assert buffered == []
+        assert stored(1) == 100
+
+        stand_in.readings[1] = 120
+        timed_sync(DEVICES)
+    assert sorted(device_id for device_id, _ in buffered) == list(range(1, DEVICES + 1))
+    assert all(cursor_state is not None for _, cursor_state in buffered)
+
+
+def test_failing_device_is_reported_without_stopping_the_others(app, stand_in):
+    stand_in.failing.add(3)
+    with app.app_context():
+        timed_sync(1)
+        stand_in.failing.add(4)
+        report, _ = timed_sync(DEVICES)
+        failed = sorted(result['device_id'] for result in report['devices'] if not result['success'])
+        assert failed == [3, 4]
+        assert stored(5) == 100
@@ -0,0 +1,51 @@
+from app import db
+from app.models.cache import DashboardSnapshot
+from app.services.dashboard import DashboardSnapshots
+from datetime import date, timedelta
+from flask import jsonify
+import pytest
+
+TODAY = date.today()
+
+pytestmark = pytest.mark.usefixtures('uncached')
+
+
+def stored_dates():
+    return sorted(day for (day,) in db.session.query(DashboardSnapshot.snapshot_date))
+
+
+@pytest.mark.parametrize('value', ['2026-13-01', 'tomorrow', '17/10/2026'])
+def test_bad_date_is_a_client_error(client, value):
+    response = client.get(f'/api/dashboard/overview?date={value}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_only_dates_in_the_window_are_stored(app, client, seed_predictions):
+    with app.app_context():
+        seed_predictions(2, days=3)
+        retention = app.config['DASHBOARD_SNAPSHOT_RETENTION_DAYS']
+        requested = [
+            TODAY - timedelta(days=retention + 5),
+            TODAY - timedelta(days=1),
+            TODAY + timedelta(days=2),
+            TODAY + timedelta(days=40),
+            date(1999, 1, 1)
+        ]
+    for day in requested:
+        assert client.get(f'/api/dashboard/overview?date={day}').status_code == 200
+
+    with app.app_context():
+        assert stored_dates() == [TODAY - timedelta(days=1), TODAY + timedelta(days=2)]
+        DashboardSnapshots.refresh()
+        assert stored_dates() == [TODAY - timedelta(days=1)] + [TODAY + timedelta(days=day) for day in range(3)]
+
+
+def test_snapshot_body_matches_jsonify(app, client, seed_predictions):
+    with app.app_context():
+        seed_predictions(2)
+        DashboardSnapshots.refresh()
+    body = client.get('/api/dashboard/overview').get_data()
+
+    with app.test_request_context():
+        assert body == jsonify(DashboardSnapshots.build_overview(TODAY)).get_data()
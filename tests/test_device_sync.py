@@ -0,0 +1,62 @@
+"""Device sync only rebuilds dashboard snapshots and the response cache on a change"""
+from app.controllers.device_controller import DeviceController
+from app.services.dashboard import DashboardSnapshots
+from app.utils.http_client import http_client
+import pytest
+
+API_URL = 'http://metering.invalid/devices'
+
+
+def upstream_device(device_id, name):
+    return {
+        'id': device_id,
+        'Device': name,
+        'MeterNumber': f'M-{device_id}',
+        'Rated_Power': '500 W',
+        'Relay_Status': 'OFF',
+        'DateAdded': '2026-09-01T08:30:00+02:00'
+    }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """The device list the API returns, and the number of snapshot refreshes"""
+    state = {'devices': [upstream_device(1, 'Fridge'), upstream_device(2, 'Heater')], 'refreshes': 0}
+    monkeypatch.setattr(http_client, 'get_json', lambda url: [dict(device) for device in state['devices']])
+    refresh = DashboardSnapshots.refresh
+
+    def counted_refresh():
+        state['refreshes'] += 1
+        refresh()
+
+    monkeypatch.setattr(DashboardSnapshots, 'refresh', staticmethod(counted_refresh))
+    return state
+
+
+def test_unchanged_devices_keep_snapshots(app, upstream):
+    with app.app_context():
+        assert DeviceController.sync_devices_from_api(API_URL)
+        assert upstream['refreshes'] == 1
+
+        # The same list again, as a 304 replaying the cached body would return
+        assert DeviceController.sync_devices_from_api(API_URL)
+        assert upstream['refreshes'] == 1
+
+        upstream['devices'][1]['Device'] = 'Water heater'
+        assert DeviceController.sync_devices_from_api(API_URL)
+        assert upstream['refreshes'] == 2
+
+        upstream['devices'].append(upstream_device(3, 'Oven'))
+        assert DeviceController.sync_devices_from_api(API_URL)
+        assert upstream['refreshes'] == 3
+        assert DeviceController.get_device_by_id(1)['DateAdded'] == '2026-09-01T06:30:00Z'
+
+
+def test_failed_snapshot_refresh_does_not_fail_the_sync(app, upstream, monkeypatch):
+    def failing_refresh():
+        raise RuntimeError('snapshot table locked')
+
+    monkeypatch.setattr(DashboardSnapshots, 'refresh', staticmethod(failing_refresh))
+    with app.app_context():
+        assert DeviceController.sync_devices_from_api(API_URL)
+        assert [device['Device'] for device in DeviceController.get_all_devices()] == ['Fridge', 'Heater']
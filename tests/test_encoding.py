@@ -0,0 +1,15 @@
+"""gzip of streamed responses"""
+from app.utils.encoding import _gzip_stream
+import gzip
+import zlib
+
+
+def test_each_streamed_chunk_can_be_decoded_when_it_arrives():
+    chunks = [''.join(f'{{"id": {i}, "batch": {batch}}}\n' for i in range(50)) for batch in range(4)]
+    decompressor = zlib.decompressobj(31)
+    pieces = list(_gzip_stream(iter(chunks), 6))
+
+    # One piece per chunk plus the trailer, each decoding to its whole chunk
+    assert len(pieces) == len(chunks) + 1
+    assert [decompressor.decompress(piece).decode() for piece in pieces[:-1]] == chunks
+    assert gzip.decompress(b''.join(pieces)).decode() == ''.join(chunks)
@@ -0,0 +1,28 @@
+from app.models.prediction import EnergyPrediction, PeakDemandPrediction
+from app.services.job_runs import JobRuns
+from app.services.leader_election import leader_election
+from app.services.model_trainer import ModelTrainer
+import scheduler
+import pytest
+
+
+@pytest.fixture
+def sole_process():
+    # The testing config elects through a lock file in the instance folder
+    mode, leader_election.mode = leader_election.mode, 'off'
+    yield
+    leader_election.mode = mode
+
+
+def test_generate_predictions_job_counts_predictions_written(app, device_readings, sole_process):
+    with app.app_context():
+        assert ModelTrainer.train_all_models_report()['success']
+
+    scheduler.generate_predictions_job(app)
+
+    with app.app_context():
+        run = JobRuns.recent('generate_predictions', limit=1)[0]
+        written = EnergyPrediction.query.count() + PeakDemandPrediction.query.count()
+    assert run['status'] == 'success'
+    assert written == 2 * 2 * 24 + 2 * 24
+    assert run['items_processed'] == written
@@ -0,0 +1,83 @@
+from app import db
+from app.controllers.consumption_controller import ConsumptionController
+from app.controllers.prediction_controller import PredictionController
+from app.models.device import Device
+from app.services.model_store import model_store
+from app.services.model_trainer import ModelTrainer
+from datetime import datetime, timedelta
+from sklearn.ensemble import HistGradientBoostingRegressor
+import pytest
+
+
+def test_training_pool_saves_with_the_app_model_store_settings(app, device_readings):
+    app.config.update(MODEL_COMPRESS=3, TRAINING_START_METHOD='spawn')
+    previous = model_store.settings()
+    model_store.configure(max_entries=8, compress=3)
+    try:
+        with app.app_context():
+            report = ModelTrainer.train_all_models_report(workers=2)
+    finally:
+        model_store.configure(**previous)
+
+    assert report['workers'] == 2
+    assert sorted(report['trained_devices']) == [1, 2]
+    for device_id in (1, 2):
+        with open(PredictionController.device_model_path(device_id), 'rb') as artifact:
+            # joblib's zlib-compressed format
+            assert artifact.read(1) == b'\x78'
+
+
+@pytest.fixture
+def global_mode(app):
+    app.config['ENERGY_MODEL_MODE'] = 'global'
+    return app
+
+
+def test_global_model_is_skipped_when_its_data_is_unchanged(global_mode, client, device_readings):
+    app = global_mode
+    with app.app_context():
+        assert PredictionController.train_energy_model_status(1) == 'trained'
+        assert PredictionController.train_energy_model_status(2) == 'skipped'
+        assert PredictionController.train_energy_model_status(2, force=True) == 'trained'
+        assert ModelTrainer.train_all_models_report()['global_energy']['status'] == 'skipped'
+
+        # Rated power is a feature of the global model
+        db.session.get(Device, 2).rated_power = '750 W'
+        db.session.commit()
+        assert PredictionController.train_energy_model_status(1) == 'trained'
+
+    response = client.post('/api/predictions/train', json={'device_id': 1})
+    assert response.get_json() == {'message': 'Energy prediction model for device 1 is already up to date'}
+    response = client.post('/api/predictions/train', json={'device_id': 99})
+    assert response.status_code == 404
+
+
+def test_global_model_follows_training_mode_and_profile(global_mode, device_readings):
+    app = global_mode
+    path = PredictionController.GLOBAL_ENERGY_MODEL_PATH
+    with app.app_context():
+        app.config['MODEL_PROFILE'] = 'compact'
+        assert PredictionController.train_global_energy_model_status() == 'trained'
+        assert model_store.load_metadata(path)['profile'] == 'compact'
+        assert model_store.load(path).max_depth == 12
+
+        ConsumptionController.bulk_insert_rows(1, [
+            {
+                'device_id': 1,
+                'voltage': 220.0,
+                'current': 0.4,
+                'time_on': 60.0,
+                'active_energy': 0.08,
+                'reading_timestamp': datetime(2026, 9, 4) + timedelta(hours=hour)
+            }
+            for hour in range(30)
+        ])
+        db.session.commit()
+        assert PredictionController.train_global_energy_model_status(mode='incremental') == 'updated'
+        metadata = model_store.load_metadata(path)
+        assert metadata['n_estimators'] == 50 + app.config['TRAINING_INCREMENTAL_TREES']
+        assert metadata['trained_through'] == datetime(2026, 9, 5, 5).isoformat()
+
+        app.config['MODEL_PROFILE'] = 'hist_gb'
+        assert PredictionController.train_global_energy_model_status(mode='incremental') == 'trained'
+        assert isinstance(model_store.load(path), HistGradientBoostingRegressor)
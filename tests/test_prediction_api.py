@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+import pytest
+
+TODAY = date.today()
+
+
+@pytest.mark.parametrize('force', ['false', 'true', 0, 1, None])
+def test_train_force_must_be_a_json_boolean(client, force):
+    response = client.post('/api/predictions/train', json={'device_id': 1, 'force': force})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'force must be true or false'}
+
+
+def test_all_predictions_are_streamed_from_the_rows(app, client, seed_predictions):
+    with app.app_context():
+        seed_predictions(3, days=2)
+    url = f'/api/predictions/all?start_date={TODAY}&end_date={TODAY + timedelta(days=1)}&device_ids=1,3'
+    response = client.get(url)
+    assert response.status_code == 200
+    # Not collected by the response cache, which would buffer it and add an ETag
+    assert response.is_streamed
+    assert 'ETag' not in response.headers
+
+    document = response.get_json()
+    assert list(document) == [
+        'start_date', 'end_date', 'devices', 'energy_predictions', 'peak_demand_predictions', 'daily_summaries'
+    ]
+    assert sorted(document['devices']) == ['1', '2', '3']
+    day = TODAY.isoformat()
+    assert sorted(document['energy_predictions'][day]) == ['1', '3']
+    assert document['energy_predictions'][day]['3']['23']['predicted_energy'] == pytest.approx(0.3 + 0.23)
+    assert document['peak_demand_predictions'][day]['23']['predicted_peak_demand'] == pytest.approx(1 + 23 / 24)
+    assert document['daily_summaries'][day] == {
+        'total_energy': {
+            '1': pytest.approx(24 * 0.1 + 0.01 * 276),
+            '3': pytest.approx(24 * 0.3 + 0.01 * 276)
+        },
+        'peak_demand': pytest.approx(1 + 23 / 24),
+        'peak_hour': 23
+    }
+
+
+def test_all_predictions_without_rows_is_an_empty_document(client):
+    document = client.get('/api/predictions/all').get_json()
+    assert document['devices'] == {}
+    assert document['energy_predictions'] == document['peak_demand_predictions'] == document['daily_summaries'] == {}
@@ -0,0 +1,89 @@
+"""SQL statements per request for the prediction and dashboard reads
+
+Each endpoint is requested with a few devices and again with more. The
+statement count must stay within the view's @query_budget and must not
+grow with the number of devices or predictions, so an N+1 query pattern
+fails here instead of in production.
+"""
+from app import db
+from app.models.device import Device
+from app.services.dashboard import DashboardSnapshots
+from app.utils.query_counter import QueryBudgetExceeded, query_budget
+from app.utils.query_plan import capture_statements
+from flask import request
+from datetime import date, timedelta
+import pytest
+
+TODAY = date.today()
+
+URLS = [
+    f'/api/predictions/energy?date={TODAY}',
+    '/api/predictions/energy?device_id=1',
+    f'/api/predictions/energy?device_id=1&date={TODAY}',
+    '/api/predictions/all',
+    f'/api/predictions/all?start_date={TODAY}&end_date={TODAY + timedelta(days=1)}',
+    '/api/predictions/device/1/summary',
+    '/api/predictions/peak/summary',
+    '/api/dashboard/overview',
+    f'/api/dashboard/overview?date={TODAY + timedelta(days=1)}'
+]
+
+
+# A cache hit runs no statements at all
+pytestmark = pytest.mark.usefixtures('uncached')
+
+
+def statement_count(app, client, url):
+    """Statements run to answer a GET, including while a streamed body is sent"""
+    with app.app_context():
+        engine = db.engine
+
+    def fetch():
+        response = client.get(url)
+        response.get_data()
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    return len(capture_statements(engine, fetch))
+
+
+def budget_of(app, url):
+    with app.test_request_context(url.split('?')[0]):
+        return app.view_functions[request.url_rule.endpoint].query_budget
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_statements_do_not_grow_with_devices(app, client, url, seed_predictions):
+    with app.app_context():
+        seed_predictions(2)
+        DashboardSnapshots.refresh()
+    few = statement_count(app, client, url)
+
+    with app.app_context():
+        seed_predictions(6)
+        DashboardSnapshots.refresh()
+    many = statement_count(app, client, url)
+
+    assert few <= budget_of(app, url)
+    assert many == few, f"{url} ran {few} statements with 2 devices and {many} with 8"
+
+
+def test_dashboard_snapshot_built_on_request_stays_in_budget(app, client, seed_predictions):
+    with app.app_context():
+        seed_predictions(4)
+    # No refresh: the snapshot for today is built by the request itself
+    url = '/api/dashboard/overview'
+    assert statement_count(app, client, url) <= budget_of(app, url)
+
+
+def test_exceeding_a_budget_fails_the_request(app, client, seed_predictions):
+    assert app.config['SQL_QUERY_BUDGET'] == 'raise'
+
+    @app.route('/per-row')
+    @query_budget(2)
+    def per_row():
+        return {'names': [db.session.get(Device, device_id).name for device_id in (1, 2, 3)]}
+
+    with app.app_context():
+        seed_predictions(3)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/per-row')
@@ -0,0 +1,30 @@
+"""No API query makes SQLite read a whole large table
+
+Runs each query shape behind the API and ingest, asks SQLite for the plan of
+every statement it issued, and fails on a full scan of any table other than
+the small reference tables.
+"""
+from app import db
+from app.cli import ALLOWED_FULL_SCANS, api_query_shapes
+from app.utils.query_plan import capture_statements, sqlite_full_scans
+import pytest
+
+
+@pytest.mark.parametrize('name', list(api_query_shapes()))
+def test_query_uses_indexes(app, seed_predictions, name):
+    with app.app_context():
+        seed_predictions(2)
+        previous = app.config['CONSUMPTION_TOTALS_FROM_ROLLUPS']
+        try:
+            statements = capture_statements(db.engine, api_query_shapes()[name])
+            connection = db.session.connection()
+            scans = [
+                (sorted(set(sqlite_full_scans(connection, statement, parameters)) - ALLOWED_FULL_SCANS), statement)
+                for statement, parameters in statements
+            ]
+        finally:
+            db.session.rollback()
+
+        assert statements, f"{name} ran no SQL"
+        assert app.config['CONSUMPTION_TOTALS_FROM_ROLLUPS'] == previous
+        assert [(tables, ' '.join(statement.split())) for tables, statement in scans if tables] == []
@@ -0,0 +1,43 @@
+"""Startup check for the unique key consumption ingest depends on"""
+from app import create_app, db
+from config import TestingConfig
+import logging
+import sqlite3
+
+MISSING_KEY = 'consumption_records has no unique (device_id, reading_timestamp) key'
+
+# consumption_records as created before the unique key existed
+OLD_TABLE = """
+CREATE TABLE consumption_records (
+    id INTEGER PRIMARY KEY, device_id INTEGER NOT NULL, voltage FLOAT NOT NULL, current FLOAT NOT NULL,
+    time_on FLOAT NOT NULL, active_energy FLOAT NOT NULL, reading_timestamp DATETIME NOT NULL, created_at DATETIME
+)
+"""
+
+
+def app_on(path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    app = create_app('testing')
+    with app.app_context():
+        db.engine.dispose()
+    return app
+
+
+def test_missing_unique_key_is_reported_at_startup(tmp_path, monkeypatch, caplog):
+    path = tmp_path / 'old.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute(OLD_TABLE)
+
+    with caplog.at_level(logging.ERROR):
+        app_on(path, monkeypatch)
+    assert MISSING_KEY in caplog.text
+
+    caplog.clear()
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE UNIQUE INDEX ix_consumption_device_timestamp ON consumption_records (device_id, reading_timestamp)'
+        )
+    with caplog.at_level(logging.ERROR):
+        app_on(path, monkeypatch)
+    assert MISSING_KEY not in caplog.text
+